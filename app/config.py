@@ -12,7 +12,117 @@ DATABASE_URL = os.getenv(
     "DATABASE_URL",
     "postgresql+asyncpg://postgres:postgres@db:5432/tatar_youth"
 )
+# Реплика только для чтения (необязательно): списки, выгрузки, рассылки
+DATABASE_REPLICA_URL = os.getenv("DATABASE_REPLICA_URL", "")
+
+# Настройки пула подключений к БД
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+DB_POOL_TIMEOUT = int(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes")
+# Кэш подготовленных запросов asyncpg (0 - выключить, нужно при работе через pgbouncer)
+DB_STATEMENT_CACHE_SIZE = int(os.getenv("DB_STATEMENT_CACHE_SIZE", "100"))
+# Логирование SQL-запросов: доля логируемых запросов (0 - выключено, 1 - все) и уровень логов
+DB_LOG_SAMPLE_RATE = float(os.getenv("DB_LOG_SAMPLE_RATE", "0"))
+DB_LOG_LEVEL = os.getenv("DB_LOG_LEVEL", "DEBUG")
 
 # Настройки пагинации
 EVENTS_PER_PAGE = 5
-PARTICIPANTS_PER_PAGE = 10
\ No newline at end of file
+PARTICIPANTS_PER_PAGE = 10
+
+# Настройки рассылки
+BROADCAST_WORKERS = int(os.getenv("BROADCAST_WORKERS", "8"))
+BROADCAST_BATCH_SIZE = int(os.getenv("BROADCAST_BATCH_SIZE", "500"))
+# Глобальный лимит Telegram ~30 сообщений в секунду, в один чат ~1 в секунду
+BROADCAST_RATE_LIMIT = float(os.getenv("BROADCAST_RATE_LIMIT", "25"))
+PER_CHAT_INTERVAL = float(os.getenv("PER_CHAT_INTERVAL", "1.0"))
+
+# Время жизни кэша списка мероприятий (секунды)
+EVENTS_CACHE_TTL = int(os.getenv("EVENTS_CACHE_TTL", "60"))
+
+# Время жизни кэша ролей админов/модераторов (секунды)
+ROLE_CACHE_TTL = int(os.getenv("ROLE_CACHE_TTL", "300"))
+
+# Общий Redis, через который экземпляры бота сообщают друг другу об изменённых ролях и профилях.
+# Без него каждый процесс сбрасывает только свои кэши: при нескольких экземплярах снятая роль
+# или отменённая регистрация видны в остальных до истечения ROLE_CACHE_TTL / PROFILE_CACHE_TTL
+CACHE_REDIS_URL = os.getenv("CACHE_REDIS_URL", "")
+
+# Хранилище состояний FSM: memory, sql (основная БД) или redis
+FSM_STORAGE = os.getenv("FSM_STORAGE", "sql")
+FSM_REDIS_URL = os.getenv("FSM_REDIS_URL", "redis://localhost:6379/0")
+# Как часто накопленные изменения состояний записываются в БД (секунды)
+FSM_FLUSH_INTERVAL = float(os.getenv("FSM_FLUSH_INTERVAL", "0.2"))
+# Через сколько секунд брошенные черновики форм удаляются
+FSM_STATE_TTL = int(os.getenv("FSM_STATE_TTL", str(7 * 24 * 3600)))
+# Кэш прочитанных из БД состояний (секунды и число записей)
+FSM_CACHE_TTL = int(os.getenv("FSM_CACHE_TTL", "300"))
+FSM_CACHE_SIZE = int(os.getenv("FSM_CACHE_SIZE", "10000"))
+
+# Режим получения обновлений: polling или webhook
+BOT_MODE = os.getenv("BOT_MODE", "polling")
+WEBHOOK_URL = os.getenv("WEBHOOK_URL", "")  # публичный адрес бота, например https://bot.example.com
+WEBHOOK_PATH = os.getenv("WEBHOOK_PATH", "/webhook")
+WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET", "")
+WEBAPP_HOST = os.getenv("WEBAPP_HOST", "0.0.0.0")
+WEBAPP_PORT = int(os.getenv("WEBAPP_PORT", "8080"))
+# Сколько обновлений обрабатывается одновременно в одном процессе
+WEBHOOK_MAX_IN_FLIGHT = int(os.getenv("WEBHOOK_MAX_IN_FLIGHT", "100"))
+WEBHOOK_KEEPALIVE_TIMEOUT = float(os.getenv("WEBHOOK_KEEPALIVE_TIMEOUT", "75"))
+
+# Как часто проверять освободившиеся места для листа ожидания (секунды)
+WAITLIST_PROMOTE_INTERVAL = int(os.getenv("WAITLIST_PROMOTE_INTERVAL", "60"))
+
+# Напоминания о мероприятиях: за сколько часов до начала (через запятую, пусто - выключены)
+REMINDER_HOURS = sorted(
+    (int(hours) for hours in os.getenv("REMINDER_HOURS", "24,2").split(",") if hours.strip()),
+    reverse=True
+)
+# Как часто искать мероприятия, о которых пора напомнить (секунды)
+REMINDER_CHECK_INTERVAL = int(os.getenv("REMINDER_CHECK_INTERVAL", "300"))
+REMINDER_BATCH_SIZE = int(os.getenv("REMINDER_BATCH_SIZE", "500"))
+
+# Изображения мероприятий: каталог с исходниками, число потоков обработки и параметры сжатия
+IMAGES_DIR = os.getenv("IMAGES_DIR", "data/images")
+IMAGE_WORKERS = int(os.getenv("IMAGE_WORKERS", "2"))
+IMAGE_JPEG_QUALITY = int(os.getenv("IMAGE_JPEG_QUALITY", "85"))
+
+# Повтор запросов к Bot API после RetryAfter: число попыток и максимальная пауза, которую готовы ждать (секунды)
+TELEGRAM_MAX_RETRIES = int(os.getenv("TELEGRAM_MAX_RETRIES", "3"))
+TELEGRAM_MAX_RETRY_AFTER = int(os.getenv("TELEGRAM_MAX_RETRY_AFTER", "60"))
+
+# Ограничение частоты действий пользователя: на каждый вид кнопки (по префиксу callback_data) и на все действия сразу
+THROTTLE_RATE = float(os.getenv("THROTTLE_RATE", "1"))  # действий в секунду
+THROTTLE_BURST = int(os.getenv("THROTTLE_BURST", "3"))
+THROTTLE_USER_RATE = float(os.getenv("THROTTLE_USER_RATE", "4"))
+THROTTLE_USER_BURST = int(os.getenv("THROTTLE_USER_BURST", "10"))
+# Повторное нажатие той же кнопки в течение этого времени игнорируется (секунды)
+THROTTLE_DUPLICATE_WINDOW = float(os.getenv("THROTTLE_DUPLICATE_WINDOW", "1.0"))
+# Общее хранилище лимитов для нескольких экземпляров бота (пусто - в памяти процесса)
+THROTTLE_REDIS_URL = os.getenv("THROTTLE_REDIS_URL", "")
+
+# Метрики в формате Prometheus: локальный HTTP-эндпоинт /metrics (порт 0 - выключен)
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+METRICS_PORT = int(os.getenv("METRICS_PORT", "9100"))
+
+# Синхронизация профилей пользователей: как часто записывать накопленные изменения (секунды) и размер пачки
+USER_SYNC_INTERVAL = float(os.getenv("USER_SYNC_INTERVAL", "0.2"))
+USER_SYNC_BATCH_SIZE = int(os.getenv("USER_SYNC_BATCH_SIZE", "500"))
+
+# Кэш экрана «Мой профиль» (время жизни в секундах и число пользователей).
+# Изменения профилей в других экземплярах бота приходят через CACHE_REDIS_URL; без него -
+# только по истечении PROFILE_CACHE_TTL, так что при нескольких экземплярах его стоит уменьшить
+PROFILE_CACHE_TTL = int(os.getenv("PROFILE_CACHE_TTL", "600"))
+PROFILE_CACHE_SIZE = int(os.getenv("PROFILE_CACHE_SIZE", "10000"))
+
+# Архивация: мероприятия, завершившиеся больше ARCHIVE_AFTER_DAYS дней назад, переносятся в архивные таблицы
+ARCHIVE_AFTER_DAYS = int(os.getenv("ARCHIVE_AFTER_DAYS", "30"))
+ARCHIVE_CHECK_INTERVAL = int(os.getenv("ARCHIVE_CHECK_INTERVAL", "3600"))
+ARCHIVE_BATCH_SIZE = int(os.getenv("ARCHIVE_BATCH_SIZE", "100"))
+
+# Поиск мероприятий: максимум результатов, время жизни кэша результатов (секунды),
+# пауза перед поиском по inline-запросу (секунды) - пока пользователь печатает, запросы не выполняются
+SEARCH_RESULTS_LIMIT = int(os.getenv("SEARCH_RESULTS_LIMIT", "20"))
+SEARCH_CACHE_TTL = int(os.getenv("SEARCH_CACHE_TTL", "60"))
+SEARCH_DEBOUNCE = float(os.getenv("SEARCH_DEBOUNCE", "0.4"))
@@ -1,18 +1,112 @@
+import logging
+import os
+import random
+import time
+
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import event
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.orm import sessionmaker
-from app.config import DATABASE_URL
-from app.database.models import Base
+from app.config import (
+    DATABASE_URL,
+    DATABASE_REPLICA_URL,
+    DB_POOL_SIZE,
+    DB_MAX_OVERFLOW,
+    DB_POOL_TIMEOUT,
+    DB_POOL_RECYCLE,
+    DB_POOL_PRE_PING,
+    DB_STATEMENT_CACHE_SIZE,
+    DB_LOG_SAMPLE_RATE,
+    DB_LOG_LEVEL
+)
+from app.utils.metrics import record_query
+
+query_logger = logging.getLogger("app.database.queries")
+QUERY_LOG_LEVEL = logging.getLevelName(DB_LOG_LEVEL.upper())
+
+def _instrument_queries(engine):
+    """
+    Время каждого запроса - в метрики (bot_db_query_duration_seconds и счётчики текущего обновления);
+    доля DB_LOG_SAMPLE_RATE запросов дополнительно пишется в лог вместе со временем выполнения
+    """
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+    
+    @event.listens_for(engine.sync_engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["query_start"].pop()
+        record_query(elapsed)
+        if DB_LOG_SAMPLE_RATE > 0 and random.random() < DB_LOG_SAMPLE_RATE:
+            query_logger.log(QUERY_LOG_LEVEL, "%.1f ms: %s %r", elapsed * 1000, statement, parameters)
+    
+    @event.listens_for(engine.sync_engine, "handle_error")
+    def handle_error(context):
+        # Упавший запрос не доходит до after_cursor_execute - убираем его отметку времени
+        starts = context.connection.info.get("query_start") if context.connection is not None else None
+        if starts:
+            record_query(time.perf_counter() - starts.pop())
 
-engine = create_async_engine(DATABASE_URL, echo=True)
+def create_engine(url: str):
+    """Создать движок с настройками пула из app/config.py"""
+    options = {"echo": False, "pool_pre_ping": DB_POOL_PRE_PING}
+    if not url.startswith("sqlite"):
+        options.update(
+            pool_size=DB_POOL_SIZE,
+            max_overflow=DB_MAX_OVERFLOW,
+            pool_timeout=DB_POOL_TIMEOUT,
+            pool_recycle=DB_POOL_RECYCLE
+        )
+    if "+asyncpg" in url:
+        options["connect_args"] = {
+            # Кэш asyncpg и кэш подготовленных запросов SQLAlchemy
+            "statement_cache_size": DB_STATEMENT_CACHE_SIZE,
+            "prepared_statement_cache_size": DB_STATEMENT_CACHE_SIZE
+        }
+    
+    new_engine = create_async_engine(url, **options)
+    _instrument_queries(new_engine)
+    return new_engine
+
+engine = create_engine(DATABASE_URL)
 AsyncSessionLocal = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
 
+# Сессии только для чтения идут на реплику, если она настроена
+read_engine = create_engine(DATABASE_REPLICA_URL) if DATABASE_REPLICA_URL else engine
+ReadSessionLocal = sessionmaker(read_engine, class_=AsyncSession, expire_on_commit=False)
+
+def dialect_insert(table):
+    """INSERT с поддержкой ON CONFLICT для используемой СУБД (PostgreSQL или SQLite)"""
+    if engine.dialect.name == "postgresql":
+        return postgresql.insert(table)
+    return sqlite.insert(table)
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(__file__), "migrations")
+
+def _run_migrations(connection):
+    config = Config()
+    config.set_main_option("script_location", MIGRATIONS_DIR)
+    config.attributes["connection"] = connection
+    command.upgrade(config, "head")
+
 async def init_db():
+    """Применить миграции схемы базы данных (alembic upgrade head)"""
     async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
+        await conn.run_sync(_run_migrations)
 
 async def get_db():
     async with AsyncSessionLocal() as session:
         try:
             yield session
         finally:
-            await session.close()
\ No newline at end of file
+            await session.close()
+
+async def get_read_db():
+    """Сессия для запросов только на чтение (реплика, если задан DATABASE_REPLICA_URL)"""
+    async with ReadSessionLocal() as session:
+        try:
+            yield session
+        finally:
+            await session.close()
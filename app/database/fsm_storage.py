@@ -0,0 +1,220 @@
+import asyncio
+import json
+import logging
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional, Tuple
+
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseStorage, StateType, StorageKey
+from aiogram.fsm.storage.memory import MemoryStorage
+from sqlalchemy import select, delete, or_, and_
+
+from app.config import (
+    FSM_STORAGE,
+    FSM_REDIS_URL,
+    FSM_FLUSH_INTERVAL,
+    FSM_STATE_TTL,
+    FSM_CACHE_TTL,
+    FSM_CACHE_SIZE
+)
+from app.database.database import get_db, dialect_insert
+from app.database.models import FSMRecord
+from app.utils.cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+# Как часто удалять завершённые и брошенные состояния (секунды)
+COMPACT_INTERVAL = 600
+
+
+def _json_default(value: Any):
+    # В данных форм хранится дата мероприятия - сохраняем её в ISO формате
+    if isinstance(value, datetime):
+        return {"__datetime__": value.isoformat()}
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def _json_object_hook(obj: Dict[str, Any]):
+    if len(obj) == 1 and "__datetime__" in obj:
+        return datetime.fromisoformat(obj["__datetime__"])
+    return obj
+
+
+def fsm_json_dumps(data: Dict[str, Any]) -> str:
+    return json.dumps(data, default=_json_default, ensure_ascii=False)
+
+
+def fsm_json_loads(value: str) -> Dict[str, Any]:
+    return json.loads(value, object_hook=_json_object_hook)
+
+
+class SQLStorage(BaseStorage):
+    """
+    FSM-хранилище в основной базе данных.
+    Изменения копятся в памяти и записываются одной транзакцией раз в flush_interval секунд,
+    завершённые (очищенные) и брошенные состояния периодически удаляются.
+    Прочитанные записи кэшируются, так что обычное обновление не делает запроса к БД.
+    Кэш и буфер у каждого процесса свои - при нескольких экземплярах бота нужен FSM_STORAGE=redis.
+    """
+
+    def __init__(self, flush_interval: float = FSM_FLUSH_INTERVAL, state_ttl: int = FSM_STATE_TTL):
+        self.flush_interval = flush_interval
+        self.state_ttl = state_ttl
+        # Ещё не записанные изменения: key -> {"state": ..., "data": ...} (только изменённые поля)
+        self._pending: Dict[str, Dict[str, Any]] = {}
+        # Изменения, которые записываются прямо сейчас
+        self._flushing: Dict[str, Dict[str, Any]] = {}
+        self._flusher: Optional[asyncio.Task] = None
+        # Записанные в БД состояния: key -> (state, data в JSON); отсутствие записи тоже кэшируется
+        self._cache = TTLCache(FSM_CACHE_TTL, maxsize=FSM_CACHE_SIZE)
+        self._last_compaction = time.monotonic()
+
+    @staticmethod
+    def _build_key(key: StorageKey) -> str:
+        return f"{key.bot_id}:{key.chat_id}:{key.user_id}:{key.thread_id or ''}:{key.destiny}"
+
+    def _buffered(self, key: str, field: str) -> Any:
+        for changes in (self._pending, self._flushing):
+            if key in changes and field in changes[key]:
+                return changes[key][field]
+        raise KeyError(field)
+
+    def _write(self, key: str, field: str, value: Any):
+        self._pending.setdefault(key, {})[field] = value
+        # Пока изменение в буфере, читается оно; после записи запись перечитается из БД
+        self._cache.invalidate(key)
+        if self._flusher is None or self._flusher.done():
+            self._flusher = asyncio.create_task(self._flush_loop())
+
+    async def _load(self, key: str) -> Tuple[Optional[str], Optional[str]]:
+        async for db in get_db():
+            result = await db.execute(select(FSMRecord.state, FSMRecord.data).where(FSMRecord.key == key))
+            row = result.one_or_none()
+            return (row.state, row.data) if row else (None, None)
+
+    async def _read(self, key: str) -> Tuple[Optional[str], Optional[str]]:
+        """Состояние и данные из кэша; из БД - одним запросом на оба поля"""
+        return await self._cache.get_or_load(key, lambda: self._load(key))
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        self._write(self._build_key(key), "state", state.state if isinstance(state, State) else state)
+
+    async def get_state(self, key: StorageKey) -> Optional[str]:
+        key = self._build_key(key)
+        try:
+            return self._buffered(key, "state")
+        except KeyError:
+            state, _ = await self._read(key)
+            return state
+
+    async def set_data(self, key: StorageKey, data: Dict[str, Any]) -> None:
+        self._write(self._build_key(key), "data", data.copy())
+
+    async def get_data(self, key: StorageKey) -> Dict[str, Any]:
+        key = self._build_key(key)
+        try:
+            return self._buffered(key, "data").copy()
+        except KeyError:
+            _, data = await self._read(key)
+            return fsm_json_loads(data) if data else {}
+
+    async def _flush_loop(self):
+        while self._pending:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"Error flushing FSM states: {e}")
+
+    async def flush(self):
+        """Записать накопленные изменения одной транзакцией"""
+        if not self._pending:
+            return
+
+        self._flushing, self._pending = self._pending, {}
+        now = datetime.utcnow()
+
+        # Группируем по набору изменённых полей, чтобы каждая группа писалась одним запросом
+        groups: Dict[tuple, list] = {}
+        finished = []
+        for key, changes in self._flushing.items():
+            if changes.get("state", ...) is None and changes.get("data", ...) == {}:
+                finished.append(key)
+                continue
+            row = {"key": key, "updated_at": now}
+            if "state" in changes:
+                row["state"] = changes["state"]
+            if "data" in changes:
+                row["data"] = fsm_json_dumps(changes["data"]) if changes["data"] else None
+            groups.setdefault(tuple(sorted(changes)), []).append(row)
+
+        try:
+            async for db in get_db():
+                for fields, rows in groups.items():
+                    stmt = dialect_insert(FSMRecord.__table__)
+                    stmt = stmt.on_conflict_do_update(
+                        index_elements=[FSMRecord.key],
+                        set_={field: stmt.excluded[field] for field in fields + ("updated_at",)}
+                    )
+                    await db.execute(stmt, rows)
+                if finished:
+                    # Состояние очищено - запись больше не нужна
+                    await db.execute(delete(FSMRecord).where(FSMRecord.key.in_(finished)))
+                await db.commit()
+        except BaseException:
+            # Возвращаем изменения в очередь, не затирая более свежие
+            for key, changes in self._flushing.items():
+                self._pending[key] = {**changes, **self._pending.get(key, {})}
+            raise
+        finally:
+            self._flushing = {}
+
+        if time.monotonic() - self._last_compaction > COMPACT_INTERVAL:
+            self._last_compaction = time.monotonic()
+            await self.compact()
+
+    async def compact(self):
+        """Удалить пустые состояния и черновики, брошенные дольше state_ttl"""
+        async for db in get_db():
+            await db.execute(
+                delete(FSMRecord).where(or_(
+                    and_(FSMRecord.state.is_(None), FSMRecord.data.is_(None)),
+                    FSMRecord.updated_at < datetime.utcnow() - timedelta(seconds=self.state_ttl)
+                ))
+            )
+            await db.commit()
+
+    async def close(self) -> None:
+        if self._flusher:
+            self._flusher.cancel()
+            await asyncio.gather(self._flusher, return_exceptions=True)
+            self._flusher = None
+        await self.flush()
+
+
+def create_redis_storage(redis=None) -> BaseStorage:
+    """
+    Хранилище в Redis или совместимом сервере. Клиент можно передать явно
+    (например, локальную замену Redis для тестов), иначе он создаётся по FSM_REDIS_URL
+    """
+    from aiogram.fsm.storage.redis import RedisStorage
+
+    options = dict(
+        state_ttl=FSM_STATE_TTL,
+        data_ttl=FSM_STATE_TTL,
+        json_dumps=fsm_json_dumps,
+        json_loads=fsm_json_loads
+    )
+    if redis is None:
+        return RedisStorage.from_url(FSM_REDIS_URL, **options)
+    return RedisStorage(redis=redis, **options)
+
+
+def create_fsm_storage() -> BaseStorage:
+    """Создать хранилище состояний FSM согласно настройке FSM_STORAGE"""
+    if FSM_STORAGE == "redis":
+        return create_redis_storage()
+    if FSM_STORAGE == "sql":
+        return SQLStorage()
+    return MemoryStorage()
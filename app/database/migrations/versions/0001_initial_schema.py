@@ -0,0 +1,145 @@
+"""initial schema
+
+Создаёт все таблицы. Базы, созданные раньше через create_all, доводятся до этой схемы:
+недостающие таблицы создаются, в events добавляется registered_count,
+в registrations удаляются дубли и появляется уникальное ограничение (user_id, event_id).
+
+Revision ID: 0001_initial_schema
+Revises:
+Create Date: 2026-10-17 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0001_initial_schema'
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+    tables = set(inspector.get_table_names())
+
+    if 'users' not in tables:
+        op.create_table(
+            'users',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('telegram_id', sa.Integer(), nullable=False),
+            sa.Column('username', sa.String(length=255), nullable=True),
+            sa.Column('first_name', sa.String(length=255), nullable=True),
+            sa.Column('last_name', sa.String(length=255), nullable=True),
+            sa.Column('phone', sa.String(length=20), nullable=True),
+            sa.Column('is_admin', sa.Boolean(), nullable=True),
+            sa.Column('is_moderator', sa.Boolean(), nullable=True),
+            sa.Column('created_at', sa.DateTime(), nullable=True),
+            sa.PrimaryKeyConstraint('id'),
+            sa.UniqueConstraint('telegram_id')
+        )
+
+    if 'events' not in tables:
+        op.create_table(
+            'events',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('title', sa.String(length=255), nullable=False),
+            sa.Column('short_description', sa.Text(), nullable=True),
+            sa.Column('full_description', sa.Text(), nullable=True),
+            sa.Column('date', sa.DateTime(), nullable=False),
+            sa.Column('location', sa.String(length=255), nullable=True),
+            sa.Column('speakers', sa.Text(), nullable=True),
+            sa.Column('image_path', sa.String(length=255), nullable=True),
+            sa.Column('registration_required', sa.Boolean(), nullable=True),
+            sa.Column('max_participants', sa.Integer(), nullable=True),
+            sa.Column('registered_count', sa.Integer(), server_default='0', nullable=False),
+            sa.Column('created_at', sa.DateTime(), nullable=True),
+            sa.PrimaryKeyConstraint('id')
+        )
+    elif 'registered_count' not in {c['name'] for c in inspector.get_columns('events')}:
+        op.add_column(
+            'events',
+            sa.Column('registered_count', sa.Integer(), server_default='0', nullable=False)
+        )
+
+    if 'registrations' not in tables:
+        op.create_table(
+            'registrations',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('user_id', sa.Integer(), nullable=True),
+            sa.Column('event_id', sa.Integer(), nullable=True),
+            sa.Column('registered_at', sa.DateTime(), nullable=True),
+            sa.ForeignKeyConstraint(['event_id'], ['events.id']),
+            sa.ForeignKeyConstraint(['user_id'], ['users.id']),
+            sa.PrimaryKeyConstraint('id'),
+            sa.UniqueConstraint('user_id', 'event_id', name='uq_registrations_user_event')
+        )
+    elif 'uq_registrations_user_event' not in {
+        c['name'] for c in inspector.get_unique_constraints('registrations')
+    }:
+        # Старые данные могли содержать повторные регистрации - оставляем самую раннюю
+        op.execute(
+            "DELETE FROM registrations WHERE id NOT IN "
+            "(SELECT MIN(id) FROM registrations GROUP BY user_id, event_id)"
+        )
+        with op.batch_alter_table('registrations') as batch_op:
+            batch_op.create_unique_constraint('uq_registrations_user_event', ['user_id', 'event_id'])
+
+    if 'events' in tables:
+        op.execute(
+            "UPDATE events SET registered_count = "
+            "(SELECT COUNT(*) FROM registrations WHERE registrations.event_id = events.id)"
+        )
+
+    if 'broadcasts' not in tables:
+        op.create_table(
+            'broadcasts',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('text', sa.Text(), nullable=False),
+            sa.Column('event_id', sa.Integer(), nullable=True),
+            sa.Column('admin_id', sa.Integer(), nullable=True),
+            sa.Column('status', sa.String(length=20), nullable=True),
+            sa.Column('last_user_id', sa.Integer(), nullable=True),
+            sa.Column('sent_count', sa.Integer(), nullable=True),
+            sa.Column('failed_count', sa.Integer(), nullable=True),
+            sa.Column('created_at', sa.DateTime(), nullable=True),
+            sa.Column('finished_at', sa.DateTime(), nullable=True),
+            sa.PrimaryKeyConstraint('id')
+        )
+
+    if 'fsm_states' not in tables:
+        op.create_table(
+            'fsm_states',
+            sa.Column('key', sa.String(length=255), nullable=False),
+            sa.Column('state', sa.String(length=255), nullable=True),
+            sa.Column('data', sa.Text(), nullable=True),
+            sa.Column('updated_at', sa.DateTime(), nullable=True),
+            sa.PrimaryKeyConstraint('key')
+        )
+
+    if 'waitlist' not in tables:
+        op.create_table(
+            'waitlist',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('user_id', sa.Integer(), nullable=False),
+            sa.Column('event_id', sa.Integer(), nullable=False),
+            sa.Column('position', sa.Integer(), nullable=False),
+            sa.Column('created_at', sa.DateTime(), nullable=True),
+            sa.ForeignKeyConstraint(['event_id'], ['events.id']),
+            sa.ForeignKeyConstraint(['user_id'], ['users.id']),
+            sa.PrimaryKeyConstraint('id'),
+            sa.UniqueConstraint('event_id', 'position', name='uq_waitlist_event_position'),
+            sa.UniqueConstraint('user_id', 'event_id', name='uq_waitlist_user_event')
+        )
+
+
+def downgrade() -> None:
+    op.drop_table('waitlist')
+    op.drop_table('fsm_states')
+    op.drop_table('broadcasts')
+    op.drop_table('registrations')
+    op.drop_table('events')
+    op.drop_table('users')
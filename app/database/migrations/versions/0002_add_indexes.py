@@ -0,0 +1,49 @@
+"""add indexes for listing, counting and background jobs
+
+Revision ID: 0002_add_indexes
+Revises: 0001_initial_schema
+Create Date: 2026-10-17 12:30:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0002_add_indexes'
+down_revision: Union[str, None] = '0001_initial_schema'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Предстоящие мероприятия: WHERE date >= now() ORDER BY date
+    op.create_index('ix_events_date_id', 'events', ['date', 'id'])
+    # Участники мероприятия и их количество, сортировка по дате регистрации.
+    # Регистрации пользователя ищутся по уникальному индексу (user_id, event_id)
+    op.create_index(
+        'ix_registrations_event_registered_at', 'registrations', ['event_id', 'registered_at']
+    )
+    # Частичные индексы для небольших горячих подмножеств
+    op.create_index(
+        'ix_users_moderators', 'users', ['id'],
+        postgresql_where=sa.text('is_moderator = true'),
+        sqlite_where=sa.text('is_moderator = true')
+    )
+    op.create_index(
+        'ix_broadcasts_unfinished', 'broadcasts', ['id'],
+        postgresql_where=sa.text("status <> 'finished'"),
+        sqlite_where=sa.text("status <> 'finished'")
+    )
+    # Очистка брошенных состояний FSM
+    op.create_index('ix_fsm_states_updated_at', 'fsm_states', ['updated_at'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_fsm_states_updated_at', table_name='fsm_states')
+    op.drop_index('ix_broadcasts_unfinished', table_name='broadcasts')
+    op.drop_index('ix_users_moderators', table_name='users')
+    op.drop_index('ix_registrations_event_registered_at', table_name='registrations')
+    op.drop_index('ix_events_date_id', table_name='events')
@@ -0,0 +1,34 @@
+"""extend participants index with id for keyset pagination
+
+Revision ID: 0003_participants_keyset_index
+Revises: 0002_add_indexes
+Create Date: 2026-10-17 15:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0003_participants_keyset_index'
+down_revision: Union[str, None] = '0002_add_indexes'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Страницы участников: WHERE event_id = ? AND (registered_at, id) < (?, ?)
+    # ORDER BY registered_at DESC, id DESC - целиком по индексу
+    op.create_index(
+        'ix_registrations_event_registered_at_id', 'registrations', ['event_id', 'registered_at', 'id']
+    )
+    op.drop_index('ix_registrations_event_registered_at', table_name='registrations')
+
+
+def downgrade() -> None:
+    op.create_index(
+        'ix_registrations_event_registered_at', 'registrations', ['event_id', 'registered_at']
+    )
+    op.drop_index('ix_registrations_event_registered_at_id', table_name='registrations')
@@ -0,0 +1,28 @@
+"""add events.version for the event card cache
+
+Revision ID: 0005_event_version
+Revises: 0004_sent_reminders
+Create Date: 2026-10-17 17:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0005_event_version'
+down_revision: Union[str, None] = '0004_sent_reminders'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table('events') as batch_op:
+        batch_op.add_column(sa.Column('version', sa.Integer(), nullable=False, server_default='1'))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('events') as batch_op:
+        batch_op.drop_column('version')
@@ -0,0 +1,35 @@
+"""add image_files table with cached Telegram file_ids
+
+Revision ID: 0006_image_files
+Revises: 0005_event_version
+Create Date: 2026-10-17 18:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0006_image_files'
+down_revision: Union[str, None] = '0005_event_version'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'image_files',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('source', sa.String(length=255), nullable=False),
+        sa.Column('size', sa.String(length=20), nullable=False),
+        sa.Column('file_id', sa.String(length=255), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('source', 'size', name='uq_image_files_source_size')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('image_files')
@@ -0,0 +1,39 @@
+"""add registration_cancellations log
+
+Revision ID: 0007_registration_cancellations
+Revises: 0006_image_files
+Create Date: 2026-10-17 20:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0007_registration_cancellations'
+down_revision: Union[str, None] = '0006_image_files'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'registration_cancellations',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('event_id', sa.Integer(), nullable=False),
+        sa.Column('registered_at', sa.DateTime(), nullable=True),
+        sa.Column('cancelled_at', sa.DateTime(), nullable=True),
+        sa.Column('source', sa.String(length=20), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(
+        'ix_registration_cancellations_event_id', 'registration_cancellations', ['event_id']
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_registration_cancellations_event_id', table_name='registration_cancellations')
+    op.drop_table('registration_cancellations')
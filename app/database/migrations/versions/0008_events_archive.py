@@ -0,0 +1,70 @@
+"""add events_archive and registrations_archive tables
+
+Revision ID: 0008_events_archive
+Revises: 0007_registration_cancellations
+Create Date: 2026-10-17 22:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0008_events_archive'
+down_revision: Union[str, None] = '0007_registration_cancellations'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'events_archive',
+        sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column('title', sa.String(length=255), nullable=False),
+        sa.Column('short_description', sa.Text(), nullable=True),
+        sa.Column('full_description', sa.Text(), nullable=True),
+        sa.Column('date', sa.DateTime(), nullable=False),
+        sa.Column('location', sa.String(length=255), nullable=True),
+        sa.Column('speakers', sa.Text(), nullable=True),
+        sa.Column('image_path', sa.String(length=255), nullable=True),
+        sa.Column('registration_required', sa.Boolean(), nullable=True),
+        sa.Column('max_participants', sa.Integer(), nullable=True),
+        sa.Column('registered_count', sa.Integer(), nullable=False),
+        sa.Column('version', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('archived_at', sa.DateTime(), nullable=True),
+        sa.Column('deleted_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_events_archive_date_id', 'events_archive', ['date', 'id'])
+
+    op.create_table(
+        'registrations_archive',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('event_id', sa.Integer(), nullable=False),
+        sa.Column('registered_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['event_id'], ['events_archive.id']),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id']),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_registrations_archive_event_id', 'registrations_archive', ['event_id'])
+    op.create_index('ix_registrations_archive_user_id', 'registrations_archive', ['user_id'])
+
+    if op.get_bind().dialect.name == 'sqlite':
+        # Без AUTOINCREMENT SQLite выдаёт id удалённой последней записи повторно,
+        # а id перенесённых в архив мероприятий должны оставаться уникальными
+        with op.batch_alter_table(
+            'events', recreate='always', table_kwargs={'sqlite_autoincrement': True}
+        ):
+            pass
+
+
+def downgrade() -> None:
+    op.drop_index('ix_registrations_archive_user_id', table_name='registrations_archive')
+    op.drop_index('ix_registrations_archive_event_id', table_name='registrations_archive')
+    op.drop_table('registrations_archive')
+    op.drop_index('ix_events_archive_date_id', table_name='events_archive')
+    op.drop_table('events_archive')
@@ -0,0 +1,73 @@
+"""add full-text search index for events
+
+Revision ID: 0009_event_search
+Revises: 0008_events_archive
+Create Date: 2026-10-17 23:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0009_event_search'
+down_revision: Union[str, None] = '0008_events_archive'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Должно совпадать с SEARCH_DOCUMENT в app/utils/search.py, иначе PostgreSQL не использует индекс
+SEARCH_DOCUMENT = (
+    "to_tsvector('russian', "
+    "coalesce(title, '') || ' ' || coalesce(short_description, '') || ' ' || "
+    "coalesce(full_description, '') || ' ' || coalesce(location, '') || ' ' || coalesce(speakers, ''))"
+)
+
+FTS_COLUMNS = "title, short_description, full_description, location, speakers"
+
+
+def upgrade() -> None:
+    if op.get_bind().dialect.name == 'postgresql':
+        op.execute(f"CREATE INDEX ix_events_search ON events USING gin ({SEARCH_DOCUMENT})")
+        return
+
+    # SQLite: внешний FTS5-индекс над events, синхронизируется триггерами
+    op.execute(
+        f"CREATE VIRTUAL TABLE events_fts USING fts5("
+        f"{FTS_COLUMNS}, content='events', content_rowid='id', "
+        f"tokenize='unicode61 remove_diacritics 2')"
+    )
+    op.execute(
+        f"CREATE TRIGGER events_fts_insert AFTER INSERT ON events BEGIN "
+        f"INSERT INTO events_fts(rowid, {FTS_COLUMNS}) "
+        f"VALUES (new.id, new.title, new.short_description, new.full_description, new.location, new.speakers); "
+        f"END"
+    )
+    op.execute(
+        f"CREATE TRIGGER events_fts_delete AFTER DELETE ON events BEGIN "
+        f"INSERT INTO events_fts(events_fts, rowid, {FTS_COLUMNS}) "
+        f"VALUES ('delete', old.id, old.title, old.short_description, old.full_description, old.location, old.speakers); "
+        f"END"
+    )
+    # Только при изменении индексируемых полей: регистрации меняют registered_count и version
+    op.execute(
+        f"CREATE TRIGGER events_fts_update AFTER UPDATE OF {FTS_COLUMNS} ON events BEGIN "
+        f"INSERT INTO events_fts(events_fts, rowid, {FTS_COLUMNS}) "
+        f"VALUES ('delete', old.id, old.title, old.short_description, old.full_description, old.location, old.speakers); "
+        f"INSERT INTO events_fts(rowid, {FTS_COLUMNS}) "
+        f"VALUES (new.id, new.title, new.short_description, new.full_description, new.location, new.speakers); "
+        f"END"
+    )
+    # Индексируем уже существующие мероприятия
+    op.execute("INSERT INTO events_fts(events_fts) VALUES ('rebuild')")
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name == 'postgresql':
+        op.execute("DROP INDEX ix_events_search")
+        return
+
+    op.execute("DROP TRIGGER events_fts_update")
+    op.execute("DROP TRIGGER events_fts_delete")
+    op.execute("DROP TRIGGER events_fts_insert")
+    op.execute("DROP TABLE events_fts")
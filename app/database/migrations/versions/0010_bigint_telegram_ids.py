@@ -0,0 +1,33 @@
+"""store telegram ids as bigint
+
+Revision ID: 0010_bigint_telegram_ids
+Revises: 0009_event_search
+Create Date: 2026-10-18 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0010_bigint_telegram_ids'
+down_revision: Union[str, None] = '0009_event_search'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # id пользователей Telegram уже не помещаются в 32 бита
+    with op.batch_alter_table('users') as batch_op:
+        batch_op.alter_column('telegram_id', existing_type=sa.Integer(), type_=sa.BigInteger(), existing_nullable=False)
+    with op.batch_alter_table('broadcasts') as batch_op:
+        batch_op.alter_column('admin_id', existing_type=sa.Integer(), type_=sa.BigInteger(), existing_nullable=True)
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('broadcasts') as batch_op:
+        batch_op.alter_column('admin_id', existing_type=sa.BigInteger(), type_=sa.Integer(), existing_nullable=True)
+    with op.batch_alter_table('users') as batch_op:
+        batch_op.alter_column('telegram_id', existing_type=sa.BigInteger(), type_=sa.Integer(), existing_nullable=False)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, Boolean, ForeignKey
+from sqlalchemy import Column, Integer, BigInteger, String, Text, DateTime, Boolean, ForeignKey, UniqueConstraint, Index, text
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 from datetime import datetime
@@ -7,9 +7,17 @@ Base = declarative_base()
 
 class User(Base):
     __tablename__ = "users"
+    __table_args__ = (
+        # Список модераторов в админке
+        Index(
+            "ix_users_moderators", "id",
+            postgresql_where=text("is_moderator = true"),
+            sqlite_where=text("is_moderator = true")
+        ),
+    )
     
     id = Column(Integer, primary_key=True)
-    telegram_id = Column(Integer, unique=True, nullable=False)
+    telegram_id = Column(BigInteger, unique=True, nullable=False)
     username = Column(String(255))
     first_name = Column(String(255))
     last_name = Column(String(255))
@@ -20,6 +28,12 @@ class User(Base):
 
 class Event(Base):
     __tablename__ = "events"
+    __table_args__ = (
+        # Списки предстоящих мероприятий: Event.date >= now() ORDER BY date
+        Index("ix_events_date_id", "date", "id"),
+        # id переезжают в events_archive, поэтому не должны выдаваться повторно и в SQLite
+        {"sqlite_autoincrement": True},
+    )
     
     id = Column(Integer, primary_key=True)
     title = Column(String(255), nullable=False)
@@ -31,12 +45,20 @@ class Event(Base):
     image_path = Column(String(255))
     registration_required = Column(Boolean, default=True)
     max_participants = Column(Integer)
+    registered_count = Column(Integer, nullable=False, default=0, server_default="0")  # денормализованное число регистраций
+    version = Column(Integer, nullable=False, default=1, server_default="1")  # растёт при каждом изменении (кэш карточек)
     created_at = Column(DateTime, default=datetime.utcnow)
     
     registrations = relationship("Registration", back_populates="event")
 
 class Registration(Base):
     __tablename__ = "registrations"
+    __table_args__ = (
+        # Покрывает и поиск регистраций пользователя (user_id - первая колонка)
+        UniqueConstraint("user_id", "event_id", name="uq_registrations_user_event"),
+        # Участники мероприятия по дате регистрации (id - для keyset-пагинации)
+        Index("ix_registrations_event_registered_at_id", "event_id", "registered_at", "id"),
+    )
     
     id = Column(Integer, primary_key=True)
     user_id = Column(Integer, ForeignKey("users.id"))
@@ -44,4 +66,130 @@ class Registration(Base):
     registered_at = Column(DateTime, default=datetime.utcnow)
     
     user = relationship("User")
-    event = relationship("Event", back_populates="registrations")
\ No newline at end of file
+    event = relationship("Event", back_populates="registrations")
+
+class Broadcast(Base):
+    __tablename__ = "broadcasts"
+    __table_args__ = (
+        # Незавершённые рассылки, которые нужно возобновить при старте
+        Index(
+            "ix_broadcasts_unfinished", "id",
+            postgresql_where=text("status <> 'finished'"),
+            sqlite_where=text("status <> 'finished'")
+        ),
+    )
+    
+    id = Column(Integer, primary_key=True)
+    text = Column(Text, nullable=False)
+    event_id = Column(Integer)  # мероприятие для кнопки регистрации (необязательно)
+    admin_id = Column(BigInteger)  # telegram_id автора рассылки
+    status = Column(String(20), default="pending")  # pending / running / finished
+    last_user_id = Column(Integer, default=0)  # последний обработанный User.id
+    sent_count = Column(Integer, default=0)
+    failed_count = Column(Integer, default=0)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    finished_at = Column(DateTime)
+
+class FSMRecord(Base):
+    __tablename__ = "fsm_states"
+    __table_args__ = (
+        Index("ix_fsm_states_updated_at", "updated_at"),
+    )
+    
+    key = Column(String(255), primary_key=True)  # bot_id:chat_id:user_id:thread_id:destiny
+    state = Column(String(255))
+    data = Column(Text)  # JSON string
+    updated_at = Column(DateTime, default=datetime.utcnow)
+
+class WaitlistEntry(Base):
+    __tablename__ = "waitlist"
+    __table_args__ = (
+        UniqueConstraint("user_id", "event_id", name="uq_waitlist_user_event"),
+        # Очередь по мероприятию читается по возрастанию position
+        UniqueConstraint("event_id", "position", name="uq_waitlist_event_position"),
+    )
+    
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    event_id = Column(Integer, ForeignKey("events.id"), nullable=False)
+    position = Column(Integer, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    
+    user = relationship("User")
+    event = relationship("Event")
+
+class SentReminder(Base):
+    __tablename__ = "sent_reminders"
+    __table_args__ = (
+        # Одно напоминание каждого вида на участника; по этому же индексу отсекаются уже отправленные
+        UniqueConstraint("event_id", "user_id", "hours", name="uq_sent_reminders_event_user_hours"),
+    )
+    
+    id = Column(Integer, primary_key=True)
+    event_id = Column(Integer, ForeignKey("events.id"), nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    hours = Column(Integer, nullable=False)  # за сколько часов до начала
+    sent_at = Column(DateTime, default=datetime.utcnow)
+
+class ImageFile(Base):
+    __tablename__ = "image_files"
+    __table_args__ = (
+        UniqueConstraint("source", "size", name="uq_image_files_source_size"),
+    )
+    
+    id = Column(Integer, primary_key=True)
+    source = Column(String(255), nullable=False)  # путь к исходному изображению (Event.image_path)
+    size = Column(String(20), nullable=False)  # название размера из app/utils/images.py
+    file_id = Column(String(255), nullable=False)  # file_id уже загруженной в Telegram версии
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+class RegistrationCancellation(Base):
+    __tablename__ = "registration_cancellations"
+    __table_args__ = (
+        # Аналитика отмен по мероприятию
+        Index("ix_registration_cancellations_event_id", "event_id"),
+    )
+    
+    # Журнал только пополняется; без внешних ключей, чтобы переживать удаление мероприятий
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, nullable=False)
+    event_id = Column(Integer, nullable=False)
+    registered_at = Column(DateTime)  # когда была сделана отменённая регистрация
+    cancelled_at = Column(DateTime, default=datetime.utcnow)
+    source = Column(String(20))  # откуда отменили: profile / event
+
+class EventArchive(Base):
+    __tablename__ = "events_archive"
+    __table_args__ = (
+        # Выгрузки по архиву: последние мероприятия по дате
+        Index("ix_events_archive_date_id", "date", "id"),
+    )
+    
+    # Завершившиеся и удалённые мероприятия переносятся сюда из events с тем же id (app/utils/archive.py)
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    title = Column(String(255), nullable=False)
+    short_description = Column(Text)
+    full_description = Column(Text)
+    date = Column(DateTime, nullable=False)
+    location = Column(String(255))
+    speakers = Column(Text)
+    image_path = Column(String(255))
+    registration_required = Column(Boolean)
+    max_participants = Column(Integer)
+    registered_count = Column(Integer, nullable=False, default=0)
+    version = Column(Integer, nullable=False, default=1)
+    created_at = Column(DateTime)
+    archived_at = Column(DateTime, default=datetime.utcnow)
+    deleted_at = Column(DateTime)  # удалено админом; None - мероприятие просто завершилось
+
+class RegistrationArchive(Base):
+    __tablename__ = "registrations_archive"
+    __table_args__ = (
+        Index("ix_registrations_archive_event_id", "event_id"),
+        Index("ix_registrations_archive_user_id", "user_id"),
+    )
+    
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    event_id = Column(Integer, ForeignKey("events_archive.id"), nullable=False)
+    registered_at = Column(DateTime)
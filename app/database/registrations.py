@@ -0,0 +1,205 @@
+from datetime import datetime
+
+from typing import Optional
+
+from sqlalchemy import select, insert, update, delete, or_, and_, func, literal, exists
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database.database import engine, dialect_insert
+from app.database.models import Event, Registration, RegistrationCancellation, WaitlistEntry
+
+# Результаты регистрации
+REGISTERED = "registered"
+ALREADY_REGISTERED = "already_registered"
+EVENT_FULL = "event_full"
+EVENT_NOT_FOUND = "event_not_found"
+
+
+def _take_seat(event_id: int):
+    """UPDATE, занимающий место, только если лимит участников ещё не достигнут"""
+    return (
+        update(Event)
+        .where(
+            Event.id == event_id,
+            or_(Event.max_participants.is_(None), Event.registered_count < Event.max_participants)
+        )
+        .values(registered_count=Event.registered_count + 1)
+        .returning(Event.id)
+    )
+
+
+async def register_user(db: AsyncSession, user_id: int, event_id: int) -> str:
+    """
+    Зарегистрировать пользователя на мероприятие и зафиксировать транзакцию.
+    Место занимается атомарно (счётчик registered_count не превышает max_participants),
+    повторная регистрация отсекается уникальным ограничением (user_id, event_id).
+    """
+    insert_stmt = dialect_insert(Registration.__table__)
+
+    if engine.dialect.name == "postgresql":
+        # Один запрос: UPDATE счётчика в CTE и INSERT регистрации только при занятом месте
+        seat = _take_seat(event_id).cte("seat")
+        stmt = (
+            insert_stmt
+            .add_cte(seat)
+            .from_select(
+                ["user_id", "event_id", "registered_at"],
+                select(literal(user_id), seat.c.id, literal(datetime.utcnow()))
+            )
+            .on_conflict_do_nothing(index_elements=["user_id", "event_id"])
+            .returning(Registration.id)
+        )
+        registration_id = (await db.execute(stmt)).scalar_one_or_none()
+    else:
+        # SQLite не поддерживает изменяющие запросы в CTE - те же шаги внутри одной транзакции
+        registration_id = None
+        if (await db.execute(_take_seat(event_id))).scalar_one_or_none():
+            stmt = (
+                insert_stmt
+                .values(user_id=user_id, event_id=event_id, registered_at=datetime.utcnow())
+                .on_conflict_do_nothing(index_elements=["user_id", "event_id"])
+                .returning(Registration.id)
+            )
+            registration_id = (await db.execute(stmt)).scalar_one_or_none()
+
+    if registration_id:
+        await db.commit()
+        return REGISTERED
+
+    # Откатываем занятое место, если регистрация уже существовала, и выясняем причину отказа
+    await db.rollback()
+    existing = await db.execute(
+        select(Registration.id).where(
+            and_(Registration.user_id == user_id, Registration.event_id == event_id)
+        )
+    )
+    if existing.scalar_one_or_none():
+        return ALREADY_REGISTERED
+
+    event = await db.execute(select(Event.id).where(Event.id == event_id))
+    if event.scalar_one_or_none() is None:
+        return EVENT_NOT_FOUND
+    return EVENT_FULL
+
+
+async def cancel_registration(db: AsyncSession, user_id: int, event_id: int, source: str) -> bool:
+    """
+    Отменить регистрацию и зафиксировать транзакцию: регистрация удаляется, место возвращается
+    (registered_count уменьшается), отмена записывается в журнал registration_cancellations.
+    False - регистрации не было.
+    """
+    now = datetime.utcnow()
+    removed_stmt = (
+        delete(Registration)
+        .where(and_(Registration.user_id == user_id, Registration.event_id == event_id))
+        .returning(Registration.registered_at)
+    )
+    log_stmt = insert(RegistrationCancellation.__table__)
+
+    if engine.dialect.name == "postgresql":
+        # Один запрос: DELETE и UPDATE счётчика в CTE, INSERT в журнал - только если регистрация была
+        removed = removed_stmt.cte("removed")
+        seat = (
+            update(Event)
+            .where(Event.id == event_id, Event.registered_count > 0, exists(select(removed.c.registered_at)))
+            .values(registered_count=Event.registered_count - 1)
+            .returning(Event.id)
+            .cte("seat")
+        )
+        stmt = (
+            log_stmt
+            .add_cte(removed, seat)
+            .from_select(
+                ["user_id", "event_id", "registered_at", "cancelled_at", "source"],
+                select(literal(user_id), literal(event_id), removed.c.registered_at, literal(now), literal(source))
+            )
+            .returning(RegistrationCancellation.id)
+        )
+        cancelled = (await db.execute(stmt)).scalar_one_or_none() is not None
+    else:
+        # SQLite не поддерживает изменяющие запросы в CTE - те же шаги внутри одной транзакции
+        removed = (await db.execute(removed_stmt)).first()
+        cancelled = removed is not None
+        if cancelled:
+            await db.execute(
+                update(Event)
+                .where(Event.id == event_id, Event.registered_count > 0)
+                .values(registered_count=Event.registered_count - 1)
+            )
+            await db.execute(log_stmt.values(
+                user_id=user_id,
+                event_id=event_id,
+                registered_at=removed.registered_at,
+                cancelled_at=now,
+                source=source
+            ))
+
+    if not cancelled:
+        await db.rollback()
+        return False
+    await db.commit()
+    return True
+
+
+async def join_waitlist(db: AsyncSession, user_id: int, event_id: int) -> Optional[int]:
+    """
+    Поставить пользователя в конец листа ожидания и вернуть его место в очереди.
+    Позиция берётся как MAX(position) + 1 по индексу (event_id, position);
+    при одновременной записи двух пользователей уникальное ограничение заставляет повторить попытку.
+    """
+    for _ in range(3):
+        existing = await waitlist_position(db, user_id, event_id)
+        if existing:
+            return existing
+
+        next_position = (
+            select(func.coalesce(func.max(WaitlistEntry.position), 0) + 1)
+            .where(WaitlistEntry.event_id == event_id)
+            .scalar_subquery()
+        )
+        try:
+            await db.execute(
+                dialect_insert(WaitlistEntry.__table__).values(
+                    user_id=user_id,
+                    event_id=event_id,
+                    position=next_position,
+                    created_at=datetime.utcnow()
+                )
+            )
+            await db.commit()
+        except IntegrityError:
+            await db.rollback()
+            continue
+        return await waitlist_position(db, user_id, event_id)
+    return None
+
+
+async def leave_waitlist(db: AsyncSession, user_id: int, event_id: int) -> bool:
+    """Убрать пользователя из листа ожидания"""
+    result = await db.execute(
+        delete(WaitlistEntry).where(
+            and_(WaitlistEntry.user_id == user_id, WaitlistEntry.event_id == event_id)
+        )
+    )
+    await db.commit()
+    return result.rowcount > 0
+
+
+async def waitlist_position(db: AsyncSession, user_id: int, event_id: int) -> Optional[int]:
+    """Место пользователя в листе ожидания (начиная с 1) или None, если его там нет"""
+    entry = await db.execute(
+        select(WaitlistEntry.position).where(
+            and_(WaitlistEntry.user_id == user_id, WaitlistEntry.event_id == event_id)
+        )
+    )
+    position = entry.scalar_one_or_none()
+    if position is None:
+        return None
+
+    ahead = await db.execute(
+        select(func.count(WaitlistEntry.id)).where(
+            and_(WaitlistEntry.event_id == event_id, WaitlistEntry.position < position)
+        )
+    )
+    return ahead.scalar() + 1
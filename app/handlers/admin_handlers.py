@@ -1,14 +1,19 @@
 from datetime import datetime
+from typing import Optional
+import html
 import json
+import os
 from aiogram import Router, F
 from aiogram.filters import Command
-from aiogram.types import Message, CallbackQuery, InputFile
+from aiogram.types import Message, CallbackQuery, FSInputFile
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
-from sqlalchemy import select, update, delete, and_, func
+from sqlalchemy import select, update, and_, or_, func
 from sqlalchemy.ext.asyncio import AsyncSession
-from app.database.database import get_db
-from app.database.models import User, Event, Registration
+from sqlalchemy.orm import contains_eager
+from app.config import PARTICIPANTS_PER_PAGE
+from app.database.database import get_read_db
+from app.database.models import User, Event, Registration, Broadcast
 from app.keyboards.admin_keyboards import (
     get_admin_main_menu_keyboard,
     get_events_list_keyboard,
@@ -16,13 +21,37 @@ from app.keyboards.admin_keyboards import (
     get_event_form_keyboard,
     get_confirm_keyboard,
     get_moderator_management_keyboard,
+    get_moderator_cancel_keyboard,
     get_broadcast_keyboard,
-    get_export_keyboard
+    get_broadcast_form_keyboard,
+    get_export_keyboard,
+    get_export_format_keyboard,
+    get_export_events_keyboard,
+    get_participants_keyboard,
+    get_participants_search_keyboard
 )
-from app.config import ADMIN_IDS
+from app.utils.broadcast import start_broadcast
+from app.utils.cache import invalidate_events_cache
+from app.utils.event_cards import get_event_card
+from app.utils.images import save_upload, send_cached_photo
+from app.utils.admin_utils import invalidate_role
+from app.utils.archive import move_to_archive, events_with_archive, get_event_with_archive
+from app.utils.profiles import update_event_in_profiles, remove_event_from_profiles
+from app.utils.waitlist import request_promotion
+from app.utils.export import export_participants_file, EXPORT_FORMATS
+from app.utils.pagination import KeysetPaginator
 
 admin_router = Router()
 
+# Сколько последних мероприятий показывать при выборе мероприятия для экспорта
+EXPORT_EVENTS_LIMIT = 30
+
+# Список мероприятий в админке: от новых к старым, по 10 на страницу
+ADMIN_EVENTS_PER_PAGE = 10
+admin_events_paginator = KeysetPaginator(
+    "admin_events_", Event.date, Event.id, ADMIN_EVENTS_PER_PAGE, descending=True
+)
+
 # FSM для создания/редактирования мероприятия
 class EventForm(StatesGroup):
     title = State()
@@ -42,52 +71,50 @@ class BroadcastForm(StatesGroup):
     with_registration = State()
     confirm = State()
 
-# Проверка на админа/модератора
-async def is_admin_or_moderator(user_id: int) -> bool:
-    async for db in get_db():
-        user = await db.execute(select(User).where(User.telegram_id == user_id))
-        user = user.scalar_one_or_none()
-        if user and (user.is_admin or user.is_moderator):
-            return True
-        if user_id in ADMIN_IDS:
-            return True
-    return False
+# FSM для управления модераторами
+class ModeratorForm(StatesGroup):
+    add = State()
+    remove = State()
+
+# FSM для поиска участников мероприятия
+class ParticipantSearchForm(StatesGroup):
+    query = State()
 
 # Команда /admin
 @admin_router.message(Command("admin"))
-async def admin_panel(message: Message):
-    if not await is_admin_or_moderator(message.from_user.id):
+async def admin_panel(message: Message, role: Optional[str] = None):
+    if not role:
         await message.answer("⛔️ Доступ запрещён.")
         return
     await message.answer("🛠 Админ-панель:", reply_markup=get_admin_main_menu_keyboard())
 
 # Список мероприятий
-@admin_router.callback_query(F.data == "admin_events")
-async def list_events(callback: CallbackQuery):
-    if not await is_admin_or_moderator(callback.from_user.id):
+@admin_router.callback_query(F.data.startswith("admin_events"))
+async def list_events(callback: CallbackQuery, db: AsyncSession, role: Optional[str] = None):
+    if not role:
         await callback.answer("⛔️ Доступ запрещён.", show_alert=True)
         return
     
-    async for db in get_db():
-        events = await db.execute(select(Event).order_by(Event.date.desc()))
-        events = events.scalars().all()
-        
-        if not events:
-            await callback.message.edit_text(
-                "📅 Мероприятия не найдены. Создайте новое мероприятие!",
-                reply_markup=get_events_list_keyboard([])
-            )
-        else:
-            await callback.message.edit_text(
-                "📅 Список мероприятий:",
-                reply_markup=get_events_list_keyboard(events)
-            )
+    page = await admin_events_paginator.fetch(
+        db, select(Event), admin_events_paginator.decode(callback.data)
+    )
+    
+    if not page.items:
+        await callback.message.edit_text(
+            "📅 Мероприятия не найдены. Создайте новое мероприятие!",
+            reply_markup=get_events_list_keyboard([])
+        )
+    else:
+        await callback.message.edit_text(
+            "📅 Список мероприятий:",
+            reply_markup=get_events_list_keyboard(page.items, page.prev_data, page.next_data)
+        )
     await callback.answer()
 
 # Начало создания мероприятия
 @admin_router.callback_query(F.data == "create_event")
-async def start_event_creation(callback: CallbackQuery, state: FSMContext):
-    if not await is_admin_or_moderator(callback.from_user.id):
+async def start_event_creation(callback: CallbackQuery, state: FSMContext, role: Optional[str] = None):
+    if not role:
         await callback.answer("⛔️ Доступ запрещён.", show_alert=True)
         return
     
@@ -168,6 +195,14 @@ async def skip_optional_field(callback: CallbackQuery, state: FSMContext):
             reply_markup=get_confirm_keyboard('create_event')
         )
         await state.set_state(EventForm.confirm)
+    elif current_state == BroadcastForm.with_registration.state:
+        await state.update_data(event_id=None)
+        data = await state.get_data()
+        await callback.message.edit_text(
+            format_broadcast_preview(data),
+            reply_markup=get_confirm_keyboard('broadcast')
+        )
+        await state.set_state(BroadcastForm.confirm)
     
     await callback.answer()
 
@@ -241,11 +276,37 @@ async def process_speakers(message: Message, state: FSMContext):
         reply_markup=get_event_form_keyboard(with_skip=True)
     )
 
+# Загрузка изображения мероприятия: фото или картинка, присланная файлом (без сжатия Telegram)
+async def upload_event_image(message: Message) -> Optional[str]:
+    if message.photo:
+        file_id = message.photo[-1].file_id
+    elif message.document and (message.document.mime_type or "").startswith("image/"):
+        file_id = message.document.file_id
+    else:
+        await message.answer("❌ Отправьте фото или файл с изображением (JPG, PNG и т.п.)")
+        return None
+    
+    try:
+        path = await save_upload(message.bot, file_id)
+    except Exception:
+        await message.answer("❌ Не удалось обработать изображение, попробуйте другое")
+        return None
+    
+    # Превью сразу загружает сжатую версию, и её file_id достаётся пользователям без повторной загрузки
+    await send_cached_photo(
+        path,
+        lambda media: message.answer_photo(media, caption="🖼 Так изображение будет выглядеть в карточке")
+    )
+    return path
+
 # Получение изображения
 @admin_router.message(EventForm.image_path)
 async def process_image(message: Message, state: FSMContext):
-    if message.photo:
-        await state.update_data(image_path=message.photo[-1].file_id)
+    if message.photo or message.document:
+        image_path = await upload_event_image(message)
+        if not image_path:
+            return
+        await state.update_data(image_path=image_path)
     await state.set_state(EventForm.registration_required)
     await message.answer(
         "❓ Требуется ли регистрация? (да/нет):",
@@ -299,23 +360,23 @@ async def process_max_participants(message: Message, state: FSMContext):
 
 # Подтверждение создания мероприятия
 @admin_router.callback_query(F.data == "confirm_create_event")
-async def confirm_event_creation(callback: CallbackQuery, state: FSMContext):
+async def confirm_event_creation(callback: CallbackQuery, db: AsyncSession, state: FSMContext):
     data = await state.get_data()
     
-    async for db in get_db():
-        new_event = Event(
-            title=data['title'],
-            short_description=data.get('short_description'),
-            full_description=data.get('full_description'),
-            date=data['date'],
-            location=data.get('location'),
-            speakers=data.get('speakers'),
-            image_path=data.get('image_path'),
-            registration_required=data['registration_required'],
-            max_participants=data.get('max_participants')
-        )
-        db.add(new_event)
-        await db.commit()
+    new_event = Event(
+        title=data['title'],
+        short_description=data.get('short_description'),
+        full_description=data.get('full_description'),
+        date=data['date'],
+        location=data.get('location'),
+        speakers=data.get('speakers'),
+        image_path=data.get('image_path'),
+        registration_required=data['registration_required'],
+        max_participants=data.get('max_participants')
+    )
+    db.add(new_event)
+    await db.commit()
+    invalidate_events_cache()
     
     await callback.message.edit_text(
         "✅ Мероприятие успешно создано!",
@@ -336,75 +397,51 @@ async def cancel_event_creation(callback: CallbackQuery, state: FSMContext):
 
 # Управление конкретным мероприятием
 @admin_router.callback_query(F.data.startswith("manage_event_"))
-async def manage_event(callback: CallbackQuery):
-    if not await is_admin_or_moderator(callback.from_user.id):
+async def manage_event(callback: CallbackQuery, db: AsyncSession, role: Optional[str] = None, event_id: Optional[int] = None):
+    if not role:
         await callback.answer("⛔️ Доступ запрещён.", show_alert=True)
         return
     
-    event_id = int(callback.data.split("_")[-1])
-    async for db in get_db():
-        event = await db.execute(select(Event).where(Event.id == event_id))
-        event = event.scalar_one_or_none()
-        
-        if not event:
-            await callback.answer("❌ Мероприятие не найдено", show_alert=True)
-            return
-        
-        event_date = event.date.strftime("%d.%m.%Y %H:%M")
-        text = f"📅 Мероприятие: {event.title}\n"
-        text += f"📅 Дата: {event_date}\n"
-        if event.location:
-            text += f"📍 Место: {event.location}\n"
-        if event.speakers:
-            try:
-                speakers = json.loads(event.speakers)
-                text += f"👥 Спикеры: {', '.join(speakers)}\n"
-            except:
-                text += f"👥 Спикеры: {event.speakers}\n"
-        
-        # Получаем количество участников
-        reg_count = await db.execute(
-            select(func.count(Registration.id)).where(Registration.event_id == event_id)
-        )
-        participants_count = reg_count.scalar()
-        text += f"\n👥 Зарегистрировано участников: {participants_count}"
-        if event.max_participants:
-            text += f" из {event.max_participants}"
-        
-        await callback.message.edit_text(
-            text,
-            reply_markup=get_event_management_keyboard(event_id)
-        )
+    if event_id is None:
+        event_id = int(callback.data.split("_")[-1])
+    event = await db.execute(select(Event).where(Event.id == event_id))
+    event = event.scalar_one_or_none()
+    
+    if not event:
+        await callback.answer("❌ Мероприятие не найдено", show_alert=True)
+        return
+    
+    await callback.message.edit_text(
+        get_event_card(event).manage_text(event.registered_count),
+        reply_markup=get_event_management_keyboard(event_id)
+    )
     await callback.answer()
 
 # Удаление мероприятия
 @admin_router.callback_query(F.data.startswith("delete_event_"))
-async def delete_event_prompt(callback: CallbackQuery):
+async def delete_event_prompt(callback: CallbackQuery, db: AsyncSession):
     event_id = int(callback.data.split("_")[-1])
-    async for db in get_db():
-        event = await db.execute(select(Event).where(Event.id == event_id))
-        event = event.scalar_one_or_none()
-        
-        if not event:
-            await callback.answer("❌ Мероприятие не найдено", show_alert=True)
-            return
-        
-        await callback.message.edit_text(
-            f"❓ Вы действительно хотите удалить мероприятие '{event.title}'?",
-            reply_markup=get_confirm_keyboard('delete_event', event_id)
-        )
+    event = await db.execute(select(Event).where(Event.id == event_id))
+    event = event.scalar_one_or_none()
+    
+    if not event:
+        await callback.answer("❌ Мероприятие не найдено", show_alert=True)
+        return
+    
+    await callback.message.edit_text(
+        f"❓ Вы действительно хотите удалить мероприятие '{event.title}'?",
+        reply_markup=get_confirm_keyboard('delete_event', event_id)
+    )
     await callback.answer()
 
 # Подтверждение удаления мероприятия
 @admin_router.callback_query(F.data.startswith("confirm_delete_event_"))
-async def confirm_delete_event(callback: CallbackQuery):
+async def confirm_delete_event(callback: CallbackQuery, db: AsyncSession):
     event_id = int(callback.data.split("_")[-1])
-    async for db in get_db():
-        # Удаляем все регистрации
-        await db.execute(delete(Registration).where(Registration.event_id == event_id))
-        # Удаляем мероприятие
-        await db.execute(delete(Event).where(Event.id == event_id))
-        await db.commit()
+    # Мягкое удаление: мероприятие и регистрации переносятся в архив с отметкой об удалении
+    await move_to_archive(db, [event_id], deleted=True)
+    invalidate_events_cache()
+    remove_event_from_profiles(event_id)
     
     await callback.message.edit_text(
         "✅ Мероприятие успешно удалено",
@@ -414,14 +451,13 @@ async def confirm_delete_event(callback: CallbackQuery):
 
 # Отмена удаления мероприятия
 @admin_router.callback_query(F.data.startswith("cancel_delete_event_"))
-async def cancel_delete_event(callback: CallbackQuery):
-    event_id = int(callback.data.split("_")[-1])
-    await manage_event(callback)
+async def cancel_delete_event(callback: CallbackQuery, db: AsyncSession, role: Optional[str] = None):
+    await manage_event(callback, db, role)
 
 # Возврат в главное меню админа
 @admin_router.callback_query(F.data == "admin_main_menu")
-async def return_to_admin_menu(callback: CallbackQuery):
-    if not await is_admin_or_moderator(callback.from_user.id):
+async def return_to_admin_menu(callback: CallbackQuery, role: Optional[str] = None):
+    if not role:
         await callback.answer("⛔️ Доступ запрещён.", show_alert=True)
         return
     
@@ -431,152 +467,244 @@ async def return_to_admin_menu(callback: CallbackQuery):
     )
     await callback.answer()
 
-# Просмотр списка участников мероприятия
-@admin_router.callback_query(F.data.startswith("view_participants_"))
-async def view_participants(callback: CallbackQuery):
-    if not await is_admin_or_moderator(callback.from_user.id):
-        await callback.answer("⛔️ Доступ запрещён.", show_alert=True)
-        return
-    
-    event_id = int(callback.data.split("_")[-1])
-    async for db in get_db():
-        # Получаем информацию о мероприятии
-        event = await db.execute(select(Event).where(Event.id == event_id))
-        event = event.scalar_one_or_none()
-        
+# Страница участников мероприятия: новые регистрации сверху, keyset по (registered_at, id)
+async def render_participants_page(event_id: int, search: Optional[str] = None, cursor_data: Optional[str] = None):
+    paginator = KeysetPaginator(
+        f"participants_{event_id}_", Registration.registered_at, Registration.id,
+        PARTICIPANTS_PER_PAGE, descending=True
+    )
+    async for db in get_read_db():
+        event = await db.get(Event, event_id)
         if not event:
-            await callback.answer("❌ Мероприятие не найдено", show_alert=True)
-            return
+            return None
         
-        # Получаем список участников с информацией о пользователях
-        participants = await db.execute(
-            select(Registration, User)
+        query = (
+            select(Registration)
             .join(User, Registration.user_id == User.id)
+            .options(contains_eager(Registration.user))
             .where(Registration.event_id == event_id)
-            .order_by(Registration.registered_at.desc())
         )
-        participants = participants.all()
-        
-        if not participants:
-            text = f"📅 Мероприятие: {event.title}\n\n"
-            text += "👥 Участники отсутствуют"
-        else:
-            text = f"📅 Мероприятие: {event.title}\n\n"
-            text += f"👥 Зарегистрировано участников: {len(participants)}"
-            if event.max_participants:
-                text += f" из {event.max_participants}"
-            text += "\n\n📋 Список участников:\n"
+        if search:
+            # Подстрока в имени, фамилии или username (без учёта регистра)
+            escaped = search.lstrip("@").replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+            pattern = f"%{escaped}%"
+            query = query.where(or_(
+                User.first_name.ilike(pattern, escape="\\"),
+                User.last_name.ilike(pattern, escape="\\"),
+                User.username.ilike(pattern, escape="\\")
+            ))
+        page = await paginator.fetch(db, query, paginator.decode(cursor_data))
+    
+    text = f"📅 Мероприятие: {html.escape(event.title)}\n\n"
+    text += f"👥 Зарегистрировано участников: {event.registered_count}"
+    if event.max_participants:
+        text += f" из {event.max_participants}"
+    text += "\n"
+    if search:
+        text += f"🔍 Поиск: «{html.escape(search)}»\n"
+    
+    if not page.items:
+        text += "\nНикого не найдено" if search else "\nУчастники отсутствуют"
+    else:
+        text += "\n📋 Список участников:\n"
+        for registration in page.items:
+            user = registration.user
+            # Формируем полное имя из first_name и last_name
+            full_name = " ".join(filter(None, [user.first_name, user.last_name]))
+            if full_name:
+                participant_info = html.escape(full_name)
+            else:
+                participant_info = f"@{user.username}" if user.username else f"ID: {user.telegram_id}"
+            if full_name and user.username:
+                participant_info += f" (@{user.username})"
             
-            for i, (registration, user) in enumerate(participants, 1):
-                # Формируем информацию об участнике
-                participant_info = f"{i}. "
-                
-                # Формируем полное имя из first_name и last_name
-                full_name = ""
-                if user.first_name:
-                    full_name += user.first_name
-                if user.last_name:
-                    full_name += f" {user.last_name}"
-                
-                if full_name.strip():
-                    participant_info += full_name.strip()
-                else:
-                    participant_info += f"@{user.username}" if user.username else f"ID: {user.telegram_id}"
-                
-                # Добавляем дату регистрации
-                reg_date = registration.registered_at.strftime("%d.%m.%Y %H:%M")
-                participant_info += f" ({reg_date})"
-                
-                text += participant_info + "\n"
-                
-                # Ограничиваем количество участников в одном сообщении
-                if i >= 50:  # Telegram имеет ограничение на длину сообщения
-                    text += f"\n... и ещё {len(participants) - i} участников"
-                    break
-        
-        # Создаем клавиатуру с возможностью экспорта
-        from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
-        keyboard = InlineKeyboardMarkup(inline_keyboard=[
-            [InlineKeyboardButton(text="📊 Экспорт в CSV", callback_data=f"export_participants_{event_id}")],
-            [InlineKeyboardButton(text="◀️ Назад", callback_data=f"manage_event_{event_id}")]
-        ])
-        
-        await callback.message.edit_text(text, reply_markup=keyboard)
+            reg_date = registration.registered_at.strftime("%d.%m.%Y %H:%M")
+            text += f"• {participant_info} - {reg_date}\n"
+    
+    keyboard = get_participants_keyboard(event_id, page.prev_data, page.next_data, searching=bool(search))
+    return text, keyboard
+
+async def show_participants_page(callback: CallbackQuery, event_id: int, search: Optional[str] = None, cursor_data: Optional[str] = None):
+    rendered = await render_participants_page(event_id, search, cursor_data)
+    if rendered is None:
+        await callback.answer("❌ Мероприятие не найдено", show_alert=True)
+        return
+    
+    text, keyboard = rendered
+    await callback.message.edit_text(text, reply_markup=keyboard)
     await callback.answer()
 
-# Экспорт участников в CSV файл
-@admin_router.callback_query(F.data.startswith("export_participants_"))
-async def export_participants(callback: CallbackQuery):
-    if not await is_admin_or_moderator(callback.from_user.id):
+# Просмотр списка участников мероприятия
+@admin_router.callback_query(F.data.startswith("view_participants_"))
+async def view_participants(callback: CallbackQuery, state: FSMContext, role: Optional[str] = None):
+    if not role:
         await callback.answer("⛔️ Доступ запрещён.", show_alert=True)
         return
     
     event_id = int(callback.data.split("_")[-1])
-    async for db in get_db():
-        # Получаем информацию о мероприятии
-        event = await db.execute(select(Event).where(Event.id == event_id))
-        event = event.scalar_one_or_none()
-        
-        if not event:
-            await callback.answer("❌ Мероприятие не найдено", show_alert=True)
-            return
-        
-        # Получаем список участников
-        participants = await db.execute(
-            select(Registration, User)
-            .join(User, Registration.user_id == User.id)
-            .where(Registration.event_id == event_id)
-            .order_by(Registration.registered_at.desc())
-        )
-        participants = participants.all()
-        
-        if not participants:
-            await callback.answer("❌ Нет участников для экспорта", show_alert=True)
-            return
-        
-        # Создаем CSV контент
-        import io
-        import csv
-        
-        csv_buffer = io.StringIO()
-        csv_writer = csv.writer(csv_buffer)
-        
-        # Заголовки
-        csv_writer.writerow(['№', 'Имя', 'Username', 'Telegram ID', 'Дата регистрации'])
-        
-        # Данные участников
-        for i, (registration, user) in enumerate(participants, 1):
-            # Формируем полное имя
-            full_name = ""
-            if user.first_name:
-                full_name += user.first_name
-            if user.last_name:
-                full_name += f" {user.last_name}"
-            
-            csv_writer.writerow([
-                i,
-                full_name.strip() if full_name.strip() else '',
-                user.username or '',
-                user.telegram_id,
-                registration.registered_at.strftime("%d.%m.%Y %H:%M")
-            ])
-        
-        # Конвертируем в байты для отправки
-        csv_content = csv_buffer.getvalue().encode('utf-8-sig')  # utf-8-sig для корректного отображения в Excel
-        csv_file = io.BytesIO(csv_content)
-        csv_file.name = f"participants_{event.title}_{datetime.now().strftime('%d_%m_%Y')}.csv"
-        
-        # Отправляем файл
-        from aiogram.types import BufferedInputFile
-        document = BufferedInputFile(csv_content, filename=csv_file.name)
-        
+    # Открываем список заново - без поиска
+    await state.set_state(None)
+    await state.update_data(participants_search=None)
+    await show_participants_page(callback, event_id)
+
+# Переход по страницам участников (с учётом активного поиска)
+@admin_router.callback_query(F.data.startswith("participants_"))
+async def participants_page(callback: CallbackQuery, state: FSMContext, role: Optional[str] = None):
+    if not role:
+        await callback.answer("⛔️ Доступ запрещён.", show_alert=True)
+        return
+    
+    event_id = int(callback.data.split("_")[1])
+    search = (await state.get_data()).get("participants_search")
+    query = search["query"] if search and search["event_id"] == event_id else None
+    await show_participants_page(callback, event_id, query, callback.data)
+
+# Поиск участника по имени или username
+@admin_router.callback_query(F.data.startswith("search_participants_"))
+async def start_participants_search(callback: CallbackQuery, state: FSMContext, role: Optional[str] = None):
+    if not role:
+        await callback.answer("⛔️ Доступ запрещён.", show_alert=True)
+        return
+    
+    event_id = int(callback.data.split("_")[-1])
+    await state.set_state(ParticipantSearchForm.query)
+    await state.update_data(participants_event_id=event_id)
+    
+    await callback.message.edit_text(
+        "🔍 Введите имя, фамилию или username участника:",
+        reply_markup=get_participants_search_keyboard(event_id)
+    )
+    await callback.answer()
+
+@admin_router.message(ParticipantSearchForm.query)
+async def process_participants_search(message: Message, state: FSMContext, role: Optional[str] = None):
+    if not role:
+        await message.answer("⛔️ Доступ запрещён.")
+        return
+    
+    if not message.text or not message.text.strip():
+        await message.answer("❌ Введите текст для поиска:")
+        return
+    
+    data = await state.get_data()
+    event_id = data["participants_event_id"]
+    query = message.text.strip()[:64]
+    await state.set_state(None)
+    await state.update_data(participants_search={"event_id": event_id, "query": query})
+    
+    rendered = await render_participants_page(event_id, query)
+    if rendered is None:
+        await message.answer("❌ Мероприятие не найдено")
+        return
+    
+    text, keyboard = rendered
+    await message.answer(text, reply_markup=keyboard)
+
+# Отправка выгрузки участников файлом
+async def send_participants_export(callback: CallbackQuery, event_id: Optional[int], fmt: str, caption: str):
+    await callback.answer("⏳ Формирую файл...")
+    path, filename, rows = await export_participants_file(event_id, fmt)
+    try:
         await callback.message.answer_document(
-            document,
-            caption=f"📊 Список участников мероприятия '{event.title}'\n"
-                   f"Всего участников: {len(participants)}"
+            FSInputFile(path, filename=filename),
+            caption=f"{caption}\nВсего записей: {rows}"
         )
-        
-        await callback.answer("✅ Файл сформирован!")
+    finally:
+        os.remove(path)
+
+# Экспорт участников мероприятия в файл
+@admin_router.callback_query(F.data.startswith("export_participants_"))
+async def export_participants(callback: CallbackQuery, db: AsyncSession, role: Optional[str] = None):
+    if not role:
+        await callback.answer("⛔️ Доступ запрещён.", show_alert=True)
+        return
+    
+    # export_participants_{id} или export_participants_{id}_{format}
+    parts = callback.data.split("_")
+    event_id = int(parts[2])
+    fmt = parts[3] if len(parts) > 3 and parts[3] in EXPORT_FORMATS else "csv"
+    
+    # Получаем информацию о мероприятии (в том числе из архива)
+    event = await get_event_with_archive(db, event_id)
+    
+    if not event:
+        await callback.answer("❌ Мероприятие не найдено", show_alert=True)
+        return
+    
+    if not event.registered_count:
+        await callback.answer("❌ Нет участников для экспорта", show_alert=True)
+        return
+    
+    await send_participants_export(
+        callback, event_id, fmt, f"📊 Список участников мероприятия '{event.title}'"
+    )
+
+# Меню экспорта
+@admin_router.callback_query(F.data == "admin_export")
+async def export_menu(callback: CallbackQuery, role: Optional[str] = None):
+    if not role:
+        await callback.answer("⛔️ Доступ запрещён.", show_alert=True)
+        return
+    
+    await callback.message.edit_text("📊 Экспорт участников:", reply_markup=get_export_keyboard())
+    await callback.answer()
+
+# Выбор формата для экспорта всех участников
+@admin_router.callback_query(F.data == "export_all_participants")
+async def export_all_participants(callback: CallbackQuery, role: Optional[str] = None):
+    if not role:
+        await callback.answer("⛔️ Доступ запрещён.", show_alert=True)
+        return
+    
+    await callback.message.edit_text(
+        "📊 Выберите формат файла:",
+        reply_markup=get_export_format_keyboard("export_all")
+    )
+    await callback.answer()
+
+# Экспорт участников всех мероприятий
+@admin_router.callback_query(F.data.in_({f"export_all_{fmt}" for fmt in EXPORT_FORMATS}))
+async def export_all_participants_file(callback: CallbackQuery, role: Optional[str] = None):
+    if not role:
+        await callback.answer("⛔️ Доступ запрещён.", show_alert=True)
+        return
+    
+    fmt = callback.data.split("_")[-1]
+    await send_participants_export(callback, None, fmt, "📊 Участники всех мероприятий")
+
+# Выбор мероприятия для экспорта
+@admin_router.callback_query(F.data == "export_by_event")
+async def export_by_event(callback: CallbackQuery, db: AsyncSession, role: Optional[str] = None):
+    if not role:
+        await callback.answer("⛔️ Доступ запрещён.", show_alert=True)
+        return
+    
+    # Завершившиеся мероприятия тоже можно выгрузить - они лежат в архиве
+    all_events = events_with_archive()
+    events = await db.execute(
+        select(all_events).order_by(all_events.c.date.desc(), all_events.c.id.desc()).limit(EXPORT_EVENTS_LIMIT)
+    )
+    events = events.all()
+    
+    await callback.message.edit_text(
+        "📊 Выберите мероприятие:" if events else "📅 Мероприятия не найдены",
+        reply_markup=get_export_events_keyboard(events)
+    )
+    await callback.answer()
+
+# Выбор формата для экспорта мероприятия
+@admin_router.callback_query(F.data.startswith("export_event_"))
+async def export_event_format(callback: CallbackQuery, role: Optional[str] = None):
+    if not role:
+        await callback.answer("⛔️ Доступ запрещён.", show_alert=True)
+        return
+    
+    event_id = int(callback.data.split("_")[-1])
+    await callback.message.edit_text(
+        "📊 Выберите формат файла:",
+        reply_markup=get_export_format_keyboard(f"export_participants_{event_id}")
+    )
+    await callback.answer()
 
 
 # FSM для редактирования мероприятия
@@ -588,62 +716,42 @@ class EventEditForm(StatesGroup):
 
 # Начало редактирования мероприятия
 @admin_router.callback_query(F.data.startswith("edit_event_"))
-async def start_edit_event(callback: CallbackQuery, state: FSMContext):
-    if not await is_admin_or_moderator(callback.from_user.id):
+async def start_edit_event(callback: CallbackQuery, db: AsyncSession, state: FSMContext, role: Optional[str] = None):
+    if not role:
         await callback.answer("⛔️ Доступ запрещён.", show_alert=True)
         return
     
     event_id = int(callback.data.split("_")[-1])
-    async for db in get_db():
-        event = await db.execute(select(Event).where(Event.id == event_id))
-        event = event.scalar_one_or_none()
-        
-        if not event:
-            await callback.answer("❌ Мероприятие не найдено", show_alert=True)
-            return
-        
-        # Сохраняем ID мероприятия в состояние
-        await state.update_data(event_id=event_id)
-        await state.set_state(EventEditForm.field)
-        
-        # Формируем текст с текущими данными мероприятия
-        event_date = event.date.strftime("%d.%m.%Y %H:%M")
-        text = f"✏️ Редактирование мероприятия '{event.title}'\n\n"
-        text += "Выберите поле для редактирования:\n\n"
-        text += f"📝 Название: {event.title}\n"
-        text += f"📝 Краткое описание: {event.short_description or 'Не указано'}\n"
-        text += f"📝 Полное описание: {event.full_description or 'Не указано'}\n"
-        text += f"📅 Дата: {event_date}\n"
-        text += f"📍 Место: {event.location or 'Не указано'}\n"
-        
-        if event.speakers:
-            try:
-                speakers = json.loads(event.speakers)
-                text += f"👥 Спикеры: {', '.join(speakers)}\n"
-            except:
-                text += f"👥 Спикеры: {event.speakers}\n"
-        else:
-            text += "👥 Спикеры: Не указаны\n"
-        
-        text += f"✅ Регистрация: {'Требуется' if event.registration_required else 'Не требуется'}\n"
-        text += f"👥 Максимум участников: {event.max_participants or 'Без ограничений'}\n"
-        
-        # Создаем клавиатуру для выбора поля
-        from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
-        keyboard = InlineKeyboardMarkup(inline_keyboard=[
-            [InlineKeyboardButton(text="📝 Название", callback_data="edit_field_title")],
-            [InlineKeyboardButton(text="📝 Краткое описание", callback_data="edit_field_short_description")],
-            [InlineKeyboardButton(text="📝 Полное описание", callback_data="edit_field_full_description")],
-            [InlineKeyboardButton(text="📅 Дата", callback_data="edit_field_date")],
-            [InlineKeyboardButton(text="📍 Место", callback_data="edit_field_location")],
-            [InlineKeyboardButton(text="👥 Спикеры", callback_data="edit_field_speakers")],
-            [InlineKeyboardButton(text="🖼 Изображение", callback_data="edit_field_image")],
-            [InlineKeyboardButton(text="✅ Регистрация", callback_data="edit_field_registration")],
-            [InlineKeyboardButton(text="👥 Макс. участников", callback_data="edit_field_max_participants")],
-            [InlineKeyboardButton(text="◀️ Назад", callback_data=f"manage_event_{event_id}")]
-        ])
-        
-        await callback.message.edit_text(text, reply_markup=keyboard)
+    event = await db.execute(select(Event).where(Event.id == event_id))
+    event = event.scalar_one_or_none()
+    
+    if not event:
+        await callback.answer("❌ Мероприятие не найдено", show_alert=True)
+        return
+    
+    # Сохраняем ID мероприятия в состояние
+    await state.update_data(event_id=event_id)
+    await state.set_state(EventEditForm.field)
+    
+    # Текущие данные мероприятия берём из кэша карточек
+    text = get_event_card(event).edit_text
+    
+    # Создаем клавиатуру для выбора поля
+    from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
+    keyboard = InlineKeyboardMarkup(inline_keyboard=[
+        [InlineKeyboardButton(text="📝 Название", callback_data="edit_field_title")],
+        [InlineKeyboardButton(text="📝 Краткое описание", callback_data="edit_field_short_description")],
+        [InlineKeyboardButton(text="📝 Полное описание", callback_data="edit_field_full_description")],
+        [InlineKeyboardButton(text="📅 Дата", callback_data="edit_field_date")],
+        [InlineKeyboardButton(text="📍 Место", callback_data="edit_field_location")],
+        [InlineKeyboardButton(text="👥 Спикеры", callback_data="edit_field_speakers")],
+        [InlineKeyboardButton(text="🖼 Изображение", callback_data="edit_field_image")],
+        [InlineKeyboardButton(text="✅ Регистрация", callback_data="edit_field_registration")],
+        [InlineKeyboardButton(text="👥 Макс. участников", callback_data="edit_field_max_participants")],
+        [InlineKeyboardButton(text="◀️ Назад", callback_data=f"manage_event_{event_id}")]
+    ])
+    
+    await callback.message.edit_text(text, reply_markup=keyboard)
     await callback.answer()
 
 # Обработка выбора поля для редактирования
@@ -710,6 +818,10 @@ async def process_edit_value(message: Message, state: FSMContext):
     field = data['field']
     value = message.text
     
+    if field == 'image':
+        await process_edit_image(message, state)
+        return
+    
     # Валидация в зависимости от поля
     if field == 'date':
         try:
@@ -776,11 +888,13 @@ async def process_edit_value(message: Message, state: FSMContext):
     )
 
 # Обработка изображения при редактировании
-@admin_router.message(EventEditForm.value, F.photo)
 async def process_edit_image(message: Message, state: FSMContext):
     data = await state.get_data()
     if data['field'] == 'image':
-        value = message.photo[-1].file_id
+        value = await upload_event_image(message)
+        if not value:
+            await message.answer("🖼 Отправьте изображение для мероприятия:")
+            return
         await state.update_data(value=value)
         await state.set_state(EventEditForm.confirm)
         
@@ -791,33 +905,38 @@ async def process_edit_image(message: Message, state: FSMContext):
 
 # Подтверждение редактирования
 @admin_router.callback_query(F.data.startswith("confirm_edit_event_"))
-async def confirm_edit_event(callback: CallbackQuery, state: FSMContext):
+async def confirm_edit_event(callback: CallbackQuery, db: AsyncSession, state: FSMContext):
     data = await state.get_data()
     event_id = data['event_id']
     field = data['field']
     value = data['value']
     
-    async for db in get_db():
-        # Обновляем поле в базе данных
-        field_mapping = {
-            'title': Event.title,
-            'short_description': Event.short_description,
-            'full_description': Event.full_description,
-            'date': Event.date,
-            'location': Event.location,
-            'speakers': Event.speakers,
-            'image': Event.image_path,
-            'registration': Event.registration_required,
-            'max_participants': Event.max_participants
-        }
-        
-        if field in field_mapping:
-            await db.execute(
-                update(Event)
-                .where(Event.id == event_id)
-                .values({field_mapping[field]: value})
-            )
-            await db.commit()
+    # Обновляем поле в базе данных
+    field_mapping = {
+        'title': Event.title,
+        'short_description': Event.short_description,
+        'full_description': Event.full_description,
+        'date': Event.date,
+        'location': Event.location,
+        'speakers': Event.speakers,
+        'image': Event.image_path,
+        'registration': Event.registration_required,
+        'max_participants': Event.max_participants
+    }
+    
+    if field in field_mapping:
+        # Новая версия - карточка мероприятия соберётся заново
+        await db.execute(
+            update(Event)
+            .where(Event.id == event_id)
+            .values({field_mapping[field]: value, Event.version: Event.version + 1})
+        )
+        await db.commit()
+        update_event_in_profiles(event_id, field, value)
+    invalidate_events_cache()
+    if field in ('max_participants', 'registration'):
+        # Лимит мог вырасти - переводим людей из листа ожидания
+        request_promotion()
     
     await callback.message.edit_text(
         "✅ Мероприятие успешно отредактировано!",
@@ -828,15 +947,14 @@ async def confirm_edit_event(callback: CallbackQuery, state: FSMContext):
 
 # Отмена редактирования
 @admin_router.callback_query(F.data == "cancel_edit")
-async def cancel_edit(callback: CallbackQuery, state: FSMContext):
+async def cancel_edit(callback: CallbackQuery, db: AsyncSession, state: FSMContext, role: Optional[str] = None):
     data = await state.get_data()
     event_id = data.get('event_id')
     await state.clear()
     
     if event_id:
-        # Возвращаемся к управлению мероприятием
-        callback.data = f"manage_event_{event_id}"
-        await manage_event(callback)
+        # Возвращаемся к управлению мероприятием (callback.data у aiogram неизменяем - id передаём явно)
+        await manage_event(callback, db, role, event_id)
     else:
         await callback.message.edit_text(
             "❌ Редактирование отменено",
@@ -844,7 +962,202 @@ async def cancel_edit(callback: CallbackQuery, state: FSMContext):
         )
     await callback.answer()
 
-# TODO: Добавить хендлеры для управления модераторами (только для is_admin)
-# TODO: Добавить просмотр списка участников мероприятия
-# TODO: Добавить массовую рассылку с опциональной регистрацией
-# TODO: Добавить экспорт участников в файл
\ No newline at end of file
+# Меню рассылки
+@admin_router.callback_query(F.data == "admin_broadcast")
+async def broadcast_menu(callback: CallbackQuery, db: AsyncSession, role: Optional[str] = None):
+    if not role:
+        await callback.answer("⛔️ Доступ запрещён.", show_alert=True)
+        return
+    
+    users_count = await db.execute(select(func.count(User.id)))
+    users_count = users_count.scalar()
+    
+    await callback.message.edit_text(
+        f"📨 Рассылка\n\nПолучателей: {users_count}",
+        reply_markup=get_broadcast_keyboard()
+    )
+    await callback.answer()
+
+# Начало рассылки
+@admin_router.callback_query(F.data == "start_broadcast")
+async def start_broadcast_form(callback: CallbackQuery, state: FSMContext, role: Optional[str] = None):
+    if not role:
+        await callback.answer("⛔️ Доступ запрещён.", show_alert=True)
+        return
+    
+    await state.set_state(BroadcastForm.text)
+    await callback.message.edit_text(
+        "📝 Введите текст рассылки:",
+        reply_markup=get_broadcast_form_keyboard()
+    )
+    await callback.answer()
+
+# Получение текста рассылки
+@admin_router.message(BroadcastForm.text)
+async def process_broadcast_text(message: Message, state: FSMContext):
+    if not message.text:
+        await message.answer(
+            "❌ Рассылка поддерживает только текст. Введите текст рассылки:",
+            reply_markup=get_broadcast_form_keyboard()
+        )
+        return
+    
+    await state.update_data(text=message.html_text)
+    await state.set_state(BroadcastForm.with_registration)
+    await message.answer(
+        "📝 Введите ID мероприятия, чтобы добавить кнопку регистрации, или нажмите 'Пропустить':",
+        reply_markup=get_broadcast_form_keyboard(with_skip=True)
+    )
+
+# Получение мероприятия для кнопки регистрации
+@admin_router.message(BroadcastForm.with_registration)
+async def process_broadcast_event(message: Message, db: AsyncSession, state: FSMContext):
+    try:
+        event_id = int(message.text)
+    except (TypeError, ValueError):
+        await message.answer(
+            "❌ Введите ID мероприятия числом или нажмите 'Пропустить'",
+            reply_markup=get_broadcast_form_keyboard(with_skip=True)
+        )
+        return
+    
+    event = await db.execute(select(Event).where(Event.id == event_id))
+    event = event.scalar_one_or_none()
+    
+    if not event:
+        await message.answer(
+            "❌ Мероприятие не найдено. Введите другой ID или нажмите 'Пропустить'",
+            reply_markup=get_broadcast_form_keyboard(with_skip=True)
+        )
+        return
+    
+    await state.update_data(event_id=event_id, event_title=event.title)
+    data = await state.get_data()
+    await message.answer(
+        format_broadcast_preview(data),
+        reply_markup=get_confirm_keyboard('broadcast')
+    )
+    await state.set_state(BroadcastForm.confirm)
+
+# Вспомогательная функция для предпросмотра рассылки
+def format_broadcast_preview(data):
+    preview = "📋 Проверьте рассылку:\n\n"
+    preview += f"{data['text']}\n\n"
+    if data.get('event_id'):
+        preview += f"📝 Кнопка регистрации: {data['event_title']}\n"
+    preview += "\nОтправить всем пользователям?"
+    return preview
+
+# Подтверждение рассылки
+@admin_router.callback_query(F.data == "confirm_broadcast")
+async def confirm_broadcast(callback: CallbackQuery, db: AsyncSession, state: FSMContext):
+    data = await state.get_data()
+    if 'text' not in data:
+        await callback.answer("❌ Рассылка не найдена", show_alert=True)
+        return
+    
+    broadcast = Broadcast(
+        text=data['text'],
+        event_id=data.get('event_id'),
+        admin_id=callback.from_user.id
+    )
+    db.add(broadcast)
+    await db.commit()
+    
+    start_broadcast(callback.bot, broadcast.id)
+    
+    await callback.message.edit_text(
+        "🚀 Рассылка запущена. По завершении придёт отчёт.",
+        reply_markup=get_admin_main_menu_keyboard()
+    )
+    await state.clear()
+    await callback.answer()
+
+# Отмена рассылки
+@admin_router.callback_query(F.data == "cancel_broadcast")
+async def cancel_broadcast(callback: CallbackQuery, state: FSMContext):
+    await state.clear()
+    await callback.message.edit_text(
+        "❌ Рассылка отменена",
+        reply_markup=get_admin_main_menu_keyboard()
+    )
+    await callback.answer()
+
+# Управление модераторами (только для админов)
+@admin_router.callback_query(F.data == "admin_moderators")
+async def moderators_menu(callback: CallbackQuery, db: AsyncSession, state: FSMContext, role: Optional[str] = None):
+    if role != "admin":
+        await callback.answer("⛔️ Управлять модераторами могут только администраторы.", show_alert=True)
+        return
+    
+    await state.clear()
+    moderators = await db.execute(
+        select(User).where(User.is_moderator == True).order_by(User.id)
+    )
+    moderators = moderators.scalars().all()
+    
+    text = "👮 Модераторы:\n\n"
+    if moderators:
+        for moderator in moderators:
+            name = " ".join(filter(None, [moderator.first_name, moderator.last_name]))
+            username = f" @{moderator.username}" if moderator.username else ""
+            text += f"• {name or 'Без имени'}{username} (ID: {moderator.telegram_id})\n"
+    else:
+        text += "Модераторов пока нет"
+    
+    await callback.message.edit_text(text, reply_markup=get_moderator_management_keyboard())
+    await callback.answer()
+
+# Запрос ID для добавления/удаления модератора
+@admin_router.callback_query(F.data.in_({"add_moderator", "remove_moderator"}))
+async def start_moderator_change(callback: CallbackQuery, state: FSMContext, role: Optional[str] = None):
+    if role != "admin":
+        await callback.answer("⛔️ Управлять модераторами могут только администраторы.", show_alert=True)
+        return
+    
+    if callback.data == "add_moderator":
+        await state.set_state(ModeratorForm.add)
+        text = "👮 Введите Telegram ID нового модератора:"
+    else:
+        await state.set_state(ModeratorForm.remove)
+        text = "👮 Введите Telegram ID модератора, которого нужно удалить:"
+    
+    await callback.message.edit_text(text, reply_markup=get_moderator_cancel_keyboard())
+    await callback.answer()
+
+# Изменение флага модератора
+@admin_router.message(ModeratorForm.add)
+@admin_router.message(ModeratorForm.remove)
+async def process_moderator_change(message: Message, db: AsyncSession, state: FSMContext, role: Optional[str] = None):
+    if role != "admin":
+        await message.answer("⛔️ Доступ запрещён.")
+        return
+    
+    try:
+        telegram_id = int(message.text)
+    except (TypeError, ValueError):
+        await message.answer("❌ Telegram ID должен быть числом. Попробуйте ещё раз:")
+        return
+    
+    is_moderator = await state.get_state() == ModeratorForm.add.state
+    user = await db.execute(select(User).where(User.telegram_id == telegram_id))
+    user = user.scalar_one_or_none()
+    
+    if not user:
+        if not is_moderator:
+            await message.answer("❌ Пользователь не найден. Попробуйте ещё раз:")
+            return
+        user = User(telegram_id=telegram_id)
+        db.add(user)
+    
+    user.is_moderator = is_moderator
+    await db.commit()
+    
+    # Роль изменилась - сбрасываем кэш, чтобы права применились сразу
+    invalidate_role(telegram_id)
+    await state.clear()
+    await message.answer(
+        "✅ Модератор добавлен" if is_moderator else "✅ Модератор удалён",
+        reply_markup=get_moderator_management_keyboard()
+    )
+
@@ -1,57 +1,108 @@
+import logging
 from datetime import datetime
 from typing import Optional
-import json
 
-from aiogram import Router, F
-from aiogram.filters import Command
-from aiogram.types import Message, CallbackQuery, InputMediaPhoto
-from aiogram.utils.markdown import hbold, hitalic, hcode
+from aiogram import Bot, Router, F
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.filters import Command, CommandObject
+from aiogram.fsm.context import FSMContext
+from aiogram.fsm.state import State, StatesGroup
+from aiogram.types import (
+    Message,
+    CallbackQuery,
+    InputMediaPhoto,
+    InlineQuery,
+    InlineQueryResultArticle,
+    InputTextMessageContent
+)
+from aiogram.utils.markdown import hbold, hcode
 from sqlalchemy import select, and_, func
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import selectinload
+from sqlalchemy.orm import aliased
 
-from app.database.database import get_db
-from app.database.models import User, Event, Registration
+from app.database.database import get_read_db
+from app.database.models import Event, Registration, WaitlistEntry
+from app.database.registrations import (
+    register_user,
+    join_waitlist,
+    leave_waitlist,
+    cancel_registration,
+    ALREADY_REGISTERED,
+    EVENT_FULL,
+    EVENT_NOT_FOUND
+)
 from app.keyboards.user_keyboards import (
     get_main_menu_keyboard,
     get_events_pagination_keyboard,
     get_event_detail_keyboard,
     get_back_to_menu_keyboard,
-    get_registration_keyboard
+    get_profile_keyboard,
+    get_cancel_registration_keyboard,
+    get_registration_keyboard,
+    get_search_keyboard,
+    get_search_results_keyboard,
+    get_share_event_keyboard
 )
-from app.config import EVENTS_PER_PAGE
+from app.config import EVENTS_PER_PAGE, SEARCH_CACHE_TTL, SEARCH_DEBOUNCE
+from app.middlewares.request_scheduler import message_kind
+from app.utils.cache import events_page_cache
+from app.utils.event_cards import get_event_card, quote
+from app.utils.images import send_cached_photo
+from app.utils.pagination import KeysetPaginator
+from app.utils.profiles import get_profile, add_registration, remove_registration
+from app.utils.search import search_events, cached_results, Debouncer
+from app.utils.waitlist import request_promotion
+
+logger = logging.getLogger(__name__)
 
 user_router = Router()
 
+# Откуда отменена регистрация (для журнала отмен): e - карточка мероприятия, p - профиль
+CANCEL_SOURCES = {"e": "event", "p": "profile"}
+
+# Предстоящие мероприятия по возрастанию даты, курсор в callback_data кнопок «Назад» / «Вперёд»
+events_paginator = KeysetPaginator("events_page_", Event.date, Event.id, EVENTS_PER_PAGE)
+
+# Inline-запросы приходят на каждую нажатую клавишу - ищем только по последнему
+inline_search_debouncer = Debouncer(SEARCH_DEBOUNCE)
+
+class SearchForm(StatesGroup):
+    query = State()
+
 async def safe_edit_message(callback: CallbackQuery, text: str, reply_markup=None, parse_mode="HTML"):
     """Безопасное редактирование сообщения - обрабатывает случаи с медиа"""
-    try:
-        # Пытаемся отредактировать как обычное текстовое сообщение
-        await callback.message.edit_text(
-            text,
-            reply_markup=reply_markup,
-            parse_mode=parse_mode
-        )
-    except Exception as e:
-        # Если не удалось (например, было медиа), удаляем старое и отправляем новое
+    message = callback.message
+    # Метод выбираем заранее по типу сообщения, а не пробуем edit_text наугад
+    kind = message_kind(message) if is_bot_message(message) else None
+    if kind == "text":
         try:
-            await callback.message.delete()
-            await callback.message.answer(
-                text,
-                reply_markup=reply_markup,
-                parse_mode=parse_mode
-            )
-        except:
-            # В крайнем случае просто отправляем новое сообщение
-            await callback.message.answer(
-                text,
-                reply_markup=reply_markup,
-                parse_mode=parse_mode
-            )
+            await message.edit_text(text, reply_markup=reply_markup, parse_mode=parse_mode)
+            return
+        except TelegramBadRequest as e:
+            if "message is not modified" in str(e):
+                return
+            # Сообщение удалено или его уже нельзя редактировать - отправим новое
+            logger.debug(f"Cannot edit message {message.message_id}: {e}")
+    elif kind == "media":
+        # Медиа-сообщение нельзя превратить в текстовое - заменяем его новым
+        try:
+            await message.delete()
+        except TelegramBadRequest:
+            pass
+    
+    await message.answer(text, reply_markup=reply_markup, parse_mode=parse_mode)
+
+def is_bot_message(message) -> bool:
+    """Редактировать и удалять можно только сообщения бота (не команду /event_X пользователя)"""
+    return getattr(message, "from_user", None) is not None and message.from_user.is_bot
 
 @user_router.message(Command("start"))
-async def start_command(message: Message):
-    """Обработчик команды /start"""
+async def start_command(message: Message, command: CommandObject, db: AsyncSession, user_id: int):
+    """Обработчик команды /start (ссылка t.me/<бот>?start=event_X открывает мероприятие)"""
+    if command.args and command.args.startswith("event_") and command.args[6:].isdigit():
+        await send_event_detail(message, db, user_id, int(command.args[6:]))
+        return
+    
     welcome_text = (
         f"🎉 Ассаляму алейкум, {hbold(message.from_user.first_name)}!\n\n"
         f"Добро пожаловать в бот {hbold('Совета татарской молодёжи')}!\n\n"
@@ -82,339 +133,403 @@ async def show_main_menu(callback: CallbackQuery):
 @user_router.callback_query(F.data == "upcoming_events")
 async def show_upcoming_events(callback: CallbackQuery):
     """Показать список ближайших мероприятий"""
-    await show_events_page(callback, page=1)
+    await show_events_page(callback)
 
 @user_router.callback_query(F.data == "back_to_events")
 async def back_to_events(callback: CallbackQuery):
     """Вернуться к списку мероприятий"""
-    await show_events_page(callback, page=1)
+    await show_events_page(callback)
 
 @user_router.callback_query(F.data.startswith("events_page_"))
 async def handle_events_pagination(callback: CallbackQuery):
     """Обработчик пагинации мероприятий"""
-    page = int(callback.data.split("_")[-1])
-    await show_events_page(callback, page)
-
-async def show_events_page(callback: CallbackQuery, page: int):
-    """Показать страницу мероприятий"""
-    async for db in get_db():
-        # Получаем общее количество предстоящих мероприятий
-        total_query = select(func.count(Event.id)).where(Event.date >= datetime.now())
-        total_result = await db.execute(total_query)
-        total_events = total_result.scalar()
+    await show_events_page(callback, callback.data)
+
+async def show_events_page(callback: CallbackQuery, cursor_data: Optional[str] = None):
+    """Показать страницу мероприятий (без курсора - первую)"""
+    key = cursor_data or "first"
+    text, keyboard = await events_page_cache.get_or_load(key, lambda: render_events_page(cursor_data))
+    await safe_edit_message(callback, text, keyboard)
+    await callback.answer()
+
+async def render_events_page(cursor_data: Optional[str] = None):
+    """Сформировать текст и клавиатуру страницы мероприятий"""
+    async for db in get_read_db():
+        # Страница берётся по индексу (date, id) от курсора, без COUNT и OFFSET
+        page = await events_paginator.fetch(
+            db,
+            select(Event).where(Event.date >= datetime.now()),
+            events_paginator.decode(cursor_data)
+        )
+        events = page.items
         
-        if total_events == 0:
-            await safe_edit_message(
-                callback,
+        if not events:
+            return (
                 "📅 На данный момент нет запланированных мероприятий.\n"
                 "Следите за обновлениями!",
                 get_back_to_menu_keyboard()
             )
-            await callback.answer()
-            return
-        
-        # Вычисляем offset для пагинации
-        offset = (page - 1) * EVENTS_PER_PAGE
-        
-        # Получаем мероприятия для текущей страницы
-        events_query = (
-            select(Event)
-            .where(Event.date >= datetime.now())
-            .order_by(Event.date)
-            .offset(offset)
-            .limit(EVENTS_PER_PAGE)
-        )
-        events_result = await db.execute(events_query)
-        events = events_result.scalars().all()
         
         # Формируем текст со списком мероприятий
         text = f"📅 {hbold('Ближайшие мероприятия')}\n\n"
-        
-        for i, event in enumerate(events, 1):
-            event_date = event.date.strftime("%d.%m.%Y")
-            event_time = event.date.strftime("%H:%M")
-            
-            speakers_text = ""
-            if event.speakers:
-                try:
-                    speakers = json.loads(event.speakers)
-                    if speakers:
-                        speakers_text = f"\n👨‍🏫 {', '.join(speakers)}"
-                except:
-                    if event.speakers.strip():
-                        speakers_text = f"\n👨‍🏫 {event.speakers}"
-            
-            text += (
-                f"{hbold(f'{offset + i}. {event.title}')}\n"
-                f"📅 {event_date} в {event_time}\n"
-                f"📍 {event.location or 'Место уточняется'}"
-                f"{speakers_text}\n\n"
-                f"➡️ /event_{event.id} - подробнее\n\n"
-            )
+        text += "".join(get_event_card(event).list_item for event in events)
         
         # Создаем клавиатуру с пагинацией
         keyboard = get_events_pagination_keyboard(
-            current_page=page,
-            total_pages=(total_events + EVENTS_PER_PAGE - 1) // EVENTS_PER_PAGE,
-            events=events
+            events=events,
+            prev_data=page.prev_data,
+            next_data=page.next_data
         )
         
-        await safe_edit_message(callback, text, keyboard)
-        await callback.answer()
+        return text, keyboard
+
+async def load_event_detail(db: AsyncSession, event_id: int, user_id: int):
+    """
+    Мероприятие, флаг регистрации пользователя и его место в листе ожидания одним запросом.
+    Количество участников хранится в самом мероприятии (registered_count).
+    """
+    is_registered = (
+        select(Registration.id)
+        .where(Registration.event_id == Event.id, Registration.user_id == user_id)
+        .exists()
+    )
+    # Место в очереди - число записей не позже записи пользователя (0, если его нет в очереди)
+    own_entry = aliased(WaitlistEntry)
+    waitlist_place = (
+        select(func.count(WaitlistEntry.id))
+        .join(
+            own_entry,
+            and_(own_entry.event_id == WaitlistEntry.event_id, WaitlistEntry.position <= own_entry.position)
+        )
+        .where(WaitlistEntry.event_id == Event.id, own_entry.user_id == user_id)
+        .scalar_subquery()
+    )
+    
+    result = await db.execute(
+        select(Event, is_registered.label("is_registered"), waitlist_place.label("waitlist_place"))
+        .where(Event.id == event_id)
+    )
+    return result.one_or_none()
 
 @user_router.callback_query(F.data.startswith("event_"))
-async def show_event_detail(callback: CallbackQuery):
+async def show_event_detail(callback: CallbackQuery, db: AsyncSession, user_id: int, event_id: Optional[int] = None):
     """Показать подробную информацию о мероприятии"""
-    event_id = int(callback.data.split("_")[1])
-    user_id = callback.from_user.id
+    event_id = event_id or int(callback.data.split("_")[1])
     
-    async for db in get_db():
-        # Получаем мероприятие
-        event_query = select(Event).where(Event.id == event_id)
-        event_result = await db.execute(event_query)
-        event = event_result.scalar_one_or_none()
-        
-        if not event:
-            await callback.answer("Мероприятие не найдено", show_alert=True)
-            return
-        
-        # Проверяем, зарегистрирован ли пользователь
-        user_query = select(User).where(User.telegram_id == user_id)
-        user_result = await db.execute(user_query)
-        user = user_result.scalar_one_or_none()
-        
-        is_registered = False
-        if user:
-            registration_query = select(Registration).where(
-                and_(Registration.user_id == user.id, Registration.event_id == event_id)
-            )
-            registration_result = await db.execute(registration_query)
-            is_registered = registration_result.scalar_one_or_none() is not None
-        
-        # Получаем количество зарегистрированных участников
-        participants_query = select(func.count(Registration.id)).where(Registration.event_id == event_id)
-        participants_result = await db.execute(participants_query)
-        participants_count = participants_result.scalar()
-        
-        # Формируем текст с подробной информацией
-        event_date = event.date.strftime("%d.%m.%Y")
-        event_time = event.date.strftime("%H:%M")
-        
-        text = f"📅 {hbold(event.title)}\n\n"
-        
-        if event.short_description:
-            text += f"{hitalic(event.short_description)}\n\n"
-        
-        text += f"📅 {hbold('Дата:')} {event_date}\n"
-        text += f"⏰ {hbold('Время:')} {event_time}\n"
-        text += f"📍 {hbold('Место:')} {event.location or 'Уточняется'}\n"
-        
-        if event.speakers:
-            try:
-                speakers = json.loads(event.speakers)
-                if speakers:
-                    text += f"👨‍🏫 {hbold('Спикеры:')} {', '.join(speakers)}\n"
-            except:
-                if event.speakers.strip():
-                    text += f"👨‍🏫 {hbold('Спикеры:')} {event.speakers}\n"
-        
-        text += f"👥 {hbold('Зарегистрировано:')} {participants_count}"
-        
-        if event.max_participants:
-            text += f" из {event.max_participants}"
-        
-        text += "\n\n"
-        
-        if event.full_description:
-            text += f"{hbold('Описание:')}\n{event.full_description}\n\n"
-        
-        if is_registered:
-            text += "✅ Вы зарегистрированы на это мероприятие"
-        elif event.registration_required:
-            if event.max_participants and participants_count >= event.max_participants:
-                text += "❌ Регистрация закрыта (достигнут лимит участников)"
-            else:
-                text += "📝 Для участия требуется регистрация"
-        
-        # Создаем клавиатуру
-        keyboard = get_event_detail_keyboard(
-            event_id=event_id,
-            is_registered=is_registered,
-            registration_required=event.registration_required,
-            registration_available=(
-                event.registration_required and 
-                not is_registered and 
-                (not event.max_participants or participants_count < event.max_participants)
-            )
-        )
-        
-        # Если есть изображение, отправляем с фото
-        if event.image_path:
-            try:
-                await callback.message.edit_media(
-                    media=InputMediaPhoto(
-                        media=event.image_path,
-                        caption=text,
-                        parse_mode="HTML"
-                    ),
-                    reply_markup=keyboard
-                )
-            except Exception as e:
-                # Если не удалось загрузить изображение, используем безопасный метод
-                await safe_edit_message(callback, text, keyboard)
-        else:
+    detail = await load_event_detail(db, event_id, user_id)
+    if not detail:
+        await callback.answer("Мероприятие не найдено", show_alert=True)
+        return
+    
+    event, is_registered, waitlist_place = detail
+    is_registered = bool(is_registered)
+    
+    participants_count = event.registered_count
+    is_full = bool(event.max_participants) and participants_count >= event.max_participants
+    
+    # Место в листе ожидания показываем, только если мест нет
+    if not is_full or is_registered:
+        waitlist_place = None
+    
+    # Статус пользователя - единственная часть карточки, которая собирается при каждом просмотре
+    if is_registered:
+        status = "✅ Вы зарегистрированы на это мероприятие"
+    elif not event.registration_required:
+        status = ""
+    elif waitlist_place:
+        status = f"⏳ Вы в листе ожидания (место {waitlist_place}). Мы сообщим, когда освободится место"
+    elif is_full:
+        status = "❌ Регистрация закрыта (достигнут лимит участников)\nМожно встать в лист ожидания"
+    else:
+        status = "📝 Для участия требуется регистрация"
+    
+    text = get_event_card(event).detail_text(participants_count, status)
+    
+    # Создаем клавиатуру
+    keyboard = get_event_detail_keyboard(
+        event_id=event_id,
+        is_registered=is_registered,
+        registration_required=event.registration_required,
+        registration_available=(
+            event.registration_required and 
+            not is_registered and 
+            not is_full
+        ),
+        waitlist_available=event.registration_required and is_full and not is_registered,
+        in_waitlist=bool(waitlist_place)
+    )
+    
+    # Если есть изображение, отправляем с фото (по закэшированному file_id)
+    if event.image_path:
+        try:
+            await show_photo_card(callback, event.image_path, text, keyboard)
+        except (TelegramBadRequest, OSError) as e:
+            # Если не удалось загрузить изображение (файла нет, Telegram его не принял), показываем карточку текстом
+            logger.warning(f"Error showing image {event.image_path} for event {event_id}: {e}")
             await safe_edit_message(callback, text, keyboard)
-        
-        await callback.answer()
+    else:
+        await safe_edit_message(callback, text, keyboard)
+    
+    await callback.answer()
+
+async def show_photo_card(callback: CallbackQuery, image_path: str, text: str, keyboard):
+    """Показать карточку с фото: фото-сообщение редактируем, текстовое заменяем новым"""
+    message = callback.message
+    if is_bot_message(message) and message_kind(message) == "media":
+        async def send(media):
+            return await message.edit_media(
+                media=InputMediaPhoto(media=media, caption=text, parse_mode="HTML"),
+                reply_markup=keyboard
+            )
+    else:
+        # Текстовое сообщение нельзя превратить в фото - сразу отправляем новое вместо заведомо неудачного edit_media
+        async def send(media):
+            if is_bot_message(message):
+                try:
+                    await message.delete()
+                except TelegramBadRequest:
+                    pass
+            return await message.answer_photo(media, caption=text, reply_markup=keyboard, parse_mode="HTML")
+    
+    await send_cached_photo(image_path, send)
 
 @user_router.callback_query(F.data.startswith("register_"))
-async def register_for_event(callback: CallbackQuery):
+async def register_for_event(callback: CallbackQuery, db: AsyncSession, user_id: int):
     """Регистрация на мероприятие"""
     event_id = int(callback.data.split("_")[1])
-    telegram_user = callback.from_user
     
-    async for db in get_db():
-        # Получаем или создаем пользователя
-        user_query = select(User).where(User.telegram_id == telegram_user.id)
-        user_result = await db.execute(user_query)
-        user = user_result.scalar_one_or_none()
-        
-        if not user:
-            user = User(
-                telegram_id=telegram_user.id,
-                username=telegram_user.username,
-                first_name=telegram_user.first_name,
-                last_name=telegram_user.last_name
-            )
-            db.add(user)
-            await db.flush()
-        
-        # Проверяем, не зарегистрирован ли уже
-        existing_registration = await db.execute(
-            select(Registration).where(
-                and_(Registration.user_id == user.id, Registration.event_id == event_id)
-            )
-        )
-        if existing_registration.scalar_one_or_none():
-            await callback.answer("Вы уже зарегистрированы на это мероприятие!", show_alert=True)
-            return
-        
-        # Проверяем лимит участников
-        event_query = select(Event).where(Event.id == event_id)
-        event_result = await db.execute(event_query)
-        event = event_result.scalar_one_or_none()
-        
-        if not event:
-            await callback.answer("Мероприятие не найдено", show_alert=True)
+    # Занимаем место и создаём регистрацию одним атомарным запросом
+    result = await register_user(db, user_id, event_id)
+    
+    if result == ALREADY_REGISTERED:
+        await callback.answer("Вы уже зарегистрированы на это мероприятие!", show_alert=True)
+        return
+    if result == EVENT_NOT_FOUND:
+        await callback.answer("Мероприятие не найдено", show_alert=True)
+        return
+    if result == EVENT_FULL:
+        await callback.answer("К сожалению, достигнут лимит участников", show_alert=True)
+        return
+    
+    await callback.answer("✅ Вы успешно зарегистрированы!", show_alert=True)
+    await add_registration(db, user_id, event_id)
+    
+    # Обновляем информацию о мероприятии
+    await show_event_detail(callback, db, user_id)
+
+@user_router.callback_query(F.data.startswith("waitlist_join_"))
+async def join_event_waitlist(callback: CallbackQuery, db: AsyncSession, user_id: int):
+    """Встать в лист ожидания"""
+    event_id = int(callback.data.split("_")[-1])
+    
+    # Если место успело освободиться - сразу регистрируем
+    result = await register_user(db, user_id, event_id)
+    
+    if result == EVENT_NOT_FOUND:
+        await callback.answer("Мероприятие не найдено", show_alert=True)
+        return
+    if result == ALREADY_REGISTERED:
+        await callback.answer("Вы уже зарегистрированы на это мероприятие!", show_alert=True)
+    elif result == EVENT_FULL:
+        position = await join_waitlist(db, user_id, event_id)
+        if position is None:
+            await callback.answer("Не удалось встать в лист ожидания, попробуйте ещё раз", show_alert=True)
             return
-        
-        if event.max_participants:
-            participants_count_query = select(func.count(Registration.id)).where(Registration.event_id == event_id)
-            participants_count_result = await db.execute(participants_count_query)
-            participants_count = participants_count_result.scalar()
-            
-            if participants_count >= event.max_participants:
-                await callback.answer("К сожалению, достигнут лимит участников", show_alert=True)
-                return
-        
-        # Создаем регистрацию
-        registration = Registration(
-            user_id=user.id,
-            event_id=event_id
-        )
-        db.add(registration)
-        await db.commit()
-        
-        await callback.answer("✅ Вы успешно зарегистрированы!", show_alert=True)
-        
-        # Обновляем информацию о мероприятии
-        await show_event_detail(callback)
+        await callback.answer(f"⏳ Вы в листе ожидания, место {position}", show_alert=True)
+    else:
+        await callback.answer("✅ Место нашлось - вы успешно зарегистрированы!", show_alert=True)
+        await add_registration(db, user_id, event_id)
+    
+    await show_event_detail(callback, db, user_id, event_id)
+
+@user_router.callback_query(F.data.startswith("waitlist_leave_"))
+async def leave_event_waitlist(callback: CallbackQuery, db: AsyncSession, user_id: int):
+    """Покинуть лист ожидания"""
+    event_id = int(callback.data.split("_")[-1])
+    
+    if await leave_waitlist(db, user_id, event_id):
+        await callback.answer("Вы покинули лист ожидания", show_alert=True)
+    else:
+        await callback.answer("Вы не состоите в листе ожидания", show_alert=True)
+    
+    await show_event_detail(callback, db, user_id, event_id)
 
 @user_router.callback_query(F.data == "my_profile")
-async def show_user_profile(callback: CallbackQuery):
+async def show_user_profile(callback: CallbackQuery, db: AsyncSession, user_id: int):
     """Показать профиль пользователя"""
-    user_id = callback.from_user.id
+    # Запись пользователя и его регистрации - из кэша профилей, который обновляется при регистрациях и правках мероприятий
+    profile = await get_profile(db, user_id)
     
-    async for db in get_db():
-        # Получаем пользователя
-        user_query = select(User).where(User.telegram_id == user_id)
-        user_result = await db.execute(user_query)
-        user = user_result.scalar_one_or_none()
-        
-        if not user:
-            # Создаем пользователя если его нет
-            user = User(
-                telegram_id=callback.from_user.id,
-                username=callback.from_user.username,
-                first_name=callback.from_user.first_name,
-                last_name=callback.from_user.last_name
-            )
-            db.add(user)
-            await db.commit()
-        
-        # Получаем регистрации пользователя на предстоящие мероприятия
-        registrations_query = (
-            select(Registration)
-            .options(selectinload(Registration.event))
-            .where(Registration.user_id == user.id)
-            .join(Event)
-            .where(Event.date >= datetime.now())
-            .order_by(Event.date)
-        )
-        registrations_result = await db.execute(registrations_query)
-        registrations = registrations_result.scalars().all()
-        
-        # Формируем текст профиля
-        text = f"👤 {hbold('Мой профиль')}\n\n"
-        text += f"👋 {hbold('Имя:')} {user.first_name}"
-        if user.last_name:
-            text += f" {user.last_name}"
-        text += "\n"
-        
-        if user.username:
-            text += f"📝 {hbold('Username:')} @{user.username}\n"
-        
-        if user.phone:
-            text += f"📱 {hbold('Телефон:')} {user.phone}\n"
-        
-        text += f"📅 {hbold('Дата регистрации:')} {user.created_at.strftime('%d.%m.%Y')}\n\n"
-        
-        if registrations:
-            text += f"📝 {hbold('Мои регистрации:')}\n\n"
-            for reg in registrations:
-                event_date = reg.event.date.strftime("%d.%m.%Y")
-                event_time = reg.event.date.strftime("%H:%M")
-                text += f"• {hbold(reg.event.title)}\n"
-                text += f"  📅 {event_date} в {event_time}\n"
-                text += f"  📍 {reg.event.location or 'Место уточняется'}\n\n"
-        else:
-            text += "📝 У вас пока нет регистраций на предстоящие мероприятия."
-        
-        await safe_edit_message(callback, text, get_back_to_menu_keyboard())
-        await callback.answer()
+    # Формируем текст профиля
+    text = f"👤 {hbold('Мой профиль')}\n\n"
+    text += f"👋 {hbold('Имя:')} {profile.first_name}"
+    if profile.last_name:
+        text += f" {profile.last_name}"
+    text += "\n"
+    
+    if profile.username:
+        text += f"📝 {hbold('Username:')} @{profile.username}\n"
+    
+    if profile.phone:
+        text += f"📱 {hbold('Телефон:')} {profile.phone}\n"
+    
+    text += f"📅 {hbold('Дата регистрации:')} {profile.created_at.strftime('%d.%m.%Y')}\n\n"
+    
+    registrations = profile.upcoming()
+    if registrations:
+        text += f"📝 {hbold('Мои регистрации:')}\n\n"
+        for event in registrations:
+            event_date = event.date.strftime("%d.%m.%Y")
+            event_time = event.date.strftime("%H:%M")
+            text += f"• {hbold(event.title)}\n"
+            text += f"  📅 {event_date} в {event_time}\n"
+            text += f"  📍 {event.location or 'Место уточняется'}\n\n"
+    else:
+        text += "📝 У вас пока нет регистраций на предстоящие мероприятия."
+    
+    await safe_edit_message(callback, text, get_profile_keyboard(registrations))
+    await callback.answer()
+
+@user_router.callback_query(F.data.startswith("cancel_reg_"))
+async def ask_cancel_registration(callback: CallbackQuery, db: AsyncSession):
+    """Подтверждение отмены регистрации (из карточки мероприятия или из профиля)"""
+    source, event_id = callback.data.split("_")[-2:]
+    event = await db.get(Event, int(event_id))
+    if not event:
+        await callback.answer("Мероприятие не найдено", show_alert=True)
+        return
+    
+    text = (
+        f"❓ Отменить регистрацию на мероприятие {hbold(event.title)}?\n\n"
+        f"Место освободится для участников из листа ожидания."
+    )
+    await safe_edit_message(callback, text, get_cancel_registration_keyboard(event.id, source))
+    await callback.answer()
+
+@user_router.callback_query(F.data.startswith("confirm_cancel_reg_"))
+async def confirm_cancel_registration(callback: CallbackQuery, db: AsyncSession, user_id: int):
+    """Отмена регистрации: место возвращается, освободившееся место получает лист ожидания"""
+    source, event_id = callback.data.split("_")[-2:]
+    event_id = int(event_id)
+    
+    if await cancel_registration(db, user_id, event_id, CANCEL_SOURCES.get(source, source)):
+        remove_registration(user_id, event_id)
+        request_promotion()
+        await callback.answer("Регистрация отменена", show_alert=True)
+    else:
+        await callback.answer("Вы не зарегистрированы на это мероприятие", show_alert=True)
+    
+    # Возвращаемся туда, откуда пришли
+    if source == "p":
+        await show_user_profile(callback, db, user_id)
+    else:
+        await show_event_detail(callback, db, user_id, event_id)
+
+async def send_event_detail(message: Message, db: AsyncSession, user_id: int, event_id: int):
+    """Показать мероприятие в ответ на сообщение (команда /event_X или ссылка на бота)"""
+    # Создаем фиктивный callback для переиспользования логики
+    class MockCallbackQuery:
+        def __init__(self, message, user, data):
+            self.message = message
+            self.from_user = user
+            self.data = data
+        
+        async def answer(self, text=None, show_alert=False):
+            pass
+    
+    mock_callback = MockCallbackQuery(message, message.from_user, f"event_{event_id}")
+    await show_event_detail(mock_callback, db, user_id)
 
 @user_router.message(F.text.startswith('/event_'))
-async def event_command(message: Message):
+async def event_command(message: Message, db: AsyncSession, user_id: int):
     """Обработчик команды /event_X"""
     try:
         event_id = int(message.text.split('_')[1])
-        # Создаем фиктивный callback для переиспользования логики
-        callback_data = f"event_{event_id}"
-        
-        class MockCallbackQuery:
-            def __init__(self, message, user, data):
-                self.message = message
-                self.from_user = user
-                self.data = data
-            
-            async def answer(self, text=None, show_alert=False):
-                pass
-        
-        mock_callback = MockCallbackQuery(message, message.from_user, callback_data)
-        await show_event_detail(mock_callback)
-        
     except (ValueError, IndexError):
         await message.answer(
             "❌ Неверный формат команды. Используйте /event_ID, где ID - номер мероприятия.",
             reply_markup=get_main_menu_keyboard()
-        )
\ No newline at end of file
+        )
+        return
+    
+    await send_event_detail(message, db, user_id, event_id)
+
+async def render_search_results(query: str):
+    """Текст и клавиатура с результатами поиска (в сообщение помещается не больше страницы списка)"""
+    events = await search_events(query)
+    if not events:
+        return (
+            f"😔 По запросу «{quote(query)}» ничего не найдено.\n"
+            f"Попробуйте другие слова или посмотрите список ближайших мероприятий.",
+            get_search_results_keyboard()
+        )
+    
+    shown = events[:EVENTS_PER_PAGE]
+    text = f"🔍 {hbold('Результаты поиска')} «{quote(query)}»\n\n"
+    text += "".join(get_event_card(event).list_item for event in shown)
+    if len(events) > len(shown):
+        text += "Показаны ближайшие мероприятия - уточните запрос, чтобы найти остальные."
+    return text, get_search_results_keyboard(shown)
+
+@user_router.message(Command("search"))
+async def search_command(message: Message, command: CommandObject, state: FSMContext):
+    """Обработчик команды /search [запрос]"""
+    if not command.args:
+        await state.set_state(SearchForm.query)
+        await message.answer(
+            "🔍 Введите название, место, спикера или слово из описания мероприятия:",
+            reply_markup=get_search_keyboard()
+        )
+        return
+    
+    await state.set_state(None)
+    text, keyboard = await render_search_results(command.args.strip()[:64])
+    await message.answer(text, reply_markup=keyboard)
+
+@user_router.callback_query(F.data == "search_events")
+async def start_search(callback: CallbackQuery, state: FSMContext):
+    """Кнопка поиска: ждём текст запроса"""
+    await state.set_state(SearchForm.query)
+    await safe_edit_message(
+        callback,
+        "🔍 Введите название, место, спикера или слово из описания мероприятия:",
+        get_search_keyboard()
+    )
+    await callback.answer()
+
+@user_router.message(SearchForm.query, F.text, ~F.text.startswith("/"))
+async def process_search_query(message: Message, state: FSMContext):
+    """Текст поискового запроса"""
+    await state.set_state(None)
+    text, keyboard = await render_search_results(message.text.strip()[:64])
+    await message.answer(text, reply_markup=keyboard)
+
+@user_router.inline_query()
+async def inline_search(inline_query: InlineQuery, bot: Bot):
+    """Поиск мероприятий прямо в строке ввода: @бот запрос"""
+    query = inline_query.query.strip()[:64]
+    events = cached_results(query)
+    if events is None:
+        # Пока пользователь печатает, запросы к БД не выполняются - ищем по последнему
+        if not await inline_search_debouncer.wait(inline_query.from_user.id):
+            return
+        events = await search_events(query)
+    
+    # Результат может быть отправлен в любой чат - вместо команды бота отправляем карточку со ссылкой на бота
+    bot_user = await bot.me()
+    results = []
+    for event in events:
+        description = f"📅 {event.date.strftime('%d.%m.%Y %H:%M')}"
+        if event.location:
+            description += f" · 📍 {event.location}"
+        results.append(InlineQueryResultArticle(
+            id=str(event.id),
+            title=event.title,
+            description=description,
+            input_message_content=InputTextMessageContent(
+                message_text=get_event_card(event).share_text,
+                parse_mode="HTML"
+            ),
+            reply_markup=get_share_event_keyboard(f"https://t.me/{bot_user.username}?start=event_{event.id}")
+        ))
+    await inline_query.answer(results, cache_time=SEARCH_CACHE_TTL, is_personal=False)
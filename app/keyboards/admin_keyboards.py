@@ -12,7 +12,7 @@ def get_admin_main_menu_keyboard():
         ]
     )
 
-def get_events_list_keyboard(events):
+def get_events_list_keyboard(events, prev_data: str = None, next_data: str = None):
     keyboard = []
     for event in events:
         event_date = event.date.strftime("%d.%m.%Y")
@@ -23,6 +23,15 @@ def get_events_list_keyboard(events):
             )
         ])
     
+    # Кнопки пагинации (курсор уже закодирован в callback_data)
+    pagination_buttons = []
+    if prev_data:
+        pagination_buttons.append(InlineKeyboardButton(text="« Назад", callback_data=prev_data))
+    if next_data:
+        pagination_buttons.append(InlineKeyboardButton(text="Вперёд »", callback_data=next_data))
+    if pagination_buttons:
+        keyboard.append(pagination_buttons)
+    
     keyboard.append([InlineKeyboardButton(text="➕ Создать мероприятие", callback_data="create_event")])
     keyboard.append([InlineKeyboardButton(text="« Назад", callback_data="admin_main_menu")])
     return InlineKeyboardMarkup(inline_keyboard=keyboard)
@@ -67,6 +76,13 @@ def get_moderator_management_keyboard():
         ]
     )
 
+def get_moderator_cancel_keyboard():
+    return InlineKeyboardMarkup(
+        inline_keyboard=[
+            [InlineKeyboardButton(text="❌ Отмена", callback_data="admin_moderators")]
+        ]
+    )
+
 def get_broadcast_keyboard():
     return InlineKeyboardMarkup(
         inline_keyboard=[
@@ -75,6 +91,12 @@ def get_broadcast_keyboard():
         ]
     )
 
+def get_broadcast_form_keyboard(with_skip: bool = False):
+    keyboard = [[InlineKeyboardButton(text="Отмена", callback_data="cancel_broadcast")]]
+    if with_skip:
+        keyboard.insert(0, [InlineKeyboardButton(text="Пропустить", callback_data="skip_field")])
+    return InlineKeyboardMarkup(inline_keyboard=keyboard)
+
 def get_export_keyboard():
     return InlineKeyboardMarkup(
         inline_keyboard=[
@@ -83,3 +105,53 @@ def get_export_keyboard():
             [InlineKeyboardButton(text="« Назад", callback_data="admin_main_menu")],
         ]
     )
+
+def get_export_format_keyboard(prefix: str):
+    """Выбор формата выгрузки; prefix - начало callback_data (например, export_all)"""
+    return InlineKeyboardMarkup(
+        inline_keyboard=[
+            [
+                InlineKeyboardButton(text="CSV", callback_data=f"{prefix}_csv"),
+                InlineKeyboardButton(text="CSV (gzip)", callback_data=f"{prefix}_gz"),
+                InlineKeyboardButton(text="Excel", callback_data=f"{prefix}_xlsx"),
+            ],
+            [InlineKeyboardButton(text="« Назад", callback_data="admin_export")],
+        ]
+    )
+
+def get_export_events_keyboard(events):
+    keyboard = []
+    for event in events:
+        event_date = event.date.strftime("%d.%m.%Y")
+        keyboard.append([
+            InlineKeyboardButton(
+                text=f"{event.title} ({event_date})",
+                callback_data=f"export_event_{event.id}"
+            )
+        ])
+    keyboard.append([InlineKeyboardButton(text="« Назад", callback_data="admin_export")])
+    return InlineKeyboardMarkup(inline_keyboard=keyboard)
+
+def get_participants_keyboard(event_id: int, prev_data: str = None, next_data: str = None, searching: bool = False):
+    keyboard = []
+    pagination_buttons = []
+    if prev_data:
+        pagination_buttons.append(InlineKeyboardButton(text="« Назад", callback_data=prev_data))
+    if next_data:
+        pagination_buttons.append(InlineKeyboardButton(text="Вперёд »", callback_data=next_data))
+    if pagination_buttons:
+        keyboard.append(pagination_buttons)
+    
+    keyboard.append([InlineKeyboardButton(text="🔍 Поиск", callback_data=f"search_participants_{event_id}")])
+    if searching:
+        keyboard.append([InlineKeyboardButton(text="✖️ Сбросить поиск", callback_data=f"view_participants_{event_id}")])
+    keyboard.append([InlineKeyboardButton(text="📊 Экспорт в CSV", callback_data=f"export_participants_{event_id}")])
+    keyboard.append([InlineKeyboardButton(text="◀️ Назад", callback_data=f"manage_event_{event_id}")])
+    return InlineKeyboardMarkup(inline_keyboard=keyboard)
+
+def get_participants_search_keyboard(event_id: int):
+    return InlineKeyboardMarkup(
+        inline_keyboard=[
+            [InlineKeyboardButton(text="Отмена", callback_data=f"view_participants_{event_id}")]
+        ]
+    )
@@ -6,11 +6,12 @@ def get_main_menu_keyboard():
     return InlineKeyboardMarkup(
         inline_keyboard=[
             [InlineKeyboardButton(text="📅 Ближайшие мероприятия", callback_data="upcoming_events")],
+            [InlineKeyboardButton(text="🔍 Поиск мероприятий", callback_data="search_events")],
             [InlineKeyboardButton(text="👤 Мой профиль", callback_data="my_profile")],
         ]
     )
 
-def get_events_pagination_keyboard(current_page: int, total_pages: int, events=None):
+def get_events_pagination_keyboard(events=None, prev_data: str = None, next_data: str = None):
     """Клавиатура пагинации для списка мероприятий"""
     keyboard = []
     
@@ -26,14 +27,10 @@ def get_events_pagination_keyboard(current_page: int, total_pages: int, events=N
     
     # Кнопки пагинации
     pagination_buttons = []
-    if current_page > 1:
-        pagination_buttons.append(
-            InlineKeyboardButton(text="« Назад", callback_data=f"events_page_{current_page - 1}")
-        )
-    if current_page < total_pages:
-        pagination_buttons.append(
-            InlineKeyboardButton(text="Вперёд »", callback_data=f"events_page_{current_page + 1}")
-        )
+    if prev_data:
+        pagination_buttons.append(InlineKeyboardButton(text="« Назад", callback_data=prev_data))
+    if next_data:
+        pagination_buttons.append(InlineKeyboardButton(text="Вперёд »", callback_data=next_data))
     
     if pagination_buttons:
         keyboard.append(pagination_buttons)
@@ -43,23 +40,103 @@ def get_events_pagination_keyboard(current_page: int, total_pages: int, events=N
     
     return InlineKeyboardMarkup(inline_keyboard=keyboard)
 
-def get_event_detail_keyboard(event_id: int, is_registered: bool, registration_required: bool, registration_available: bool):
+def get_event_detail_keyboard(
+    event_id: int,
+    is_registered: bool,
+    registration_required: bool,
+    registration_available: bool,
+    waitlist_available: bool = False,
+    in_waitlist: bool = False
+):
     """Клавиатура для детальной информации о мероприятии"""
     keyboard = []
     
-    if registration_required and registration_available and not is_registered:
+    if is_registered:
+        keyboard.append([
+            InlineKeyboardButton(
+                text="❌ Отменить регистрацию",
+                callback_data=f"cancel_reg_e_{event_id}"
+            )
+        ])
+    elif registration_required and registration_available and not is_registered:
         keyboard.append([
             InlineKeyboardButton(
                 text="📝 Зарегистрироваться",
                 callback_data=f"register_{event_id}"
             )
         ])
+    elif in_waitlist:
+        keyboard.append([
+            InlineKeyboardButton(
+                text="🚪 Покинуть лист ожидания",
+                callback_data=f"waitlist_leave_{event_id}"
+            )
+        ])
+    elif waitlist_available:
+        keyboard.append([
+            InlineKeyboardButton(
+                text="⏳ Встать в лист ожидания",
+                callback_data=f"waitlist_join_{event_id}"
+            )
+        ])
     
     keyboard.append([InlineKeyboardButton(text="« К списку мероприятий", callback_data="upcoming_events")])
     keyboard.append([InlineKeyboardButton(text="« Главное меню", callback_data="main_menu")])
     
     return InlineKeyboardMarkup(inline_keyboard=keyboard)
 
+def get_profile_keyboard(events=None):
+    """Клавиатура профиля: отмена регистраций на предстоящие мероприятия"""
+    keyboard = []
+    
+    if events:
+        for event in events:
+            keyboard.append([
+                InlineKeyboardButton(
+                    text=f"❌ Отменить: {event.title}",
+                    callback_data=f"cancel_reg_p_{event.event_id}"
+                )
+            ])
+    
+    keyboard.append([InlineKeyboardButton(text="« Главное меню", callback_data="main_menu")])
+    
+    return InlineKeyboardMarkup(inline_keyboard=keyboard)
+
+def get_cancel_registration_keyboard(event_id: int, source: str):
+    """Подтверждение отмены регистрации; source - откуда пришли (e - карточка мероприятия, p - профиль)"""
+    back_data = "my_profile" if source == "p" else f"event_{event_id}"
+    return InlineKeyboardMarkup(
+        inline_keyboard=[
+            [InlineKeyboardButton(text="✅ Да, отменить", callback_data=f"confirm_cancel_reg_{source}_{event_id}")],
+            [InlineKeyboardButton(text="« Назад", callback_data=back_data)]
+        ]
+    )
+
+def get_search_keyboard():
+    """Клавиатура приглашения к поиску: поиск прямо в строке ввода (inline-режим) и возврат в меню"""
+    return InlineKeyboardMarkup(
+        inline_keyboard=[
+            [InlineKeyboardButton(text="⚡️ Искать по мере ввода", switch_inline_query_current_chat="")],
+            [InlineKeyboardButton(text="« Главное меню", callback_data="main_menu")]
+        ]
+    )
+
+def get_search_results_keyboard(events=None):
+    """Клавиатура результатов поиска"""
+    keyboard = [
+        [InlineKeyboardButton(text=f"📅 {event.title}", callback_data=f"event_{event.id}")]
+        for event in events or []
+    ]
+    keyboard.append([InlineKeyboardButton(text="🔍 Новый поиск", callback_data="search_events")])
+    keyboard.append([InlineKeyboardButton(text="« Главное меню", callback_data="main_menu")])
+    return InlineKeyboardMarkup(inline_keyboard=keyboard)
+
+def get_share_event_keyboard(url: str):
+    """Кнопка под мероприятием, отправленным через inline-режим: открывает его в боте"""
+    return InlineKeyboardMarkup(
+        inline_keyboard=[[InlineKeyboardButton(text="📅 Подробнее и регистрация", url=url)]]
+    )
+
 def get_back_to_menu_keyboard():
     """Клавиатура с кнопкой возврата в главное меню"""
     return InlineKeyboardMarkup(
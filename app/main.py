@@ -1,15 +1,28 @@
 import asyncio
 import logging
 from aiogram import Bot, Dispatcher
-from aiogram.fsm.storage.memory import MemoryStorage
 from aiogram.enums import ParseMode
 from aiogram.client.default import DefaultBotProperties
 
-from app.config import BOT_TOKEN
+from app.config import BOT_TOKEN, BOT_MODE
 from app.database.database import init_db
+from app.database.fsm_storage import create_fsm_storage
 from app.handlers.admin_handlers import admin_router
 from app.handlers.user_handlers import user_router
 from app.middlewares.auth_middleware import AdminMiddleware
+from app.middlewares.db_middleware import DatabaseMiddleware
+from app.middlewares.metrics_middleware import UpdateMetricsMiddleware, HandlerMetricsMiddleware, BotApiMetrics
+from app.middlewares.request_scheduler import RequestScheduler, RequestScopeMiddleware
+from app.middlewares.throttling_middleware import ThrottlingMiddleware
+from app.middlewares.user_sync_middleware import UserSyncMiddleware
+from app.utils.broadcast import resume_broadcasts
+from app.utils.waitlist import start_waitlist_promoter
+from app.utils.reminders import start_reminder_scheduler
+from app.utils.archive import start_archiver
+from app.utils.invalidation import start_invalidation_listener
+from app.utils.metrics import start_metrics_server
+from app.utils.user_sync import user_sync
+from app.webhook import run_webhook
 
 # Настройка логирования
 logging.basicConfig(
@@ -18,13 +31,50 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+def setup_bot_session(bot: Bot):
+    """Middleware исходящих запросов к Bot API"""
+    # Повторы после RetryAfter и фоновые ответы на callback для всех запросов бота
+    bot.session.middleware(RequestScheduler())
+    # Метрики запросов к Bot API - внутри планировщика, чтобы учитывать каждую попытку
+    bot.session.middleware(BotApiMetrics())
+
+def setup_dispatcher(dp: Dispatcher):
+    """Middleware и роутеры (используется и ботом, и нагрузочными тестами в benchmarks/)"""
+    # Метрики обработки обновлений - первыми, чтобы учитывать время всех остальных middleware
+    dp.update.middleware(UpdateMetricsMiddleware())
+    # Одна сессия БД на каждое обновление (аргумент db в хендлерах)
+    dp.update.middleware(DatabaseMiddleware())
+    dp.update.middleware(RequestScopeMiddleware())
+    # Профили пользователей пачками пишутся в users, хендлеры получают аргумент user_id
+    dp.update.middleware(UserSyncMiddleware())
+    
+    # Ограничение частоты нажатий для пользовательских роутов (один экземпляр - общий лимит пользователя)
+    throttling = ThrottlingMiddleware()
+    user_router.message.middleware(throttling)
+    user_router.callback_query.middleware(throttling)
+    
+    # Подключение middleware для админских роутов
+    admin_router.message.middleware(AdminMiddleware())
+    admin_router.callback_query.middleware(AdminMiddleware())
+    
+    # Метрики хендлеров - последними, чтобы измерять только сам хендлер
+    for name, router in (("user", user_router), ("admin", admin_router)):
+        router.message.middleware(HandlerMetricsMiddleware(name))
+        router.callback_query.middleware(HandlerMetricsMiddleware(name))
+        router.inline_query.middleware(HandlerMetricsMiddleware(name))
+    
+    # Подключение роутеров
+    dp.include_router(user_router)
+    dp.include_router(admin_router)
+
 async def main():
     # Инициализация бота и диспетчера
     bot = Bot(
         token=BOT_TOKEN,
         default=DefaultBotProperties(parse_mode=ParseMode.HTML)
     )
-    storage = MemoryStorage()
+    setup_bot_session(bot)
+    storage = create_fsm_storage()
     dp = Dispatcher(storage=storage)
     
     # Инициализация базы данных
@@ -35,21 +85,39 @@ async def main():
         logger.error(f"Error initializing database: {e}")
         return
     
-    # Подключение middleware для админских роутов
-    admin_router.message.middleware(AdminMiddleware())
-    admin_router.callback_query.middleware(AdminMiddleware())
+    setup_dispatcher(dp)
     
-    # Подключение роутеров
-    dp.include_router(user_router)
-    dp.include_router(admin_router)
+    # Возобновление рассылок, прерванных перезапуском
+    await resume_broadcasts(bot)
+    
+    # Фоновый перевод из листов ожидания на освободившиеся места
+    start_waitlist_promoter(bot)
+    
+    # Фоновая отправка напоминаний о мероприятиях
+    start_reminder_scheduler(bot)
+    
+    # Фоновый перенос завершившихся мероприятий в архив
+    start_archiver()
+    
+    # Сбросы кэшей ролей и профилей от других экземпляров бота
+    start_invalidation_listener()
+    
+    # Локальный эндпоинт /metrics
+    metrics_runner = await start_metrics_server()
     
     # Запуск бота
-    logger.info("Starting bot...")
+    logger.info(f"Starting bot in {BOT_MODE} mode...")
     try:
-        await dp.start_polling(bot, allowed_updates=dp.resolve_used_update_types())
+        if BOT_MODE == "webhook":
+            await run_webhook(bot, dp)
+        else:
+            await dp.start_polling(bot, allowed_updates=dp.resolve_used_update_types())
     except Exception as e:
-        logger.error(f"Error while polling: {e}")
+        logger.error(f"Error while receiving updates: {e}")
     finally:
+        if metrics_runner:
+            await metrics_runner.cleanup()
+        await user_sync.close()
         await bot.session.close()
         await storage.close()
         logger.info("Bot stopped")
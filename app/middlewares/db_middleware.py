@@ -0,0 +1,18 @@
+from typing import Any, Awaitable, Callable, Dict
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject
+from app.database.database import AsyncSessionLocal
+
+class DatabaseMiddleware(BaseMiddleware):
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any]
+    ) -> Any:
+        # Одна сессия на всё обновление: хендлеры получают её аргументом db.
+        # Соединение из пула берётся только при первом запросе, так что
+        # обновления без обращений к БД ничего не стоят
+        async with AsyncSessionLocal() as session:
+            data["db"] = session
+            return await handler(event, data)
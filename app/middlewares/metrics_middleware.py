@@ -0,0 +1,80 @@
+import time
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware, Bot
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware, NextRequestMiddlewareType
+from aiogram.methods import TelegramMethod
+from aiogram.methods.base import TelegramType
+from aiogram.types import TelegramObject, Update
+
+from app.utils import metrics
+
+
+class UpdateMetricsMiddleware(BaseMiddleware):
+    """Время обработки обновления целиком и запросы к БД за него (dp.update)"""
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any]
+    ) -> Any:
+        update_type = event.event_type if isinstance(event, Update) else type(event).__name__
+        stats, token = metrics.start_update_stats()
+        started = time.perf_counter()
+        try:
+            return await handler(event, data)
+        finally:
+            metrics.finish_update_stats(token)
+            metrics.updates_total.inc(update_type)
+            metrics.update_duration.observe(time.perf_counter() - started, update_type)
+            metrics.update_db_queries.observe(stats.queries, update_type)
+            metrics.update_db_duration.observe(stats.db_time, update_type)
+
+
+class HandlerMetricsMiddleware(BaseMiddleware):
+    """Время работы, запросы к БД и ошибки каждого хендлера роутера"""
+
+    def __init__(self, router_name: str):
+        self.router_name = router_name
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any]
+    ) -> Any:
+        handler_object = data.get("handler")
+        name = getattr(getattr(handler_object, "callback", None), "__name__", "unknown")
+        stats = metrics.current_update_stats()
+        queries_before = stats.queries if stats else 0
+        started = time.perf_counter()
+        try:
+            return await handler(event, data)
+        except Exception as e:
+            metrics.handler_errors.inc(self.router_name, name, type(e).__name__)
+            raise
+        finally:
+            metrics.handler_duration.observe(time.perf_counter() - started, self.router_name, name)
+            if stats:
+                metrics.handler_db_queries.inc(self.router_name, name, amount=stats.queries - queries_before)
+
+
+class BotApiMetrics(BaseRequestMiddleware):
+    """Время каждого запроса к Bot API и ошибки по типам (включая повторы после RetryAfter)"""
+
+    async def __call__(
+        self,
+        make_request: NextRequestMiddlewareType[TelegramType],
+        bot: Bot,
+        method: TelegramMethod[TelegramType]
+    ) -> Any:
+        method_name = type(method).__name__
+        started = time.perf_counter()
+        try:
+            return await make_request(bot, method)
+        except Exception as e:
+            metrics.api_errors.inc(method_name, type(e).__name__)
+            raise
+        finally:
+            metrics.api_request_duration.observe(time.perf_counter() - started, method_name)
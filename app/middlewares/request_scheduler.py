@@ -0,0 +1,122 @@
+import asyncio
+import logging
+from collections import OrderedDict
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable, Dict, Optional, Set, Tuple
+
+from aiogram import BaseMiddleware, Bot
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware, NextRequestMiddlewareType
+from aiogram.exceptions import TelegramRetryAfter
+from aiogram.methods import AnswerCallbackQuery, DeleteMessage, TelegramMethod
+from aiogram.methods.base import TelegramType
+from aiogram.types import Message, TelegramObject
+
+from app.config import TELEGRAM_MAX_RETRIES, TELEGRAM_MAX_RETRY_AFTER
+from app.utils.rate_limiter import send_limiter
+
+logger = logging.getLogger(__name__)
+
+# Сколько чатов помнить в трекере последних сообщений
+TRACKED_CHATS_LIMIT = 10000
+
+# Последнее сообщение бота в каждом чате: chat_id -> (message_id, "text" или "media")
+_last_messages: "OrderedDict[int, Tuple[int, str]]" = OrderedDict()
+
+
+def _track(message: Message):
+    _last_messages[message.chat.id] = (message.message_id, "text" if message.text is not None else "media")
+    _last_messages.move_to_end(message.chat.id)
+    if len(_last_messages) > TRACKED_CHATS_LIMIT:
+        _last_messages.popitem(last=False)
+
+
+def message_kind(message: Message) -> Optional[str]:
+    """
+    Тип сообщения ("text" / "media") для выбора метода редактирования.
+    Берётся из трекера, если бот уже менял это сообщение, иначе - из самого сообщения;
+    None - сообщение недоступно (старше 48 часов).
+    """
+    tracked = _last_messages.get(message.chat.id)
+    if tracked and tracked[0] == message.message_id:
+        return tracked[1]
+    if not isinstance(message, Message):
+        return None
+    return "text" if message.text is not None else "media"
+
+
+class _UpdateScope:
+    """Запросы, отправленные в фоне при обработке одного обновления"""
+
+    def __init__(self):
+        self.answered: Set[str] = set()
+        self.tasks: Set[asyncio.Task] = set()
+
+
+_scope: ContextVar[Optional[_UpdateScope]] = ContextVar("request_scope", default=None)
+
+
+class RequestScopeMiddleware(BaseMiddleware):
+    """Ограничивает обработку обновления: фоновые ответы на callback дожидаются до её конца"""
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any]
+    ) -> Any:
+        scope = _UpdateScope()
+        token = _scope.set(scope)
+        try:
+            return await handler(event, data)
+        finally:
+            _scope.reset(token)
+            if scope.tasks:
+                results = await asyncio.gather(*scope.tasks, return_exceptions=True)
+                for result in results:
+                    if isinstance(result, Exception):
+                        logger.warning(f"Callback answer failed: {result}")
+
+
+class RequestScheduler(BaseRequestMiddleware):
+    """
+    Планировщик исходящих запросов к Bot API:
+    - answerCallbackQuery уходит в фоне, параллельно с редактированием сообщения,
+      а повторные ответы на тот же callback (Telegram их всё равно отклоняет) не отправляются;
+    - при RetryAfter запрос повторяется после паузы, общий лимитер отправки тоже приостанавливается;
+    - отправленные и отредактированные сообщения запоминаются в трекере типов сообщений.
+    """
+
+    async def __call__(
+        self,
+        make_request: NextRequestMiddlewareType[TelegramType],
+        bot: Bot,
+        method: TelegramMethod[TelegramType]
+    ) -> Any:
+        scope = _scope.get()
+        if scope is not None and isinstance(method, AnswerCallbackQuery):
+            if method.callback_query_id in scope.answered:
+                return True
+            scope.answered.add(method.callback_query_id)
+            task = asyncio.create_task(self._send(make_request, bot, method))
+            scope.tasks.add(task)
+            return True
+
+        result = await self._send(make_request, bot, method)
+        if isinstance(result, Message):
+            _track(result)
+        elif isinstance(method, DeleteMessage):
+            tracked = _last_messages.get(method.chat_id)
+            if tracked and tracked[0] == method.message_id:
+                del _last_messages[method.chat_id]
+        return result
+
+    async def _send(self, make_request: NextRequestMiddlewareType[TelegramType], bot: Bot, method: TelegramMethod[TelegramType]) -> Any:
+        for attempt in range(TELEGRAM_MAX_RETRIES + 1):
+            try:
+                return await make_request(bot, method)
+            except TelegramRetryAfter as e:
+                if attempt == TELEGRAM_MAX_RETRIES or e.retry_after > TELEGRAM_MAX_RETRY_AFTER:
+                    raise
+                logger.warning(f"{type(method).__name__}: flood limit, retry in {e.retry_after}s")
+                send_limiter.retry_after(e.retry_after)
+                await asyncio.sleep(e.retry_after)
@@ -0,0 +1,152 @@
+import time
+from typing import Any, Awaitable, Callable, Dict, Hashable, Tuple
+from aiogram import BaseMiddleware
+from aiogram.types import Message, CallbackQuery
+from app.config import (
+    THROTTLE_RATE,
+    THROTTLE_BURST,
+    THROTTLE_USER_RATE,
+    THROTTLE_USER_BURST,
+    THROTTLE_DUPLICATE_WINDOW,
+    THROTTLE_REDIS_URL
+)
+
+# Как часто вычищать из памяти записи, которые уже ничего не ограничивают (секунды)
+SWEEP_INTERVAL = 60
+
+
+class MemoryThrottleBackend:
+    """Token bucket в памяти процесса: ключ -> (токены, время обновления)"""
+
+    def __init__(self):
+        self._buckets: Dict[Hashable, Tuple[float, float]] = {}
+        self._seen: Dict[Hashable, float] = {}
+        self._next_sweep = time.monotonic() + SWEEP_INTERVAL
+
+    def _sweep(self, now: float):
+        # Полностью пополненный bucket ничем не отличается от отсутствующего - удаляем.
+        # Запас времени в 10 минут покрывает любые разумные burst / rate
+        self._buckets = {
+            key: bucket for key, bucket in self._buckets.items() if now - bucket[1] < 600
+        }
+        self._seen = {key: expires for key, expires in self._seen.items() if expires > now}
+        self._next_sweep = now + SWEEP_INTERVAL
+
+    async def hit(self, key: Hashable, rate: float, burst: int) -> bool:
+        """Забрать токен; False - лимит исчерпан"""
+        now = time.monotonic()
+        if now >= self._next_sweep:
+            self._sweep(now)
+
+        tokens, updated = self._buckets.get(key, (burst, now))
+        tokens = min(burst, tokens + (now - updated) * rate)
+        allowed = tokens >= 1
+        self._buckets[key] = (tokens - 1 if allowed else tokens, now)
+        return allowed
+
+    async def first_seen(self, key: Hashable, window: float) -> bool:
+        """True, если такого же действия не было последние window секунд"""
+        if window <= 0:
+            return True
+        now = time.monotonic()
+        if self._seen.get(key, 0) > now:
+            return False
+        self._seen[key] = now + window
+        return True
+
+
+class RedisThrottleBackend:
+    """Те же лимиты в Redis, общие для всех экземпляров бота"""
+
+    # Token bucket атомарно на стороне Redis: HASH {t: токены, u: время}, живёт, пока не пополнится
+    HIT_SCRIPT = """
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local state = redis.call('HMGET', KEYS[1], 't', 'u')
+local tokens = tonumber(state[1]) or burst
+local updated = tonumber(state[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - updated) * rate)
+local allowed = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+    allowed = 1
+end
+redis.call('HSET', KEYS[1], 't', tokens, 'u', now)
+redis.call('PEXPIRE', KEYS[1], math.ceil(burst / rate * 1000))
+return allowed
+"""
+
+    def __init__(self, redis):
+        self.redis = redis
+        self._hit = redis.register_script(self.HIT_SCRIPT)
+
+    @staticmethod
+    def _key(key: Hashable) -> str:
+        return "throttle:" + ":".join(map(str, key))
+
+    async def hit(self, key: Hashable, rate: float, burst: int) -> bool:
+        return bool(await self._hit(keys=[self._key(key)], args=[rate, burst, time.time()]))
+
+    async def first_seen(self, key: Hashable, window: float) -> bool:
+        if window <= 0:
+            # Проверка выключена (THROTTLE_DUPLICATE_WINDOW=0); Redis не принимает PX 0
+            return True
+        return bool(await self.redis.set(self._key(key), 1, px=int(window * 1000), nx=True))
+
+
+def create_throttle_backend():
+    """Хранилище лимитов по THROTTLE_REDIS_URL"""
+    if THROTTLE_REDIS_URL:
+        from redis.asyncio import Redis
+
+        return RedisThrottleBackend(Redis.from_url(THROTTLE_REDIS_URL))
+    return MemoryThrottleBackend()
+
+
+def action_prefix(data: str) -> str:
+    """Вид действия: callback_data без id и курсоров ("register_12" -> "register")"""
+    parts = []
+    for part in data.split("_"):
+        if any(char.isdigit() for char in part):
+            break
+        parts.append(part)
+    return "_".join(parts) or data
+
+
+class ThrottlingMiddleware(BaseMiddleware):
+    def __init__(self, backend=None):
+        self.backend = backend or create_throttle_backend()
+
+    async def __call__(
+        self,
+        handler: Callable[[Message, Dict[str, Any]], Awaitable[Any]],
+        event: Message | CallbackQuery,
+        data: Dict[str, Any]
+    ) -> Any:
+        user_id = event.from_user.id
+        if isinstance(event, CallbackQuery):
+            action = event.data or ""
+        else:
+            action = (event.text or "").split()[0] if event.text else "message"
+
+        # Повторное нажатие той же кнопки (двойной тап) - просто гасим «часики» на кнопке.
+        # Сообщения так не отсекаются: два разных текста могут начинаться с одного слова -
+        # их ограничивают только лимиты ниже
+        if isinstance(event, CallbackQuery) and not await self.backend.first_seen(
+            (user_id, "seen", action), THROTTLE_DUPLICATE_WINDOW
+        ):
+            await event.answer()
+            return None
+
+        # Лимит на вид действия и общий лимит пользователя
+        allowed = (
+            await self.backend.hit((user_id, action_prefix(action)), THROTTLE_RATE, THROTTLE_BURST)
+            and await self.backend.hit((user_id,), THROTTLE_USER_RATE, THROTTLE_USER_BURST)
+        )
+        if allowed:
+            return await handler(event, data)
+
+        if isinstance(event, CallbackQuery):
+            await event.answer("⏳ Слишком часто, подождите немного")
+        return None
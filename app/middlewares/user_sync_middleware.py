@@ -0,0 +1,18 @@
+from typing import Any, Awaitable, Callable, Dict
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject, User as TelegramUser
+from app.utils.user_sync import user_sync
+
+class UserSyncMiddleware(BaseMiddleware):
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any]
+    ) -> Any:
+        # Профиль отправителя уходит в пакетную запись, хендлеры получают id из таблицы users
+        # аргументом user_id - без отдельного запроса и без гонок get-or-create
+        from_user: TelegramUser = data.get("event_from_user")
+        if from_user is not None and not from_user.is_bot:
+            data["user_id"] = await user_sync.resolve(from_user)
+        return await handler(event, data)
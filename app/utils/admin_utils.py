@@ -0,0 +1,54 @@
+from typing import Optional
+
+from aiogram.types import User as TelegramUser
+from sqlalchemy import select
+
+from app.config import ADMIN_IDS, ROLE_CACHE_TTL
+from app.database.database import get_db, dialect_insert
+from app.database.models import User
+from app.utils.cache import TTLCache
+from app.utils import invalidation
+
+# Кэш ролей: telegram_id -> "admin" / "moderator" / None
+role_cache = TTLCache(ROLE_CACHE_TTL, maxsize=10000)
+invalidation.register("role", role_cache.invalidate)
+
+
+async def _load_role(telegram_user: TelegramUser) -> Optional[str]:
+    role = None
+    async for db in get_db():
+        user = await db.execute(select(User).where(User.telegram_id == telegram_user.id))
+        user = user.scalar_one_or_none()
+        
+        if user and user.is_admin:
+            role = "admin"
+        elif telegram_user.id in ADMIN_IDS:
+            # Пользователь из списка админов - отмечаем его в БД (обычно запись уже создана синхронизацией профилей)
+            insert_stmt = dialect_insert(User.__table__)
+            await db.execute(
+                insert_stmt
+                .values(
+                    telegram_id=telegram_user.id,
+                    username=telegram_user.username,
+                    first_name=telegram_user.first_name,
+                    last_name=telegram_user.last_name,
+                    is_admin=True
+                )
+                .on_conflict_do_update(index_elements=["telegram_id"], set_={"is_admin": True})
+            )
+            await db.commit()
+            role = "admin"
+        elif user and user.is_moderator:
+            role = "moderator"
+    return role
+
+
+async def get_user_role(telegram_user: TelegramUser) -> Optional[str]:
+    """Роль пользователя: "admin", "moderator" или None (результат кэшируется)"""
+    return await role_cache.get_or_load(telegram_user.id, lambda: _load_role(telegram_user))
+
+
+def invalidate_role(telegram_id: int):
+    """Сбросить закэшированную роль (после изменения флагов админа/модератора) во всех экземплярах бота"""
+    role_cache.invalidate(telegram_id)
+    invalidation.publish("role", telegram_id)
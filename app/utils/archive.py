@@ -0,0 +1,128 @@
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import List, Optional
+
+from sqlalchemy import DateTime, select, insert, delete, literal, union_all
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import ARCHIVE_AFTER_DAYS, ARCHIVE_CHECK_INTERVAL, ARCHIVE_BATCH_SIZE
+from app.database.database import get_db
+from app.database.models import (
+    Event,
+    EventArchive,
+    Registration,
+    RegistrationArchive,
+    SentReminder,
+    WaitlistEntry
+)
+
+logger = logging.getLogger(__name__)
+
+_archiver: Optional[asyncio.Task] = None
+
+
+async def move_to_archive(db: AsyncSession, event_ids: List[int], deleted: bool = False):
+    """
+    Перенести мероприятия и их регистрации в архивные таблицы одной транзакцией.
+    Лист ожидания и отметки о напоминаниях после переноса не нужны - они удаляются.
+    deleted - мероприятие удалено админом (мягкое удаление: данные остаются в архиве).
+    """
+    now = datetime.utcnow()
+    event_columns = [column.name for column in Event.__table__.columns]
+    await db.execute(
+        insert(EventArchive.__table__).from_select(
+            event_columns + ["archived_at", "deleted_at"],
+            select(
+                *Event.__table__.columns,
+                literal(now, DateTime()),
+                literal(now if deleted else None, DateTime())
+            ).where(Event.id.in_(event_ids))
+        )
+    )
+    await db.execute(
+        insert(RegistrationArchive.__table__).from_select(
+            ["user_id", "event_id", "registered_at"],
+            select(Registration.user_id, Registration.event_id, Registration.registered_at)
+            .where(Registration.event_id.in_(event_ids))
+        )
+    )
+    await db.execute(delete(WaitlistEntry).where(WaitlistEntry.event_id.in_(event_ids)))
+    await db.execute(delete(SentReminder).where(SentReminder.event_id.in_(event_ids)))
+    await db.execute(delete(Registration).where(Registration.event_id.in_(event_ids)))
+    await db.execute(delete(Event).where(Event.id.in_(event_ids)))
+    await db.commit()
+
+
+async def archive_finished_events() -> int:
+    """Перенести в архив все мероприятия старше ARCHIVE_AFTER_DAYS дней, пачками по ARCHIVE_BATCH_SIZE"""
+    cutoff = datetime.now() - timedelta(days=ARCHIVE_AFTER_DAYS)
+    archived = 0
+    while True:
+        async for db in get_db():
+            # Самые старые мероприятия по индексу events(date, id)
+            event_ids = await db.execute(
+                select(Event.id)
+                .where(Event.date < cutoff)
+                .order_by(Event.date, Event.id)
+                .limit(ARCHIVE_BATCH_SIZE)
+            )
+            event_ids = event_ids.scalars().all()
+            if event_ids:
+                await move_to_archive(db, event_ids)
+        if not event_ids:
+            break
+        archived += len(event_ids)
+
+    if archived:
+        logger.info(f"Archived {archived} finished events")
+    return archived
+
+
+async def run_archiver():
+    while True:
+        try:
+            await archive_finished_events()
+        except Exception as e:
+            logger.error(f"Error archiving events: {e}")
+        await asyncio.sleep(ARCHIVE_CHECK_INTERVAL)
+
+
+def start_archiver() -> asyncio.Task:
+    """Запустить фоновую архивацию завершившихся мероприятий"""
+    global _archiver
+    if _archiver is None or _archiver.done():
+        _archiver = asyncio.create_task(run_archiver())
+    return _archiver
+
+
+def events_with_archive():
+    """
+    Мероприятия вместе с архивом (кроме удалённых) - подзапрос с колонками
+    id, title, date, registered_count, archived для выгрузок и статистики
+    """
+    return union_all(
+        select(Event.id, Event.title, Event.date, Event.registered_count, literal(False).label("archived")),
+        select(
+            EventArchive.id,
+            EventArchive.title,
+            EventArchive.date,
+            EventArchive.registered_count,
+            literal(True).label("archived")
+        ).where(EventArchive.deleted_at.is_(None))
+    ).subquery("all_events")
+
+
+def registrations_with_archive():
+    """Регистрации вместе с архивными - подзапрос с колонками user_id, event_id, registered_at"""
+    return union_all(
+        select(Registration.user_id, Registration.event_id, Registration.registered_at),
+        select(RegistrationArchive.user_id, RegistrationArchive.event_id, RegistrationArchive.registered_at)
+    ).subquery("all_registrations")
+
+
+async def get_event_with_archive(db: AsyncSession, event_id: int):
+    """Мероприятие по id - из действующих или из архива (без удалённых); None, если не найдено"""
+    events = events_with_archive()
+    result = await db.execute(select(events).where(events.c.id == event_id))
+    return result.one_or_none()
@@ -0,0 +1,177 @@
+import asyncio
+import logging
+from datetime import datetime
+from typing import Dict, Optional
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramAPIError, TelegramForbiddenError, TelegramBadRequest, TelegramRetryAfter
+from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
+from sqlalchemy import select, update
+
+from app.config import BROADCAST_WORKERS, BROADCAST_BATCH_SIZE
+from app.database.database import get_db, get_read_db
+from app.database.models import User, Broadcast
+from app.utils.rate_limiter import send_limiter
+
+logger = logging.getLogger(__name__)
+
+# Запущенные рассылки: broadcast_id -> задача
+_running: Dict[int, asyncio.Task] = {}
+
+
+def get_broadcast_markup(event_id: Optional[int]) -> Optional[InlineKeyboardMarkup]:
+    """Кнопка регистрации, прикрепляемая к рассылке"""
+    if not event_id:
+        return None
+    return InlineKeyboardMarkup(inline_keyboard=[[
+        InlineKeyboardButton(text="📝 Зарегистрироваться", callback_data=f"register_{event_id}")
+    ]])
+
+
+async def deliver(bot: Bot, chat_id: int, text: str, reply_markup=None) -> bool:
+    """Отправить одно сообщение с учётом лимитов и RetryAfter. Возвращает True при успехе"""
+    while True:
+        await send_limiter.wait(chat_id)
+        try:
+            await bot.send_message(chat_id, text, reply_markup=reply_markup)
+            return True
+        except TelegramRetryAfter as e:
+            logger.warning(f"Flood control, waiting {e.retry_after}s")
+            send_limiter.retry_after(e.retry_after)
+        except (TelegramForbiddenError, TelegramBadRequest):
+            # Пользователь заблокировал бота или чат недоступен
+            return False
+        except TelegramAPIError as e:
+            logger.warning(f"Failed to send message to {chat_id}: {e}")
+            return False
+
+
+async def _worker(bot: Bot, queue: asyncio.Queue, text: str, reply_markup, stats: Dict[str, int]):
+    while True:
+        chat_id = await queue.get()
+        try:
+            if await deliver(bot, chat_id, text, reply_markup):
+                stats["sent"] += 1
+            else:
+                stats["failed"] += 1
+        except Exception as e:
+            logger.error(f"Unexpected error while sending to {chat_id}: {e}")
+            stats["failed"] += 1
+        finally:
+            queue.task_done()
+
+
+async def _fetch_recipients(last_user_id: int):
+    """Следующая пачка получателей по возрастанию User.id - это и есть точка возобновления"""
+    async for db in get_read_db():
+        recipients = await db.execute(
+            select(User.id, User.telegram_id)
+            .where(User.id > last_user_id)
+            .order_by(User.id)
+            .limit(BROADCAST_BATCH_SIZE)
+        )
+        return recipients.all()
+
+
+async def _save_progress(broadcast_id: int, last_user_id: int, sent: int, failed: int):
+    async for db in get_db():
+        await db.execute(
+            update(Broadcast)
+            .where(Broadcast.id == broadcast_id)
+            .values(
+                last_user_id=last_user_id,
+                sent_count=Broadcast.sent_count + sent,
+                failed_count=Broadcast.failed_count + failed
+            )
+        )
+        await db.commit()
+
+
+async def run_broadcast(bot: Bot, broadcast_id: int):
+    """Выполнить рассылку, продолжая с сохранённой позиции"""
+    async for db in get_db():
+        broadcast = await db.get(Broadcast, broadcast_id)
+        if not broadcast or broadcast.status == "finished":
+            return
+
+        broadcast.status = "running"
+        await db.commit()
+
+    text = broadcast.text
+    reply_markup = get_broadcast_markup(broadcast.event_id)
+    last_user_id = broadcast.last_user_id or 0
+
+    queue = asyncio.Queue(maxsize=BROADCAST_BATCH_SIZE)
+    stats = {"sent": 0, "failed": 0}
+    workers = [
+        asyncio.create_task(_worker(bot, queue, text, reply_markup, stats))
+        for _ in range(BROADCAST_WORKERS)
+    ]
+
+    try:
+        while True:
+            recipients = await _fetch_recipients(last_user_id)
+            if not recipients:
+                break
+
+            for _, telegram_id in recipients:
+                await queue.put(telegram_id)
+            await queue.join()
+
+            # Сохраняем прогресс после каждой пачки: при перезапуске повторится не больше одной пачки
+            last_user_id = recipients[-1].id
+            await _save_progress(broadcast_id, last_user_id, stats["sent"], stats["failed"])
+            stats["sent"] = stats["failed"] = 0
+    finally:
+        for worker in workers:
+            worker.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+
+    async for db in get_db():
+        broadcast = await db.get(Broadcast, broadcast_id)
+        broadcast.status = "finished"
+        broadcast.finished_at = datetime.utcnow()
+        await db.commit()
+
+    logger.info(
+        f"Broadcast {broadcast_id} finished: sent {broadcast.sent_count}, failed {broadcast.failed_count}"
+    )
+    if broadcast.admin_id:
+        try:
+            await bot.send_message(
+                broadcast.admin_id,
+                f"✅ Рассылка завершена\n\n"
+                f"📨 Доставлено: {broadcast.sent_count}\n"
+                f"❌ Не доставлено: {broadcast.failed_count}"
+            )
+        except TelegramAPIError:
+            pass
+
+
+def start_broadcast(bot: Bot, broadcast_id: int) -> asyncio.Task:
+    """Запустить рассылку в фоне"""
+    task = _running.get(broadcast_id)
+    if task and not task.done():
+        return task
+
+    task = asyncio.create_task(run_broadcast(bot, broadcast_id))
+    _running[broadcast_id] = task
+    task.add_done_callback(lambda t: _on_broadcast_done(broadcast_id, t))
+    return task
+
+
+def _on_broadcast_done(broadcast_id: int, task: asyncio.Task):
+    _running.pop(broadcast_id, None)
+    if not task.cancelled() and task.exception():
+        logger.error(f"Broadcast {broadcast_id} failed: {task.exception()}")
+
+
+async def resume_broadcasts(bot: Bot):
+    """Возобновить рассылки, прерванные перезапуском бота"""
+    async for db in get_db():
+        broadcasts = await db.execute(
+            select(Broadcast.id).where(Broadcast.status != "finished")
+        )
+        for broadcast_id in broadcasts.scalars().all():
+            logger.info(f"Resuming broadcast {broadcast_id}")
+            start_broadcast(bot, broadcast_id)
@@ -0,0 +1,89 @@
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, Hashable, Tuple
+
+from app.config import EVENTS_CACHE_TTL, SEARCH_CACHE_TTL
+
+
+class TTLCache:
+    """Простой in-memory кэш с временем жизни записей"""
+
+    def __init__(self, ttl: float, maxsize: int = 1024):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._data: Dict[Hashable, Tuple[float, Any]] = {}
+        self._loading: Dict[Hashable, asyncio.Future] = {}
+        # Растёт при каждой инвалидации, чтобы загрузка, начатая до неё, не положила в кэш устаревшее значение
+        self._generation = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        item = self._data.get(key)
+        if item is None:
+            return default
+        expires_at, value = item
+        if expires_at < time.monotonic():
+            del self._data[key]
+            return default
+        return value
+
+    def set(self, key: Hashable, value: Any):
+        if key not in self._data and len(self._data) >= self.maxsize:
+            # Вытесняем самую старую запись
+            self._data.pop(next(iter(self._data)))
+        self._data[key] = (time.monotonic() + self.ttl, value)
+
+    def invalidate(self, key: Hashable):
+        self._data.pop(key, None)
+        self._loading.pop(key, None)
+        self._generation += 1
+
+    def clear(self):
+        self._data.clear()
+        self._loading.clear()
+        self._generation += 1
+
+    async def get_or_load(self, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> Any:
+        """Вернуть значение из кэша или загрузить его; одновременные промахи по ключу ждут одну загрузку"""
+        _missing = object()
+        value = self.get(key, _missing)
+        if value is not _missing:
+            return value
+
+        future = self._loading.get(key)
+        if future is not None:
+            return await asyncio.shield(future)
+
+        future = asyncio.get_running_loop().create_future()
+        self._loading[key] = future
+        generation = self._generation
+        try:
+            value = await loader()
+        except Exception as e:
+            future.set_exception(e)
+            # Исключение уже передано ожидающим, помечаем его полученным
+            future.exception()
+            raise
+        else:
+            if generation == self._generation:
+                self.set(key, value)
+            future.set_result(value)
+            return value
+        finally:
+            if not future.done():
+                # Загрузка отменена - ожидающие тоже получат отмену, а не зависнут
+                future.cancel()
+            if self._loading.get(key) is future:
+                del self._loading[key]
+
+
+# Кэш отрисованных страниц списка мероприятий: page -> (text, keyboard)
+events_page_cache = TTLCache(EVENTS_CACHE_TTL)
+
+# Кэш результатов поиска мероприятий: слова запроса -> список мероприятий
+search_cache = TTLCache(SEARCH_CACHE_TTL)
+
+
+def invalidate_events_cache():
+    """Сбросить кэш списка мероприятий и поиска (после создания, изменения или удаления мероприятия)"""
+    events_page_cache.clear()
+    search_cache.clear()
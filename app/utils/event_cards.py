@@ -0,0 +1,129 @@
+import json
+from typing import List, Optional
+
+from aiogram.utils.markdown import hbold, hitalic
+from aiogram.utils.text_decorations import html_decoration
+
+from app.utils.cache import TTLCache
+
+# Меняется при изменении разметки карточек, чтобы не отдавать собранные по старому шаблону
+RENDER_VERSION = 1
+
+# Карточки по ключу (id, версия мероприятия); старые версии вытесняются сами
+EVENT_CARD_CACHE_SIZE = 1000
+EVENT_CARD_CACHE_TTL = 3600
+
+_cards = TTLCache(EVENT_CARD_CACHE_TTL, maxsize=EVENT_CARD_CACHE_SIZE)
+
+quote = html_decoration.quote
+
+
+def parse_speakers(raw: Optional[str]) -> List[str]:
+    """Спикеры хранятся JSON-списком; старые записи - обычной строкой"""
+    if not raw or not raw.strip():
+        return []
+    try:
+        speakers = json.loads(raw)
+    except ValueError:
+        return [raw.strip()]
+    if not isinstance(speakers, list):
+        speakers = [speakers]
+    return [str(speaker) for speaker in speakers if str(speaker).strip()]
+
+
+def _participants(count: int, max_participants: Optional[int]) -> str:
+    return f"{count} из {max_participants}" if max_participants else str(count)
+
+
+class EventCard:
+    """Неизменяемые части текстов мероприятия, собранные один раз на версию мероприятия"""
+
+    def __init__(self, event):
+        self.event_id = event.id
+        self.title = event.title
+        self.max_participants = event.max_participants
+        self.speakers = parse_speakers(event.speakers)
+        self.date = event.date.strftime("%d.%m.%Y")
+        self.time = event.date.strftime("%H:%M")
+
+        speakers = quote(", ".join(self.speakers))
+        location = quote(event.location) if event.location else None
+
+        # Пункт списка ближайших мероприятий
+        speakers_line = f"\n👨‍🏫 {speakers}" if speakers else ""
+        self.list_item = (
+            f"{hbold(event.title)}\n"
+            f"📅 {self.date} в {self.time}\n"
+            f"📍 {location or 'Место уточняется'}"
+            f"{speakers_line}\n\n"
+            f"➡️ /event_{event.id} - подробнее\n\n"
+        )
+
+        # Сообщение, которое отправляется выбором результата inline-поиска в любой чат
+        share_text = f"📅 {hbold(event.title)}\n"
+        if event.short_description:
+            share_text += f"{hitalic(event.short_description)}\n"
+        share_text += f"\n🗓 {self.date} в {self.time}\n📍 {location or 'Место уточняется'}"
+        self.share_text = share_text
+
+        # Подробная карточка: до строки с количеством участников и после неё
+        header = f"📅 {hbold(event.title)}\n\n"
+        if event.short_description:
+            header += f"{hitalic(event.short_description)}\n\n"
+        header += f"📅 {hbold('Дата:')} {self.date}\n"
+        header += f"⏰ {hbold('Время:')} {self.time}\n"
+        header += f"📍 {hbold('Место:')} {location or 'Уточняется'}\n"
+        if speakers:
+            header += f"👨‍🏫 {hbold('Спикеры:')} {speakers}\n"
+        self.detail_header = header
+        self.detail_description = (
+            f"{hbold('Описание:')}\n{quote(event.full_description)}\n\n" if event.full_description else ""
+        )
+
+        # Карточка в админке
+        summary = f"📅 Мероприятие: {quote(event.title)}\n"
+        summary += f"📅 Дата: {self.date} {self.time}\n"
+        if location:
+            summary += f"📍 Место: {location}\n"
+        if speakers:
+            summary += f"👥 Спикеры: {speakers}\n"
+        self.admin_summary = summary
+
+        # Текущие значения полей для формы редактирования
+        fields = f"✏️ Редактирование мероприятия '{quote(event.title)}'\n\n"
+        fields += "Выберите поле для редактирования:\n\n"
+        fields += f"📝 Название: {quote(event.title)}\n"
+        fields += f"📝 Краткое описание: {quote(event.short_description or 'Не указано')}\n"
+        fields += f"📝 Полное описание: {quote(event.full_description or 'Не указано')}\n"
+        fields += f"📅 Дата: {self.date} {self.time}\n"
+        fields += f"📍 Место: {location or 'Не указано'}\n"
+        fields += f"👥 Спикеры: {speakers or 'Не указаны'}\n"
+        fields += f"✅ Регистрация: {'Требуется' if event.registration_required else 'Не требуется'}\n"
+        fields += f"👥 Максимум участников: {event.max_participants or 'Без ограничений'}\n"
+        self.edit_text = fields
+
+    def detail_text(self, participants_count: int, status: str) -> str:
+        """Подробная карточка с количеством участников и статусом пользователя"""
+        return (
+            f"{self.detail_header}"
+            f"👥 {hbold('Зарегистрировано:')} {_participants(participants_count, self.max_participants)}\n\n"
+            f"{self.detail_description}"
+            f"{status}"
+        )
+
+    def manage_text(self, participants_count: int) -> str:
+        """Карточка мероприятия в админке"""
+        return (
+            f"{self.admin_summary}\n"
+            f"👥 Зарегистрировано участников: {_participants(participants_count, self.max_participants)}"
+        )
+
+
+def get_event_card(event) -> EventCard:
+    """Карточка мероприятия из кэша; собирается заново только после изменения мероприятия"""
+    key = (event.id, event.version, RENDER_VERSION)
+    card = _cards.get(key)
+    if card is None:
+        card = EventCard(event)
+        _cards.set(key, card)
+    return card
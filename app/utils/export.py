@@ -0,0 +1,127 @@
+import asyncio
+import csv
+import gzip
+import os
+import re
+import tempfile
+from datetime import datetime
+from typing import Optional, Tuple
+
+from sqlalchemy import select
+
+from app.database.database import get_read_db
+from app.database.models import User
+from app.utils.archive import events_with_archive, registrations_with_archive
+
+# Форматы выгрузки: расширение файла
+EXPORT_FORMATS = {
+    "csv": "csv",
+    "gz": "csv.gz",
+    "xlsx": "xlsx",
+}
+
+# Сколько строк забирать с сервера БД за раз
+EXPORT_CHUNK_SIZE = 1000
+
+
+class _XlsxWriter:
+    """Потоковая запись XLSX (openpyxl в режиме write_only не держит строки в памяти)"""
+
+    def __init__(self, path: str):
+        from openpyxl import Workbook
+
+        self.path = path
+        self.workbook = Workbook(write_only=True)
+        self.sheet = self.workbook.create_sheet("Участники")
+
+    def writerows(self, rows):
+        for row in rows:
+            self.sheet.append(row)
+
+    def close(self):
+        self.workbook.save(self.path)
+
+
+def _open_writer(path: str, fmt: str):
+    if fmt == "xlsx":
+        writer = _XlsxWriter(path)
+        return writer, writer
+    if fmt == "gz":
+        file = gzip.open(path, "wt", encoding="utf-8-sig", newline="")
+    else:
+        # utf-8-sig для корректного отображения в Excel
+        file = open(path, "w", encoding="utf-8-sig", newline="")
+    return csv.writer(file), file
+
+
+def _safe_filename(text: str) -> str:
+    return re.sub(r"[^\w\-]+", "_", text).strip("_")[:50] or "event"
+
+
+async def export_participants_file(event_id: Optional[int] = None, fmt: str = "csv") -> Tuple[str, str, int]:
+    """
+    Выгрузить участников одного мероприятия (или всех мероприятий) во временный файл.
+    Строки читаются с сервера БД порциями и сразу пишутся в файл, не накапливаясь в памяти;
+    запись файла (сжатие, сборка XLSX) идёт в отдельном потоке, не блокируя обработку обновлений.
+    Возвращает путь к файлу, имя файла для отправки и количество строк; файл удаляет вызывающий.
+    """
+    # Только нужные колонки: без ORM-объектов в сессии ничего не накапливается.
+    # Регистрации и мероприятия берутся вместе с архивом (завершившиеся мероприятия переносятся туда)
+    registrations = registrations_with_archive()
+    events = events_with_archive()
+    query = (
+        select(
+            registrations.c.registered_at,
+            User.first_name,
+            User.last_name,
+            User.username,
+            User.telegram_id,
+            events.c.title,
+            events.c.date
+        )
+        .select_from(registrations)
+        .join(User, registrations.c.user_id == User.id)
+        .join(events, registrations.c.event_id == events.c.id)
+        .execution_options(yield_per=EXPORT_CHUNK_SIZE)
+    )
+    if event_id is not None:
+        query = query.where(registrations.c.event_id == event_id).order_by(registrations.c.registered_at.desc())
+        header = ['№', 'Имя', 'Username', 'Telegram ID', 'Дата регистрации']
+    else:
+        query = query.order_by(events.c.date.desc(), events.c.id, registrations.c.registered_at)
+        header = ['№', 'Мероприятие', 'Дата мероприятия', 'Имя', 'Username', 'Telegram ID', 'Дата регистрации']
+
+    fd, path = tempfile.mkstemp(suffix=f".{EXPORT_FORMATS[fmt]}")
+    os.close(fd)
+    writer, file = await asyncio.to_thread(_open_writer, path, fmt)
+    rows = 0
+    title = "all_events" if event_id is None else "event"
+    try:
+        await asyncio.to_thread(writer.writerows, [header])
+        async for db in get_read_db():
+            result = await db.stream(query)
+            async for partition in result.partitions(EXPORT_CHUNK_SIZE):
+                lines = []
+                for row in partition:
+                    rows += 1
+                    values = [
+                        " ".join(filter(None, [row.first_name, row.last_name])),
+                        row.username or '',
+                        row.telegram_id,
+                        row.registered_at.strftime("%d.%m.%Y %H:%M")
+                    ]
+                    if event_id is None:
+                        values = [row.title, row.date.strftime("%d.%m.%Y %H:%M")] + values
+                    else:
+                        title = row.title
+                    lines.append([rows] + values)
+                # Порция пишется в отдельном потоке - тем временем обрабатываются другие обновления
+                await asyncio.to_thread(writer.writerows, lines)
+    except BaseException:
+        await asyncio.to_thread(file.close)
+        os.remove(path)
+        raise
+    await asyncio.to_thread(file.close)
+
+    filename = f"participants_{_safe_filename(title)}_{datetime.now().strftime('%d_%m_%Y')}.{EXPORT_FORMATS[fmt]}"
+    return path, filename, rows
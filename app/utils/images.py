@@ -0,0 +1,160 @@
+import asyncio
+import hashlib
+import io
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple, Union
+
+from aiogram import Bot
+from aiogram.types import BufferedInputFile, Message
+from PIL import Image, ImageOps
+from sqlalchemy import select
+
+from app.config import IMAGES_DIR, IMAGE_WORKERS, IMAGE_JPEG_QUALITY
+from app.database.database import get_db, dialect_insert
+from app.database.models import ImageFile
+
+# Размеры изображений: наибольшая сторона в пикселях.
+# Фото крупнее 1280 px Telegram всё равно пережимает, поэтому больше не отправляем
+IMAGE_SIZES = {
+    "card": 1280,
+}
+
+# Pillow работает синхронно - обработка идёт в отдельных потоках, не блокируя обработку обновлений
+_executor = ThreadPoolExecutor(max_workers=IMAGE_WORKERS, thread_name_prefix="images")
+
+# file_id уже загруженных версий: (исходник, размер) -> file_id
+_file_ids: Dict[Tuple[str, str], str] = {}
+# Первая загрузка каждой версии идёт под замком, чтобы одновременные просмотры не загрузили её дважды.
+# Рядом с замком - число ожидающих его вызовов: запись удаляется, только когда ждущих не осталось
+_upload_locks: Dict[Tuple[str, str], List[Union[asyncio.Lock, int]]] = {}
+
+
+def is_local_image(source: Optional[str]) -> bool:
+    """В image_path старых мероприятий лежит file_id, в новых - путь к исходнику"""
+    if not source:
+        return False
+    # Загруженные через бота лежат в IMAGES_DIR: их file_id может быть в БД, даже если файла нет на этом экземпляре
+    return source.startswith(os.path.join(IMAGES_DIR, "")) or os.path.isfile(source)
+
+
+def _detect_format(data: bytes) -> str:
+    with Image.open(io.BytesIO(data)) as image:
+        image.verify()
+        return image.format.lower()
+
+
+def _render(path: str, max_side: int) -> bytes:
+    with Image.open(path) as image:
+        image = ImageOps.exif_transpose(image)
+        if image.mode != "RGB":
+            # Прозрачность (PNG, GIF) - на белый фон, JPEG её не поддерживает
+            background = Image.new("RGB", image.size, "white")
+            rgba = image.convert("RGBA")
+            background.paste(rgba, mask=rgba.split()[-1])
+            image = background
+        image.thumbnail((max_side, max_side), Image.LANCZOS)
+        buffer = io.BytesIO()
+        image.save(buffer, "JPEG", quality=IMAGE_JPEG_QUALITY, optimize=True, progressive=True)
+        return buffer.getvalue()
+
+
+def _write_file(path: str, data: bytes):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as file:
+        file.write(data)
+    os.replace(tmp_path, path)
+
+
+async def render_image(source: str, size: str = "card") -> bytes:
+    """Уменьшить и сжать исходник до размера size (в пуле потоков)"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_executor, _render, source, IMAGE_SIZES[size])
+
+
+async def save_upload(bot: Bot, file_id: str) -> str:
+    """
+    Скачать присланное админом изображение и сохранить исходник в IMAGES_DIR.
+    Имя файла - хэш содержимого, так что повторная загрузка того же изображения не создаёт копий.
+    Возвращает путь, который хранится в Event.image_path.
+    """
+    buffer = io.BytesIO()
+    await bot.download(file_id, destination=buffer)
+    data = buffer.getvalue()
+
+    loop = asyncio.get_running_loop()
+    # Заодно проверяем, что это действительно изображение
+    image_format = await loop.run_in_executor(_executor, _detect_format, data)
+
+    os.makedirs(IMAGES_DIR, exist_ok=True)
+    path = os.path.join(IMAGES_DIR, f"{hashlib.sha256(data).hexdigest()[:32]}.{image_format}")
+    if not os.path.exists(path):
+        await loop.run_in_executor(_executor, _write_file, path, data)
+    return path
+
+
+async def get_file_id(source: str, size: str = "card") -> Optional[str]:
+    """file_id загруженной версии изображения (из памяти, затем из БД) или None"""
+    key = (source, size)
+    file_id = _file_ids.get(key)
+    if file_id is None:
+        async for db in get_db():
+            result = await db.execute(
+                select(ImageFile.file_id).where(ImageFile.source == source, ImageFile.size == size)
+            )
+            file_id = result.scalar_one_or_none()
+        if file_id:
+            _file_ids[key] = file_id
+    return file_id
+
+
+async def remember_file_id(source: str, size: str, message: Union[Message, bool, None]):
+    """Запомнить file_id только что загруженного фото"""
+    if not isinstance(message, Message) or not message.photo:
+        return
+    file_id = message.photo[-1].file_id
+    _file_ids[(source, size)] = file_id
+    async for db in get_db():
+        await db.execute(
+            dialect_insert(ImageFile.__table__)
+            .values(source=source, size=size, file_id=file_id)
+            .on_conflict_do_update(index_elements=["source", "size"], set_={"file_id": file_id})
+        )
+        await db.commit()
+
+
+async def send_cached_photo(
+    source: str,
+    send: Callable[[Union[str, BufferedInputFile]], Awaitable[Union[Message, bool]]],
+    size: str = "card"
+) -> Union[Message, bool]:
+    """
+    Отправить изображение через send(media) - answer_photo, edit_media и т.п.
+    Уже загруженная версия отправляется по file_id; иначе исходник сжимается,
+    загружается один раз и его file_id запоминается для всех следующих показов.
+    """
+    if not is_local_image(source):
+        # file_id из старых записей отправляем как есть
+        return await send(source)
+
+    file_id = await get_file_id(source, size)
+    if file_id:
+        return await send(file_id)
+
+    key = (source, size)
+    entry = _upload_locks.setdefault(key, [asyncio.Lock(), 0])
+    entry[1] += 1
+    try:
+        async with entry[0]:
+            file_id = await get_file_id(source, size)
+            if file_id:
+                return await send(file_id)
+
+            data = await render_image(source, size)
+            message = await send(BufferedInputFile(data, filename=f"{size}.jpg"))
+            await remember_file_id(source, size, message)
+            return message
+    finally:
+        entry[1] -= 1
+        if entry[1] == 0:
+            del _upload_locks[key]
@@ -0,0 +1,92 @@
+import asyncio
+import json
+import logging
+import uuid
+from typing import Callable, Dict, Hashable, Optional
+
+from app.config import CACHE_REDIS_URL
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = "cache_invalidation"
+# Пауза перед переподключением к Redis после ошибки (секунды)
+RECONNECT_DELAY = 5
+
+# Отличает сообщения этого процесса: свой кэш он обновляет сам
+INSTANCE_ID = uuid.uuid4().hex
+
+# Имя кэша -> функция, сбрасывающая в нём ключ
+_handlers: Dict[str, Callable[[Hashable], None]] = {}
+_redis = None
+_listener: Optional[asyncio.Task] = None
+
+
+def register(name: str, handler: Callable[[Hashable], None]):
+    """Как сбросить ключ кэша name, когда его изменил другой экземпляр бота"""
+    _handlers[name] = handler
+
+
+def _client(redis=None):
+    global _redis
+    if redis is not None:
+        _redis = redis
+    elif _redis is None and CACHE_REDIS_URL:
+        from redis.asyncio import Redis
+
+        _redis = Redis.from_url(CACHE_REDIS_URL)
+    return _redis
+
+
+def publish(name: str, key: Hashable = None):
+    """
+    Сообщить остальным экземплярам бота, что ключ кэша name устарел.
+    Без CACHE_REDIS_URL ничего не делает - другие процессы увидят изменение по истечении TTL.
+    """
+    redis = _client()
+    if redis is None:
+        return
+    message = json.dumps({"origin": INSTANCE_ID, "name": name, "key": key})
+    task = asyncio.get_running_loop().create_task(redis.publish(CHANNEL, message))
+    task.add_done_callback(_log_publish_error)
+
+
+def _log_publish_error(task: asyncio.Task):
+    if not task.cancelled() and task.exception() is not None:
+        logger.warning(f"Error publishing cache invalidation: {task.exception()}")
+
+
+def apply(raw: bytes):
+    """Применить сообщение о сбросе кэша, пришедшее от другого экземпляра"""
+    message = json.loads(raw)
+    if message["origin"] == INSTANCE_ID:
+        return
+    handler = _handlers.get(message["name"])
+    if handler is not None:
+        handler(message["key"])
+
+
+async def _listen(redis):
+    while True:
+        try:
+            async with redis.pubsub() as pubsub:
+                await pubsub.subscribe(CHANNEL)
+                async for message in pubsub.listen():
+                    if message["type"] == "message":
+                        apply(message["data"])
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            # Пока подписки нет, устаревшие записи живут не дольше TTL своих кэшей
+            logger.error(f"Cache invalidation listener error: {e}")
+            await asyncio.sleep(RECONNECT_DELAY)
+
+
+def start_invalidation_listener(redis=None) -> Optional[asyncio.Task]:
+    """Подписаться на сбросы кэшей от других экземпляров бота (если задан CACHE_REDIS_URL)"""
+    global _listener
+    redis = _client(redis)
+    if redis is None:
+        return None
+    if _listener is None or _listener.done():
+        _listener = asyncio.create_task(_listen(redis))
+    return _listener
@@ -0,0 +1,180 @@
+import logging
+from contextvars import ContextVar
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from aiohttp import web
+
+from app.config import METRICS_HOST, METRICS_PORT
+
+logger = logging.getLogger(__name__)
+
+# Границы корзин гистограмм времени (секунды)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Границы корзин числа запросов к БД за одно обновление
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34)
+
+INF_LABEL = 'le="+Inf"'
+
+_metrics: List["_Metric"] = []
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        _metrics.append(self)
+
+    def _samples(self) -> Iterable[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self._samples())
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    """Монотонно растущий счётчик"""
+
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = ()):
+        super().__init__(name, documentation, labels)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, *labels: str, amount: float = 1):
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def _samples(self) -> Iterable[str]:
+        for labels, value in self._values.items():
+            yield f"{self.name}{_format_labels(self.labels, labels)} {_format_value(value)}"
+
+
+class Histogram(_Metric):
+    """Распределение значений по корзинам (плюс сумма и количество)"""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(sorted(buckets))
+        # labels -> [счётчики по корзинам..., сумма, количество]
+        self._values: Dict[Tuple[str, ...], List[float]] = {}
+
+    def observe(self, value: float, *labels: str):
+        state = self._values.get(labels)
+        if state is None:
+            state = self._values[labels] = [0] * len(self.buckets) + [0.0, 0]
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                state[i] += 1
+                break
+        state[-2] += value
+        state[-1] += 1
+
+    def _samples(self) -> Iterable[str]:
+        for labels, state in self._values.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets, state):
+                cumulative += count
+                le = f'le="{_format_value(float(bound))}"'
+                yield f"{self.name}_bucket{_format_labels(self.labels, labels, le)} {cumulative}"
+            yield f"{self.name}_bucket{_format_labels(self.labels, labels, INF_LABEL)} {state[-1]}"
+            yield f"{self.name}_sum{_format_labels(self.labels, labels)} {_format_value(state[-2])}"
+            yield f"{self.name}_count{_format_labels(self.labels, labels)} {state[-1]}"
+
+
+def render_metrics() -> str:
+    """Все метрики в текстовом формате Prometheus"""
+    return "\n\n".join(metric.render() for metric in _metrics) + "\n"
+
+
+# Обработка обновлений
+updates_total = Counter("bot_updates_total", "Обработанные обновления", ["type"])
+update_duration = Histogram("bot_update_duration_seconds", "Время обработки обновления целиком", ["type"])
+update_db_queries = Histogram(
+    "bot_update_db_queries", "Число запросов к БД за одно обновление", ["type"], buckets=QUERY_COUNT_BUCKETS
+)
+update_db_duration = Histogram("bot_update_db_seconds", "Суммарное время запросов к БД за одно обновление", ["type"])
+
+# Хендлеры
+handler_duration = Histogram("bot_handler_duration_seconds", "Время работы хендлера", ["router", "handler"])
+handler_db_queries = Counter("bot_handler_db_queries_total", "Запросы к БД из хендлера", ["router", "handler"])
+handler_errors = Counter("bot_handler_errors_total", "Необработанные исключения в хендлерах", ["router", "handler", "error"])
+
+# База данных (все запросы, включая фоновые задачи)
+db_query_duration = Histogram("bot_db_query_duration_seconds", "Время выполнения запроса к БД")
+
+# Bot API
+api_request_duration = Histogram("bot_api_request_duration_seconds", "Время запроса к Bot API", ["method"])
+api_errors = Counter("bot_api_errors_total", "Ошибки запросов к Bot API", ["method", "error"])
+
+
+class UpdateStats:
+    """Запросы к БД в рамках одного обновления"""
+
+    __slots__ = ("queries", "db_time")
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+
+
+_update_stats: ContextVar[Optional[UpdateStats]] = ContextVar("update_stats", default=None)
+
+
+def start_update_stats() -> Tuple[UpdateStats, object]:
+    stats = UpdateStats()
+    return stats, _update_stats.set(stats)
+
+
+def finish_update_stats(token):
+    _update_stats.reset(token)
+
+
+def current_update_stats() -> Optional[UpdateStats]:
+    return _update_stats.get()
+
+
+def record_query(seconds: float):
+    """Учесть выполненный запрос к БД (вызывается из обработчиков событий движка)"""
+    db_query_duration.observe(seconds)
+    stats = _update_stats.get()
+    if stats is not None:
+        stats.queries += 1
+        stats.db_time += seconds
+
+
+async def metrics_view(request: web.Request) -> web.Response:
+    return web.Response(text=render_metrics(), content_type="text/plain", charset="utf-8")
+
+
+async def start_metrics_server() -> Optional[web.AppRunner]:
+    """Запустить локальный HTTP-сервер с /metrics (если задан METRICS_PORT)"""
+    if not METRICS_PORT:
+        return None
+    app = web.Application()
+    app.router.add_get("/metrics", metrics_view)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, METRICS_HOST, METRICS_PORT).start()
+    logger.info(f"Metrics available at http://{METRICS_HOST}:{METRICS_PORT}/metrics")
+    return runner
@@ -0,0 +1,112 @@
+from datetime import datetime, timedelta
+from typing import Any, List, NamedTuple, Optional, Tuple
+
+from sqlalchemy import Select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+# Ограничение Telegram на длину callback_data
+CALLBACK_DATA_LIMIT = 64
+
+NEXT = "n"
+PREV = "p"
+
+_EPOCH = datetime(1970, 1, 1)
+
+
+def _to_base36(value: int) -> str:
+    digits = "0123456789abcdefghijklmnopqrstuvwxyz"
+    sign = "-" if value < 0 else ""
+    value = abs(value)
+    result = ""
+    while True:
+        value, rest = divmod(value, 36)
+        result = digits[rest] + result
+        if not value:
+            return sign + result
+
+
+class Cursor(NamedTuple):
+    """Позиция в списке: направление и ключ (дата, id) крайней записи показанной страницы"""
+    direction: str
+    date: datetime
+    id: int
+
+
+class Page(NamedTuple):
+    items: List[Any]
+    # callback_data кнопок «Назад» / «Вперёд» (None - кнопки нет)
+    prev_data: Optional[str]
+    next_data: Optional[str]
+
+
+class KeysetPaginator:
+    """
+    Keyset-пагинация по паре колонок (дата, id) вместо OFFSET: каждая страница
+    берётся по индексу от ключа соседней записи, поэтому дальние страницы не медленнее первой.
+    Курсор кодируется в callback_data в виде "<prefix><n|p>_<дата>_<id>" (base36).
+    """
+
+    def __init__(self, prefix: str, date_column, id_column, per_page: int, descending: bool = False):
+        self.prefix = prefix
+        self.date_column = date_column
+        self.id_column = id_column
+        self.per_page = per_page
+        self.descending = descending
+
+    def encode(self, direction: str, date: datetime, item_id: int) -> str:
+        micros = (date.replace(tzinfo=None) - _EPOCH) // timedelta(microseconds=1)
+        data = f"{self.prefix}{direction}_{_to_base36(micros)}_{_to_base36(item_id)}"
+        if len(data.encode()) > CALLBACK_DATA_LIMIT:
+            raise ValueError(f"callback_data is too long: {data}")
+        return data
+
+    def decode(self, data: Optional[str]) -> Optional[Cursor]:
+        """Разобрать callback_data; None для первой страницы или неизвестного формата"""
+        if not data or not data.startswith(self.prefix):
+            return None
+        try:
+            direction, micros, item_id = data[len(self.prefix):].split("_")
+            if direction not in (NEXT, PREV):
+                return None
+            return Cursor(direction, _EPOCH + timedelta(microseconds=int(micros, 36)), int(item_id, 36))
+        except ValueError:
+            return None
+
+    def _key(self, item) -> Tuple[datetime, int]:
+        return getattr(item, self.date_column.key), getattr(item, self.id_column.key)
+
+    async def fetch(self, db: AsyncSession, query: Select, cursor: Optional[Cursor] = None) -> Page:
+        """Выполнить query (без ORDER BY и LIMIT) и вернуть страницу после/до курсора"""
+        key = tuple_(self.date_column, self.id_column)
+        backwards = cursor is not None and cursor.direction == PREV
+        # Идём назад - сортируем в обратную сторону, а потом разворачиваем страницу
+        reverse = self.descending != backwards
+
+        page_query = query
+        if cursor is not None:
+            # Сравнение с обычным кортежем типизирует параметры по колонкам (важно для дат в SQLite)
+            bound = (cursor.date, cursor.id)
+            page_query = page_query.where(key < bound if reverse else key > bound)
+        if reverse:
+            page_query = page_query.order_by(self.date_column.desc(), self.id_column.desc())
+        else:
+            page_query = page_query.order_by(self.date_column, self.id_column)
+
+        # Одна лишняя запись показывает, есть ли что-то дальше
+        result = await db.execute(page_query.limit(self.per_page + 1))
+        items = list(result.scalars().all())
+        has_more = len(items) > self.per_page
+        items = items[:self.per_page]
+        if backwards:
+            items.reverse()
+        if not items:
+            # Записи за курсором исчезли (удалены или уже прошли) - начинаем сначала
+            return await self.fetch(db, query) if cursor is not None else Page(items, None, None)
+
+        has_prev = has_more if backwards else cursor is not None
+        has_next = cursor is not None if backwards else has_more
+        return Page(
+            items,
+            self.encode(PREV, *self._key(items[0])) if has_prev else None,
+            self.encode(NEXT, *self._key(items[-1])) if has_next else None
+        )
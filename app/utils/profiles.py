@@ -0,0 +1,134 @@
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, List, NamedTuple, Optional, Set
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import PROFILE_CACHE_TTL, PROFILE_CACHE_SIZE
+from app.database.models import User, Event, Registration
+from app.utils.cache import TTLCache
+from app.utils import invalidation
+
+
+class RegisteredEvent(NamedTuple):
+    event_id: int
+    title: str
+    date: datetime
+    location: Optional[str]
+
+
+class UserProfile:
+    """Данные экрана «Мой профиль»: запись пользователя и его регистрации"""
+
+    def __init__(self, user: User, events: List[RegisteredEvent]):
+        self.username = user.username
+        self.first_name = user.first_name
+        self.last_name = user.last_name
+        self.phone = user.phone
+        self.created_at = user.created_at
+        self.events: Dict[int, RegisteredEvent] = {event.event_id: event for event in events}
+
+    def upcoming(self) -> List[RegisteredEvent]:
+        """Предстоящие мероприятия по дате (прошедшие отсеиваются при показе, а не при загрузке)"""
+        now = datetime.now()
+        return sorted((event for event in self.events.values() if event.date >= now), key=lambda event: event.date)
+
+
+# Профили по users.id; регистрации, правки и удаление мероприятий обновляют их на месте
+_profiles = TTLCache(PROFILE_CACHE_TTL, maxsize=PROFILE_CACHE_SIZE)
+# event_id -> пользователи, в закэшированных профилях которых есть это мероприятие
+_event_users: Dict[int, Set[int]] = defaultdict(set)
+
+
+# Другие экземпляры бота сбрасывают профиль пользователя (регистрации) или все профили (правка мероприятий)
+invalidation.register("profile", _profiles.invalidate)
+invalidation.register("profiles", lambda key: clear_profiles())
+
+
+async def _load_profile(db: AsyncSession, user_id: int) -> Optional[UserProfile]:
+    user = await db.get(User, user_id)
+    if user is None:
+        return None
+    result = await db.execute(
+        select(Event.id, Event.title, Event.date, Event.location)
+        .join(Registration, Registration.event_id == Event.id)
+        .where(Registration.user_id == user_id, Event.date >= datetime.now())
+    )
+    profile = UserProfile(user, [RegisteredEvent(*row) for row in result.all()])
+    for event_id in profile.events:
+        _event_users[event_id].add(user_id)
+    return profile
+
+
+async def get_profile(db: AsyncSession, user_id: int) -> Optional[UserProfile]:
+    """Профиль из кэша; из БД загружается только при первом открытии"""
+    return await _profiles.get_or_load(user_id, lambda: _load_profile(db, user_id))
+
+
+async def add_registration(db: AsyncSession, user_id: int, event_id: int):
+    """Добавить мероприятие в профиль после регистрации"""
+    invalidation.publish("profile", user_id)
+    profile = _profiles.get(user_id)
+    if profile is None:
+        # Загрузка профиля, начатая до регистрации, не должна попасть в кэш
+        _profiles.invalidate(user_id)
+        return
+    event = await db.get(Event, event_id)
+    if event is None:
+        return
+    profile.events[event_id] = RegisteredEvent(event.id, event.title, event.date, event.location)
+    _event_users[event_id].add(user_id)
+
+
+def remove_registration(user_id: int, event_id: int):
+    """Убрать мероприятие из профиля после отмены регистрации"""
+    invalidation.publish("profile", user_id)
+    profile = _profiles.get(user_id)
+    if profile is None:
+        _profiles.invalidate(user_id)
+        return
+    profile.events.pop(event_id, None)
+    _event_users[event_id].discard(user_id)
+
+
+def update_user(user_id: int, username: Optional[str], first_name: Optional[str], last_name: Optional[str]):
+    """Новые имя и username пользователя (из синхронизации профилей)"""
+    invalidation.publish("profile", user_id)
+    profile = _profiles.get(user_id)
+    if profile is not None:
+        profile.username, profile.first_name, profile.last_name = username, first_name, last_name
+
+
+def update_event_in_profiles(event_id: int, field: str, value):
+    """Правка мероприятия: название и место меняются на месте, перенос даты сбрасывает все профили"""
+    if field == "date":
+        # Мероприятие могло переехать из прошлого в будущее - в загруженных профилях его нет
+        clear_profiles()
+        invalidation.publish("profiles")
+        return
+    if field not in ("title", "location"):
+        return
+    invalidation.publish("profiles")
+    users = _event_users.get(event_id, set())
+    for user_id in list(users):
+        profile = _profiles.get(user_id)
+        if profile is None or event_id not in profile.events:
+            # Профиль вытеснен из кэша
+            users.discard(user_id)
+            continue
+        profile.events[event_id] = profile.events[event_id]._replace(**{field: value})
+
+
+def remove_event_from_profiles(event_id: int):
+    """Мероприятие удалено - убираем его из всех профилей"""
+    invalidation.publish("profiles")
+    for user_id in _event_users.pop(event_id, ()):
+        profile = _profiles.get(user_id)
+        if profile is not None:
+            profile.events.pop(event_id, None)
+
+
+def clear_profiles():
+    _profiles.clear()
+    _event_users.clear()
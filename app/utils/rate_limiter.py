@@ -0,0 +1,77 @@
+import asyncio
+import time
+from typing import Dict, Optional
+
+from app.config import BROADCAST_RATE_LIMIT, PER_CHAT_INTERVAL
+
+
+class TokenBucket:
+    """Token bucket: пополняется со скоростью rate токенов в секунду, не больше capacity"""
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = rate
+        self.capacity = capacity or rate
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._blocked_until = 0.0
+        self._lock = asyncio.Lock()
+
+    def _refill(self, now: float):
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self):
+        """Дождаться и забрать один токен (ожидающие обслуживаются по очереди)"""
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self._blocked_until:
+                    await asyncio.sleep(self._blocked_until - now)
+                    continue
+
+                self._refill(now)
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+    def pause(self, seconds: float):
+        """Остановить выдачу токенов (например, после RetryAfter от Telegram)"""
+        self._blocked_until = max(self._blocked_until, time.monotonic() + seconds)
+        self._tokens = 0
+        self._updated = self._blocked_until
+
+
+class SendLimiter:
+    """Глобальный лимит отправки плюс минимальный интервал между сообщениями в один чат"""
+
+    def __init__(self, rate: float, per_chat_interval: float):
+        self.bucket = TokenBucket(rate)
+        self.per_chat_interval = per_chat_interval
+        self._next_allowed: Dict[int, float] = {}
+
+    async def wait(self, chat_id: int):
+        """Дождаться возможности отправить сообщение в чат"""
+        now = time.monotonic()
+        next_allowed = self._next_allowed.get(chat_id, 0.0)
+        self._next_allowed[chat_id] = max(now, next_allowed) + self.per_chat_interval
+        if next_allowed > now:
+            await asyncio.sleep(next_allowed - now)
+
+        await self.bucket.acquire()
+
+        # Не даём словарю расти бесконечно: удаляем чаты, по которым интервал уже истёк
+        if len(self._next_allowed) > 10000:
+            now = time.monotonic()
+            self._next_allowed = {
+                chat: moment for chat, moment in self._next_allowed.items() if moment > now
+            }
+
+    def retry_after(self, seconds: float):
+        """Учесть RetryAfter: Telegram просит подождать, прежде чем слать дальше"""
+        self.bucket.pause(seconds)
+
+
+# Общий лимитер исходящих сообщений бота (рассылки, уведомления)
+send_limiter = SendLimiter(BROADCAST_RATE_LIMIT, PER_CHAT_INTERVAL)
@@ -0,0 +1,132 @@
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import Optional
+
+from aiogram import Bot
+from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
+from aiogram.utils.markdown import hbold
+from sqlalchemy import select, and_
+
+from app.config import REMINDER_HOURS, REMINDER_CHECK_INTERVAL, REMINDER_BATCH_SIZE
+from app.database.database import get_db, dialect_insert
+from app.database.models import User, Event, Registration, SentReminder
+from app.utils.broadcast import deliver
+from app.utils.event_cards import quote
+
+logger = logging.getLogger(__name__)
+
+_scheduler: Optional[asyncio.Task] = None
+
+
+def _reminder_text(title: str, date: datetime, location: Optional[str]) -> str:
+    return (
+        f"⏰ Напоминаем, что скоро начнётся мероприятие {hbold(title)}\n\n"
+        f"📅 {date.strftime('%d.%m.%Y')} в {date.strftime('%H:%M')}\n"
+        f"📍 {quote(location) if location else 'Место уточняется'}"
+    )
+
+
+def _reminder_markup(event_id: int) -> InlineKeyboardMarkup:
+    return InlineKeyboardMarkup(inline_keyboard=[
+        [InlineKeyboardButton(text="📅 Подробнее", callback_data=f"event_{event_id}")]
+    ])
+
+
+async def _claim_batch(hours: int, window_start: datetime, window_end: datetime):
+    """
+    Следующая пачка участников, которым пора отправить напоминание за hours часов (None - больше никого нет).
+    Найденные записи сразу отмечаются в sent_reminders (ON CONFLICT DO NOTHING) и фиксируются
+    до отправки: после перезапуска или на втором экземпляре бота они уже не выберутся повторно.
+    """
+    async for db in get_db():
+        # Диапазон по индексу events(date, id), участники - по индексу registrations(event_id, ...),
+        # уже отправленные отсекаются по уникальному индексу sent_reminders
+        candidates = await db.execute(
+            select(
+                Registration.event_id,
+                Registration.user_id,
+                User.telegram_id,
+                Event.title,
+                Event.date,
+                Event.location
+            )
+            .join(Event, Registration.event_id == Event.id)
+            .join(User, Registration.user_id == User.id)
+            .outerjoin(
+                SentReminder,
+                and_(
+                    SentReminder.event_id == Registration.event_id,
+                    SentReminder.user_id == Registration.user_id,
+                    SentReminder.hours == hours
+                )
+            )
+            .where(Event.date > window_start, Event.date <= window_end, SentReminder.id.is_(None))
+            .order_by(Registration.id)
+            .limit(REMINDER_BATCH_SIZE)
+        )
+        candidates = candidates.all()
+        if not candidates:
+            return None
+
+        claimed = await db.execute(
+            dialect_insert(SentReminder.__table__)
+            .values([
+                {"event_id": row.event_id, "user_id": row.user_id, "hours": hours, "sent_at": datetime.utcnow()}
+                for row in candidates
+            ])
+            .on_conflict_do_nothing(index_elements=["event_id", "user_id", "hours"])
+            .returning(SentReminder.event_id, SentReminder.user_id)
+        )
+        claimed = set(claimed.all())
+        await db.commit()
+        return [row for row in candidates if (row.event_id, row.user_id) in claimed]
+
+
+async def send_reminders(bot: Bot) -> int:
+    """Отправить все напоминания, время которых подошло"""
+    sent = 0
+    now = datetime.now()
+    # Окна не пересекаются: кто зарегистрировался за 3 часа до начала, получит только напоминание «за 2 часа»
+    for i, hours in enumerate(REMINDER_HOURS):
+        closer = REMINDER_HOURS[i + 1] if i + 1 < len(REMINDER_HOURS) else 0
+        window_start = now + timedelta(hours=closer)
+        window_end = now + timedelta(hours=hours)
+
+        while True:
+            batch = await _claim_batch(hours, window_start, window_end)
+            if batch is None:
+                break
+            results = await asyncio.gather(*(
+                deliver(
+                    bot,
+                    row.telegram_id,
+                    _reminder_text(row.title, row.date, row.location),
+                    reply_markup=_reminder_markup(row.event_id)
+                )
+                for row in batch
+            ))
+            sent += sum(results)
+
+    if sent:
+        logger.info(f"Sent {sent} event reminders")
+    return sent
+
+
+async def run_reminder_scheduler(bot: Bot):
+    while True:
+        try:
+            await send_reminders(bot)
+        except Exception as e:
+            logger.error(f"Error sending reminders: {e}")
+        await asyncio.sleep(REMINDER_CHECK_INTERVAL)
+
+
+def start_reminder_scheduler(bot: Bot) -> Optional[asyncio.Task]:
+    """Запустить фоновую отправку напоминаний (если они включены)"""
+    global _scheduler
+    if not REMINDER_HOURS:
+        return None
+    if _scheduler is None or _scheduler.done():
+        _scheduler = asyncio.create_task(run_reminder_scheduler(bot))
+    return _scheduler
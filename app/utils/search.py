@@ -0,0 +1,90 @@
+import asyncio
+import itertools
+import re
+from datetime import datetime
+from typing import Dict, Hashable, List, Optional, Tuple
+
+from sqlalchemy import select, func, literal_column, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import SEARCH_RESULTS_LIMIT
+from app.database.database import get_read_db
+from app.database.models import Event
+from app.utils.cache import search_cache
+
+# Больше слов в запросе не нужно - остальные отбрасываются
+MAX_QUERY_TERMS = 8
+
+# Выражение GIN-индекса ix_events_search (миграция 0009_event_search); должно совпадать с ним дословно
+SEARCH_DOCUMENT = (
+    "to_tsvector('russian', "
+    "coalesce(title, '') || ' ' || coalesce(short_description, '') || ' ' || "
+    "coalesce(full_description, '') || ' ' || coalesce(location, '') || ' ' || coalesce(speakers, ''))"
+)
+
+
+def query_terms(query: str) -> Tuple[str, ...]:
+    """Слова запроса в нижнем регистре; знаки препинания и операторы поиска отбрасываются"""
+    return tuple(re.findall(r"\w+", query.lower())[:MAX_QUERY_TERMS])
+
+
+def _match_condition(db: AsyncSession, terms: Tuple[str, ...]):
+    """Условие полнотекстового поиска; каждое слово ищется как начало слова («татар» найдёт «татарский»)"""
+    if db.bind.dialect.name == "postgresql":
+        tsquery = func.to_tsquery("russian", " & ".join(f"{term}:*" for term in terms))
+        return literal_column(SEARCH_DOCUMENT).op("@@")(tsquery)
+    # SQLite: FTS5-таблица events_fts, rowid совпадает с events.id
+    fts_match = (
+        select(literal_column("rowid"))
+        .select_from(text("events_fts"))
+        .where(text("events_fts MATCH :fts_query").bindparams(
+            fts_query=" ".join(f'"{term}"*' for term in terms)
+        ))
+    )
+    return Event.id.in_(fts_match)
+
+
+async def _load_results(terms: Tuple[str, ...]) -> List[Event]:
+    async for db in get_read_db():
+        result = await db.execute(
+            select(Event)
+            .where(_match_condition(db, terms), Event.date >= datetime.now())
+            .order_by(Event.date, Event.id)
+            .limit(SEARCH_RESULTS_LIMIT)
+        )
+        return result.scalars().all()
+
+
+def cached_results(query: str) -> Optional[List[Event]]:
+    """Результаты из кэша без обращения к БД; None - запрос ещё не выполнялся"""
+    return search_cache.get(query_terms(query))
+
+
+async def search_events(query: str) -> List[Event]:
+    """
+    Предстоящие мероприятия, в названии, описаниях, месте или спикерах которых есть все слова запроса.
+    Результаты кэшируются по словам запроса; одинаковые одновременные запросы ждут один поиск.
+    """
+    terms = query_terms(query)
+    if not terms:
+        return []
+    return await search_cache.get_or_load(terms, lambda: _load_results(terms))
+
+
+class Debouncer:
+    """Пропускает только последний из запросов с одним ключом, пришедших в течение delay секунд"""
+
+    def __init__(self, delay: float):
+        self.delay = delay
+        self._latest: Dict[Hashable, int] = {}
+        self._tokens = itertools.count()
+
+    async def wait(self, key: Hashable) -> bool:
+        """Подождать delay секунд; False - за это время пришёл более новый запрос и этот можно не выполнять"""
+        token = next(self._tokens)
+        self._latest[key] = token
+        await asyncio.sleep(self.delay)
+        if self._latest.get(key) != token:
+            return False
+        del self._latest[key]
+        return True
@@ -0,0 +1,148 @@
+import asyncio
+import logging
+from typing import Dict, List, Optional, Tuple
+
+from aiogram.types import User as TelegramUser
+
+from app.config import USER_SYNC_INTERVAL, USER_SYNC_BATCH_SIZE
+from app.database.database import AsyncSessionLocal, dialect_insert
+from app.database.models import User
+from app.utils.cache import TTLCache
+from app.utils.profiles import update_user
+
+logger = logging.getLogger(__name__)
+
+# Новые пользователи ждут своей записи в БД - для них пачка собирается недолго
+FIRST_CONTACT_DELAY = 0.02
+
+# telegram_id -> (users.id, профиль в БД); профиль сравнивается, чтобы не писать неизменившиеся данные
+KNOWN_USERS_CACHE_SIZE = 100000
+KNOWN_USERS_CACHE_TTL = 24 * 3600
+
+Profile = Tuple[Optional[str], Optional[str], Optional[str]]
+
+
+def _profile(telegram_user: TelegramUser) -> Profile:
+    return telegram_user.username, telegram_user.first_name, telegram_user.last_name
+
+
+class UserSync:
+    """
+    Синхронизация профилей пользователей Telegram с таблицей users.
+    Профили копятся в памяти и записываются одним INSERT ... ON CONFLICT DO UPDATE
+    раз в USER_SYNC_INTERVAL секунд; id известных пользователей отдаются из памяти без запросов.
+    """
+
+    def __init__(self, interval: float = USER_SYNC_INTERVAL):
+        self.interval = interval
+        self._known = TTLCache(KNOWN_USERS_CACHE_TTL, maxsize=KNOWN_USERS_CACHE_SIZE)
+        self._pending: Dict[int, Profile] = {}
+        self._waiters: Dict[int, List[asyncio.Future]] = {}
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    async def resolve(self, telegram_user: TelegramUser) -> int:
+        """id пользователя в БД; новый пользователь ждёт ближайшей записи пачки"""
+        profile = _profile(telegram_user)
+        known = self._known.get(telegram_user.id)
+        if known is not None:
+            user_id, saved_profile = known
+            if saved_profile != profile:
+                # Сменил имя или username - обновим в фоне
+                self._pending[telegram_user.id] = profile
+                self._schedule()
+            return user_id
+
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.setdefault(telegram_user.id, []).append(future)
+        self._pending[telegram_user.id] = profile
+        self._schedule()
+        return await future
+
+    def _schedule(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+        self._wakeup.set()
+
+    async def _run(self):
+        while True:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+            await asyncio.sleep(FIRST_CONTACT_DELAY if self._waiters else self.interval)
+            await self.flush()
+
+    async def _upsert(self, profiles: Dict[int, Profile]) -> List[Tuple[int, int]]:
+        """Записать профили одной транзакцией; возвращает пары (users.id, telegram_id)"""
+        telegram_ids = list(profiles)
+        resolved = []
+        async with AsyncSessionLocal() as db:
+            for start in range(0, len(telegram_ids), USER_SYNC_BATCH_SIZE):
+                batch = telegram_ids[start:start + USER_SYNC_BATCH_SIZE]
+                insert_stmt = dialect_insert(User.__table__)
+                result = await db.execute(
+                    insert_stmt
+                    .values([
+                        {
+                            "telegram_id": telegram_id,
+                            "username": profiles[telegram_id][0],
+                            "first_name": profiles[telegram_id][1],
+                            "last_name": profiles[telegram_id][2]
+                        }
+                        for telegram_id in batch
+                    ])
+                    .on_conflict_do_update(
+                        index_elements=["telegram_id"],
+                        set_={
+                            "username": insert_stmt.excluded.username,
+                            "first_name": insert_stmt.excluded.first_name,
+                            "last_name": insert_stmt.excluded.last_name
+                        }
+                    )
+                    .returning(User.id, User.telegram_id)
+                )
+                resolved.extend(result.all())
+            await db.commit()
+        return resolved
+
+    async def flush(self):
+        """Записать накопленные профили"""
+        pending, self._pending = self._pending, {}
+        waiters, self._waiters = self._waiters, {}
+        if not pending:
+            return
+
+        try:
+            resolved = await self._upsert(pending)
+        except Exception as e:
+            # Одна некорректная строка не должна лишать ответа остальных пользователей пачки -
+            # повторяем запись по одному профилю
+            logger.warning(f"Error syncing {len(pending)} users, retrying one by one: {e}")
+            resolved = []
+            for telegram_id, profile in pending.items():
+                try:
+                    resolved.extend(await self._upsert({telegram_id: profile}))
+                except Exception as e:
+                    logger.error(f"Error syncing user {telegram_id}: {e}")
+                    for future in waiters.pop(telegram_id, []):
+                        if not future.done():
+                            future.set_exception(e)
+                    # Забываем пользователя: его следующее обновление повторит запись
+                    self._known.invalidate(telegram_id)
+
+        # Ждущие хендлеры получают id только после фиксации транзакции, иначе их запросы не увидят запись
+        for user_id, telegram_id in resolved:
+            self._known.set(telegram_id, (user_id, pending[telegram_id]))
+            update_user(user_id, *pending[telegram_id])
+            for future in waiters.pop(telegram_id, []):
+                if not future.done():
+                    future.set_result(user_id)
+
+    async def close(self):
+        """Остановить фоновую запись и записать то, что осталось"""
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        await self.flush()
+
+
+user_sync = UserSync()
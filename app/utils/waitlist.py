@@ -0,0 +1,123 @@
+import asyncio
+import logging
+from datetime import datetime
+from typing import Optional
+
+from aiogram import Bot
+from aiogram.utils.markdown import hbold
+from sqlalchemy import select, delete, or_
+
+from app.config import WAITLIST_PROMOTE_INTERVAL
+from app.database.database import get_db
+from app.database.models import User, Event, WaitlistEntry
+from app.database.registrations import register_user, REGISTERED, ALREADY_REGISTERED
+from app.utils.broadcast import deliver
+from app.utils.profiles import add_registration
+
+logger = logging.getLogger(__name__)
+
+# Сколько человек из очереди обрабатывается за один проход
+PROMOTE_BATCH_SIZE = 100
+
+_wakeup = asyncio.Event()
+_promoter: Optional[asyncio.Task] = None
+
+
+def request_promotion():
+    """Разбудить промоутер: на каком-то мероприятии могли освободиться места"""
+    _wakeup.set()
+
+
+async def _promote_event(bot: Bot, event_id: int, title: str) -> int:
+    promoted = 0
+    while True:
+        async for db in get_db():
+            event = await db.get(Event, event_id)
+            if event is None:
+                # Мероприятие удалено или перенесено в архив, пока ждало перевода из листа ожидания
+                return promoted
+            if event.max_participants is None:
+                free = PROMOTE_BATCH_SIZE
+            else:
+                free = min(event.max_participants - event.registered_count, PROMOTE_BATCH_SIZE)
+            if free <= 0:
+                return promoted
+
+            # Первые в очереди по индексу (event_id, position)
+            entries = await db.execute(
+                select(WaitlistEntry.id, WaitlistEntry.user_id, User.telegram_id)
+                .join(User, WaitlistEntry.user_id == User.id)
+                .where(WaitlistEntry.event_id == event_id)
+                .order_by(WaitlistEntry.position)
+                .limit(free)
+            )
+            entries = entries.all()
+            if not entries:
+                return promoted
+
+            processed, notify = [], []
+            for entry_id, user_id, telegram_id in entries:
+                result = await register_user(db, user_id, event_id)
+                if result not in (REGISTERED, ALREADY_REGISTERED):
+                    # Места снова закончились
+                    break
+                processed.append(entry_id)
+                if result == REGISTERED:
+                    notify.append(telegram_id)
+                    await add_registration(db, user_id, event_id)
+
+            if processed:
+                await db.execute(delete(WaitlistEntry).where(WaitlistEntry.id.in_(processed)))
+                await db.commit()
+
+        # Уведомляем пачкой через общий лимитер отправки
+        text = (
+            f"🎉 Освободилось место!\n\n"
+            f"Вы зарегистрированы на мероприятие {hbold(title)} из листа ожидания."
+        )
+        await asyncio.gather(*(deliver(bot, telegram_id, text) for telegram_id in notify))
+        promoted += len(notify)
+
+        if len(processed) < len(entries):
+            return promoted
+
+
+async def promote_waitlists(bot: Bot) -> int:
+    """Перевести людей из листов ожидания на освободившиеся места в порядке очереди"""
+    async for db in get_db():
+        events = await db.execute(
+            select(Event.id, Event.title)
+            .where(Event.id.in_(select(WaitlistEntry.event_id).distinct()))
+            .where(Event.date >= datetime.now())
+            .where(or_(Event.max_participants.is_(None), Event.registered_count < Event.max_participants))
+        )
+        events = events.all()
+
+    promoted = 0
+    for event_id, title in events:
+        promoted += await _promote_event(bot, event_id, title)
+    if promoted:
+        logger.info(f"Promoted {promoted} users from waitlists")
+    return promoted
+
+
+async def run_waitlist_promoter(bot: Bot):
+    while True:
+        try:
+            await promote_waitlists(bot)
+        except Exception as e:
+            logger.error(f"Error promoting waitlists: {e}")
+
+        try:
+            await asyncio.wait_for(_wakeup.wait(), timeout=WAITLIST_PROMOTE_INTERVAL)
+        except asyncio.TimeoutError:
+            pass
+        _wakeup.clear()
+
+
+def start_waitlist_promoter(bot: Bot) -> asyncio.Task:
+    """Запустить фоновый промоутер листов ожидания"""
+    global _promoter
+    if _promoter is None or _promoter.done():
+        _promoter = asyncio.create_task(run_waitlist_promoter(bot))
+    return _promoter
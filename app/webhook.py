@@ -0,0 +1,112 @@
+import asyncio
+import logging
+from typing import Any, Dict
+
+from aiohttp import web
+from aiogram import Bot, Dispatcher
+from aiogram.webhook.aiohttp_server import SimpleRequestHandler, setup_application
+from sqlalchemy import text
+
+from app.config import (
+    WEBHOOK_URL,
+    WEBHOOK_PATH,
+    WEBHOOK_SECRET,
+    WEBAPP_HOST,
+    WEBAPP_PORT,
+    WEBHOOK_MAX_IN_FLIGHT,
+    WEBHOOK_KEEPALIVE_TIMEOUT
+)
+from app.database.database import get_db
+
+logger = logging.getLogger(__name__)
+
+
+class LimitedRequestHandler(SimpleRequestHandler):
+    """Обрабатывает обновления в фоне, но не больше max_in_flight одновременно"""
+
+    def __init__(self, *args: Any, max_in_flight: int, **kwargs: Any):
+        super().__init__(*args, **kwargs)
+        self._semaphore = asyncio.Semaphore(max_in_flight)
+
+    async def _background_feed_update(self, bot: Bot, update: Dict[str, Any]) -> None:
+        try:
+            await super()._background_feed_update(bot, update)
+        finally:
+            self._semaphore.release()
+
+    async def _handle_request_background(self, bot: Bot, request: web.Request) -> web.Response:
+        # Если все слоты заняты, не отвечаем Telegram, пока не освободится место
+        await self._semaphore.acquire()
+        try:
+            return await super()._handle_request_background(bot, request)
+        except BaseException:
+            self._semaphore.release()
+            raise
+
+
+async def health(request: web.Request) -> web.Response:
+    """Liveness: процесс жив и принимает запросы"""
+    return web.json_response({"status": "ok"})
+
+
+async def ready(request: web.Request) -> web.Response:
+    """Readiness: вебхук установлен и база данных отвечает"""
+    if not request.app["ready"]:
+        return web.json_response({"status": "starting"}, status=503)
+    try:
+        async for db in get_db():
+            await db.execute(text("SELECT 1"))
+    except Exception as e:
+        logger.warning(f"Readiness check failed: {e}")
+        return web.json_response({"status": "database unavailable"}, status=503)
+    return web.json_response({"status": "ready"})
+
+
+def create_app(bot: Bot, dp: Dispatcher) -> web.Application:
+    """Собрать aiohttp-приложение с вебхуком и служебными эндпоинтами"""
+    app = web.Application()
+    app["ready"] = False
+
+    async def on_startup(app: web.Application):
+        await bot.set_webhook(
+            url=f"{WEBHOOK_URL.rstrip('/')}{WEBHOOK_PATH}",
+            secret_token=WEBHOOK_SECRET or None,
+            allowed_updates=dp.resolve_used_update_types(),
+            max_connections=min(WEBHOOK_MAX_IN_FLIGHT, 100)
+        )
+        app["ready"] = True
+        logger.info(f"Webhook set to {WEBHOOK_URL}{WEBHOOK_PATH}")
+
+    async def on_shutdown(app: web.Application):
+        # Вебхук не удаляем: его продолжают обслуживать остальные экземпляры бота
+        app["ready"] = False
+
+    app.on_startup.append(on_startup)
+    app.on_shutdown.append(on_shutdown)
+
+    LimitedRequestHandler(
+        dispatcher=dp,
+        bot=bot,
+        secret_token=WEBHOOK_SECRET or None,
+        max_in_flight=WEBHOOK_MAX_IN_FLIGHT
+    ).register(app, path=WEBHOOK_PATH)
+    app.router.add_get("/health", health)
+    app.router.add_get("/ready", ready)
+    setup_application(app, dp, bot=bot)
+    return app
+
+
+async def run_webhook(bot: Bot, dp: Dispatcher):
+    """Запустить бота в режиме вебхука и работать до остановки процесса"""
+    if not WEBHOOK_URL:
+        raise RuntimeError("WEBHOOK_URL is required in webhook mode")
+
+    runner = web.AppRunner(create_app(bot, dp), keepalive_timeout=WEBHOOK_KEEPALIVE_TIMEOUT)
+    await runner.setup()
+    site = web.TCPSite(runner, WEBAPP_HOST, WEBAPP_PORT)
+    await site.start()
+    logger.info(f"Webhook server started on {WEBAPP_HOST}:{WEBAPP_PORT}")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await runner.cleanup()
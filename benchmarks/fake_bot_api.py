@@ -0,0 +1,102 @@
+import asyncio
+import itertools
+import json
+import time
+from collections import Counter
+from typing import Any, Dict, List, Optional
+
+from aiohttp import web
+
+BOT_USER = {"id": 1000000, "is_bot": True, "first_name": "Benchmark bot", "username": "benchmark_bot"}
+
+# Методы, которые возвращают отправленное или изменённое сообщение
+MESSAGE_METHODS = {
+    "sendmessage", "sendphoto", "senddocument", "editmessagetext",
+    "editmessagemedia", "editmessagecaption", "editmessagereplymarkup"
+}
+
+
+class FakeBotAPI:
+    """
+    Локальный сервер, отвечающий как Bot API: считает вызовы, запоминает последнюю
+    клавиатуру в каждом чате (по ней «пользователи» нажимают следующие кнопки)
+    и добавляет к каждому ответу задержку latency, имитируя сеть до api.telegram.org.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency: float = 0.0):
+        self.host = host
+        self.port = port
+        self.latency = latency
+        self.calls: Counter = Counter()
+        self.last_markup: Dict[int, List[List[Dict[str, Any]]]] = {}
+        self._message_ids = itertools.count(1)
+        self._file_ids = itertools.count(1)
+        self._runner: Optional[web.AppRunner] = None
+
+    @property
+    def base_url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    async def start(self):
+        app = web.Application(client_max_size=50 * 1024 * 1024)
+        app.router.add_post("/bot{token}/{method}", self._handle)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.host, self.port).start()
+        # Порт 0 - свободный порт, выбранный системой
+        self.port = self._runner.addresses[0][1]
+
+    async def stop(self):
+        if self._runner:
+            await self._runner.cleanup()
+
+    def _message(self, params: Dict[str, Any], method: str) -> Dict[str, Any]:
+        chat_id = int(params.get("chat_id") or 0)
+        message = {
+            "message_id": int(params.get("message_id") or next(self._message_ids)),
+            "date": int(time.time()),
+            "chat": {"id": chat_id, "type": "private"},
+            "from": BOT_USER
+        }
+        if method in ("sendphoto", "editmessagemedia"):
+            file_id = f"photo{next(self._file_ids)}"
+            message["photo"] = [{"file_id": file_id, "file_unique_id": file_id, "width": 1280, "height": 720}]
+            message["caption"] = params.get("caption", "")
+        elif method == "senddocument":
+            file_id = f"document{next(self._file_ids)}"
+            message["document"] = {"file_id": file_id, "file_unique_id": file_id}
+        else:
+            message["text"] = params.get("text", "")
+
+        markup = params.get("reply_markup")
+        if markup:
+            markup = json.loads(markup) if isinstance(markup, str) else markup
+            keyboard = markup.get("inline_keyboard")
+            if keyboard is not None:
+                message["reply_markup"] = markup
+                self.last_markup[chat_id] = keyboard
+        return message
+
+    async def _handle(self, request: web.Request) -> web.Response:
+        method = request.match_info["method"].lower()
+        params = {key: value for key, value in (await request.post()).items() if isinstance(value, str)}
+        self.calls[method] += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+        if method == "getme":
+            result: Any = BOT_USER
+        elif method in MESSAGE_METHODS:
+            result = self._message(params, method)
+        else:
+            result = True
+        return web.json_response({"ok": True, "result": result})
+
+    def buttons(self, chat_id: int) -> List[str]:
+        """callback_data всех кнопок последней клавиатуры в чате"""
+        return [
+            button["callback_data"]
+            for row in self.last_markup.get(chat_id, [])
+            for button in row
+            if "callback_data" in button
+        ]
@@ -0,0 +1,336 @@
+"""
+Нагрузочный тест бота: настоящий Dispatcher с user_router и admin_router (со всеми middleware
+из app.main) обрабатывает синтетические потоки обновлений, а запросы к Bot API уходят
+на локальный фейковый сервер (benchmarks/fake_bot_api.py).
+
+Сценарии:
+    rush        - все пользователи разом открывают одно мероприятие и регистрируются
+                  (мест меньше, чем желающих: остальные встают в лист ожидания);
+    pagination  - пользователи листают список мероприятий вперёд и назад;
+    admin       - админ в цикле редактирует мероприятия, пока идёт фоновый поток просмотров;
+    mixed       - всё сразу: половина пользователей регистрируется, половина листает,
+                  админ редактирует мероприятие, на которое идёт регистрация.
+
+Запуск (из корня репозитория):
+    python -m benchmarks.load_test --scenario mixed --users 1000 --concurrency 200 --api-latency 0.05
+
+По умолчанию используется временная база SQLite. Чтобы проверить Postgres, задайте DATABASE_URL
+отдельной пустой базы: в неё будут записаны тестовые мероприятия, пользователи и регистрации.
+SQLite допускает только одного пишущего: при большой конкуренции часть регистраций падает
+с «database is locked» (колонка errors) - это ограничение SQLite, а не бота.
+"""
+import argparse
+import asyncio
+import itertools
+import logging
+import os
+import random
+import tempfile
+import time
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from benchmarks.fake_bot_api import BOT_USER, FakeBotAPI
+
+ADMIN_ID = 999999
+FIRST_USER_ID = 100000
+
+SCENARIOS = ("rush", "pagination", "admin", "mixed")
+
+
+def configure_environment(args: argparse.Namespace):
+    """Настройки бота для теста; app.config читает их при импорте, поэтому - до импорта app"""
+    os.environ.setdefault("BOT_TOKEN", "42:benchmark")
+    if "DATABASE_URL" not in os.environ:
+        path = os.path.join(tempfile.mkdtemp(prefix="youth_council_bench_"), "benchmark.db")
+        os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{path}"
+    os.environ["ADMIN_IDS"] = str(ADMIN_ID)
+    os.environ["FSM_STORAGE"] = "memory"
+    os.environ["METRICS_PORT"] = "0"
+    if not args.throttling:
+        # Синтетические пользователи нажимают кнопки быстрее живых - без этого мерили бы отказы throttling
+        for name in ("THROTTLE_RATE", "THROTTLE_BURST", "THROTTLE_USER_RATE", "THROTTLE_USER_BURST"):
+            os.environ[name] = "1000000"
+        os.environ["THROTTLE_DUPLICATE_WINDOW"] = "0"
+
+
+def percentile(samples: List[float], q: float) -> float:
+    """Перцентиль по ближайшему рангу (samples отсортирован)"""
+    if not samples:
+        return 0.0
+    rank = max(0, min(len(samples) - 1, int(round(q / 100 * len(samples) + 0.5)) - 1))
+    return samples[rank]
+
+
+class LatencyRecorder:
+    """Времена обработки по именам (шаги сценариев и хендлеры)"""
+
+    def __init__(self):
+        self.samples: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Counter = Counter()
+
+    def add(self, name: str, seconds: float):
+        self.samples[name].append(seconds)
+
+    def table(self, title: str, names: List[str], elapsed: float) -> str:
+        lines = [f"{title:<44}{'count':>8}{'rps':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'max ms':>9}{'errors':>8}"]
+        for name in sorted(names, key=lambda key: -len(self.samples[key])):
+            samples = sorted(self.samples[name])
+            lines.append(
+                f"  {name:<42}{len(samples):>8}{len(samples) / elapsed:>9.1f}"
+                f"{percentile(samples, 50) * 1000:>9.1f}{percentile(samples, 95) * 1000:>9.1f}"
+                f"{percentile(samples, 99) * 1000:>9.1f}{(samples[-1] if samples else 0) * 1000:>9.1f}"
+                f"{self.errors[name]:>8}"
+            )
+        return "\n".join(lines)
+
+
+class Simulation:
+    """Отправка синтетических обновлений от имени пользователей"""
+
+    def __init__(self, dp, bot, api: FakeBotAPI, recorder: LatencyRecorder):
+        self.dp = dp
+        self.bot = bot
+        self.api = api
+        self.recorder = recorder
+        self._update_ids = itertools.count(1)
+        self._callback_ids = itertools.count(1)
+
+    @staticmethod
+    def _user(user_id: int) -> Dict[str, Any]:
+        return {"id": user_id, "is_bot": False, "first_name": f"User {user_id}", "username": f"user{user_id}"}
+
+    def _bot_message(self, user_id: int) -> Dict[str, Any]:
+        return {
+            "message_id": 1,
+            "date": int(time.time()),
+            "chat": {"id": user_id, "type": "private"},
+            "from": BOT_USER,
+            "text": "..."
+        }
+
+    async def _feed(self, step: str, update: Dict[str, Any]):
+        started = time.perf_counter()
+        try:
+            await self.dp.feed_raw_update(self.bot, update)
+        except Exception as e:
+            self.recorder.errors[f"update.{step}"] += 1
+            logging.getLogger(__name__).debug(f"{step} failed: {e!r}")
+        finally:
+            self.recorder.add(f"update.{step}", time.perf_counter() - started)
+
+    async def tap(self, user_id: int, data: str, step: Optional[str] = None):
+        """Нажатие inline-кнопки с callback_data"""
+        await self._feed(step or data.rstrip("0123456789_"), {
+            "update_id": next(self._update_ids),
+            "callback_query": {
+                "id": str(next(self._callback_ids)),
+                "from": self._user(user_id),
+                "chat_instance": str(user_id),
+                "message": self._bot_message(user_id),
+                "data": data
+            }
+        })
+
+    async def send(self, user_id: int, text: str, step: str):
+        """Текстовое сообщение от пользователя"""
+        await self._feed(step, {
+            "update_id": next(self._update_ids),
+            "message": {
+                "message_id": next(self._update_ids),
+                "date": int(time.time()),
+                "chat": {"id": user_id, "type": "private"},
+                "from": self._user(user_id),
+                "text": text
+            }
+        })
+
+    def button(self, user_id: int, prefix: str) -> Optional[str]:
+        """Кнопка с callback_data, начинающимся с prefix, из последней клавиатуры в чате пользователя"""
+        return next((data for data in self.api.buttons(user_id) if data.startswith(prefix)), None)
+
+
+async def registration_rush(sim: Simulation, user_id: int, event_id: int, think: float):
+    await sim.tap(user_id, f"event_{event_id}")
+    await asyncio.sleep(random.uniform(0, think))
+    await sim.tap(user_id, f"register_{event_id}")
+    # Мест не хватило - встаём в лист ожидания, если бот это предложил
+    waitlist = sim.button(user_id, "waitlist_join_")
+    if waitlist:
+        await asyncio.sleep(random.uniform(0, think))
+        await sim.tap(user_id, waitlist)
+
+
+async def pagination_storm(sim: Simulation, user_id: int, pages: int, think: float):
+    await sim.tap(user_id, "upcoming_events")
+    for prefix in ("events_page_n", "events_page_p"):
+        for _ in range(pages):
+            data = sim.button(user_id, prefix)
+            if not data:
+                break
+            await asyncio.sleep(random.uniform(0, think))
+            await sim.tap(user_id, data, step=prefix)
+
+
+async def admin_edits(sim: Simulation, event_ids: List[int], stop: asyncio.Event, pause: float):
+    """Админ по кругу меняет место проведения мероприятий, пока не закончится основной поток"""
+    for round_number in itertools.count(1):
+        if stop.is_set():
+            break
+        event_id = event_ids[round_number % len(event_ids)]
+        await sim.tap(ADMIN_ID, "admin_events")
+        await sim.tap(ADMIN_ID, f"manage_event_{event_id}")
+        await sim.tap(ADMIN_ID, f"edit_event_{event_id}")
+        await sim.tap(ADMIN_ID, "edit_field_location", step="edit_field")
+        await sim.send(ADMIN_ID, f"Зал №{round_number}", step="edit_value")
+        await sim.tap(ADMIN_ID, f"confirm_edit_event_{event_id}")
+        await sim.tap(ADMIN_ID, f"view_participants_{event_id}")
+        await asyncio.sleep(pause)
+
+
+async def seed_events(count: int, hot_capacity: int) -> List[int]:
+    """Тестовые мероприятия; на первое («горячее») ограничено число мест"""
+    from app.database.database import AsyncSessionLocal
+    from app.database.models import Event
+
+    start = datetime.now() + timedelta(days=1)
+    events = [
+        Event(
+            title=f"Мероприятие {i + 1}",
+            short_description="Нагрузочный тест",
+            full_description="Описание мероприятия для нагрузочного теста. " * 5,
+            date=start + timedelta(hours=6 * i),
+            location="Москва",
+            speakers='["Спикер 1", "Спикер 2"]',
+            registration_required=True,
+            max_participants=hot_capacity if i == 0 else None
+        )
+        for i in range(count)
+    ]
+    async with AsyncSessionLocal() as db:
+        db.add_all(events)
+        await db.commit()
+        return [event.id for event in events]
+
+
+def handler_timer(recorder: LatencyRecorder, router_name: str):
+    """Inner middleware роутера: точное время каждого хендлера (регистрируется последним)"""
+    async def middleware(handler: Callable[..., Awaitable[Any]], event: Any, data: Dict[str, Any]) -> Any:
+        name = f"{router_name}.{data['handler'].callback.__name__}"
+        started = time.perf_counter()
+        try:
+            return await handler(event, data)
+        except Exception:
+            recorder.errors[name] += 1
+            raise
+        finally:
+            recorder.add(name, time.perf_counter() - started)
+    return middleware
+
+
+async def run(args: argparse.Namespace) -> str:
+    from aiogram import Bot, Dispatcher
+    from aiogram.client.default import DefaultBotProperties
+    from aiogram.client.session.aiohttp import AiohttpSession
+    from aiogram.client.telegram import TelegramAPIServer
+    from aiogram.enums import ParseMode
+
+    from app.config import BOT_TOKEN, DATABASE_URL
+    from app.database.database import engine, init_db
+    from app.database.fsm_storage import create_fsm_storage
+    from app.handlers.admin_handlers import admin_router
+    from app.handlers.user_handlers import user_router
+    from app.main import setup_bot_session, setup_dispatcher
+
+    logging.getLogger().setLevel(logging.DEBUG if args.verbose else logging.WARNING)
+
+    api = FakeBotAPI(latency=args.api_latency)
+    await api.start()
+    bot = Bot(
+        token=BOT_TOKEN,
+        session=AiohttpSession(api=TelegramAPIServer.from_base(api.base_url)),
+        default=DefaultBotProperties(parse_mode=ParseMode.HTML)
+    )
+    setup_bot_session(bot)
+    storage = create_fsm_storage()
+    dp = Dispatcher(storage=storage)
+
+    await init_db()
+    setup_dispatcher(dp)
+    recorder = LatencyRecorder()
+    for name, router in (("user", user_router), ("admin", admin_router)):
+        router.message.middleware(handler_timer(recorder, name))
+        router.callback_query.middleware(handler_timer(recorder, name))
+
+    event_ids = await seed_events(args.events, hot_capacity=max(1, args.users // 4))
+    hot_event = event_ids[0]
+    sim = Simulation(dp, bot, api, recorder)
+
+    users = [FIRST_USER_ID + i for i in range(args.users)]
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def user_session(index: int, user_id: int):
+        async with semaphore:
+            if args.scenario == "rush" or (args.scenario == "mixed" and index % 2 == 0):
+                await registration_rush(sim, user_id, hot_event, args.think)
+            else:
+                await pagination_storm(sim, user_id, args.pages, args.think)
+
+    stop = asyncio.Event()
+    admin_task = None
+    if args.scenario in ("admin", "mixed"):
+        edited = [hot_event] if args.scenario == "mixed" else event_ids
+        admin_task = asyncio.create_task(admin_edits(sim, edited, stop, args.admin_pause))
+
+    started = time.perf_counter()
+    await asyncio.gather(*(user_session(index, user_id) for index, user_id in enumerate(users)))
+    stop.set()
+    if admin_task:
+        await admin_task
+    elapsed = time.perf_counter() - started
+
+    await bot.session.close()
+    await storage.close()
+    await api.stop()
+    await engine.dispose()
+
+    total_updates = sum(len(samples) for name, samples in recorder.samples.items() if name.startswith("update."))
+    update_names = [name for name in recorder.samples if name.startswith("update.")]
+    handler_names = [name for name in recorder.samples if not name.startswith("update.")]
+    api_calls = ", ".join(f"{method}: {count}" for method, count in api.calls.most_common())
+    return "\n".join([
+        f"Scenario {args.scenario}: {args.users} users, concurrency {args.concurrency}, "
+        f"{args.events} events, database {DATABASE_URL.split('://')[0]}",
+        f"{total_updates} updates in {elapsed:.2f} s -> {total_updates / elapsed:.1f} updates/s",
+        f"Bot API calls: {sum(api.calls.values())} ({api_calls})",
+        "",
+        recorder.table("Updates (end to end)", update_names, elapsed),
+        "",
+        recorder.table("Handlers", handler_names, elapsed)
+    ])
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Нагрузочный тест бота с фейковым Bot API")
+    parser.add_argument("--scenario", choices=SCENARIOS, default="mixed")
+    parser.add_argument("--users", type=int, default=500, help="число синтетических пользователей")
+    parser.add_argument("--concurrency", type=int, default=100, help="сколько пользователей действуют одновременно")
+    parser.add_argument("--events", type=int, default=30, help="число тестовых мероприятий")
+    parser.add_argument("--pages", type=int, default=5, help="сколько страниц листает каждый пользователь")
+    parser.add_argument("--think", type=float, default=0.0, help="максимальная пауза между нажатиями (секунды)")
+    parser.add_argument("--api-latency", type=float, default=0.03, help="задержка ответа фейкового Bot API (секунды)")
+    parser.add_argument("--admin-pause", type=float, default=0.1, help="пауза между правками админа (секунды)")
+    parser.add_argument("--throttling", action="store_true", help="не отключать ограничение частоты нажатий")
+    parser.add_argument("--verbose", action="store_true")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None):
+    args = parse_args(argv)
+    configure_environment(args)
+    print(asyncio.run(run(args)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,31 @@
+import asyncio
+import os
+import tempfile
+
+import pytest
+
+# Тесты работают с временной SQLite-базой; адрес нужно задать до импорта app.config
+_db_dir = tempfile.mkdtemp(prefix="youth_council_tests_")
+os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{os.path.join(_db_dir, 'test.db')}"
+os.environ.setdefault("BOT_TOKEN", "123:test")
+
+
+def run(coro):
+    """Выполнить корутину в новом цикле событий и вернуть соединения в пул этого цикла"""
+    from app.database.database import engine
+
+    async def wrapper():
+        try:
+            return await coro
+        finally:
+            await engine.dispose()
+
+    return asyncio.run(wrapper())
+
+
+@pytest.fixture(scope="session", autouse=True)
+def database():
+    """Схема базы данных (alembic upgrade head) один раз на все тесты"""
+    from app.database.database import init_db
+
+    run(init_db())
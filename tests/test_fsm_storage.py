@@ -0,0 +1,147 @@
+from datetime import datetime, timedelta
+
+import pytest
+from aiogram.fsm.storage.base import StorageKey
+from fakeredis.aioredis import FakeRedis
+from sqlalchemy import delete, select
+
+from conftest import run
+from app.database import fsm_storage
+from app.database.database import AsyncSessionLocal
+from app.database.fsm_storage import SQLStorage, create_redis_storage
+from app.database.models import FSMRecord
+
+KEY = StorageKey(bot_id=1, chat_id=100, user_id=100)
+EVENT_DATE = datetime(2026, 11, 20, 18, 30)
+
+
+@pytest.fixture(autouse=True)
+def clean_states():
+    async def clean():
+        async with AsyncSessionLocal() as db:
+            await db.execute(delete(FSMRecord))
+            await db.commit()
+
+    run(clean())
+
+
+async def _stored_rows():
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(select(FSMRecord.key, FSMRecord.state, FSMRecord.data))
+        return result.all()
+
+
+def _storage() -> SQLStorage:
+    # Фоновая запись не должна срабатывать сама - тесты вызывают flush() явно
+    return SQLStorage(flush_interval=3600)
+
+
+def test_redis_storage_state_and_data():
+    async def scenario():
+        redis = FakeRedis()
+        storage = create_redis_storage(redis=redis)
+        await storage.set_state(KEY, "EventForm:date")
+        await storage.set_data(KEY, {"title": "Вечер поэзии", "date": EVENT_DATE})
+
+        assert await storage.get_state(KEY) == "EventForm:date"
+        assert await storage.get_data(KEY) == {"title": "Вечер поэзии", "date": EVENT_DATE}
+        # Дата хранится в JSON как {"__datetime__": ...}
+        raw = [await redis.get(key) for key in await redis.keys("*data*")]
+        assert any(b"__datetime__" in value for value in raw)
+
+        await storage.set_state(KEY, None)
+        await storage.set_data(KEY, {})
+        assert await storage.get_state(KEY) is None
+        assert await storage.get_data(KEY) == {}
+        await storage.close()
+
+    run(scenario())
+
+
+def test_sql_storage_buffers_writes_until_flush():
+    async def scenario():
+        storage = _storage()
+        await storage.set_state(KEY, "EventForm:date")
+        await storage.set_data(KEY, {"date": EVENT_DATE})
+
+        # Изменение видно сразу, но в БД ещё не записано
+        assert await storage.get_state(KEY) == "EventForm:date"
+        assert await storage.get_data(KEY) == {"date": EVENT_DATE}
+        assert await _stored_rows() == []
+
+        await storage.flush()
+        assert len(await _stored_rows()) == 1
+
+        # Другой экземпляр (другой процесс) читает записанное из БД
+        other = _storage()
+        assert await other.get_state(KEY) == "EventForm:date"
+        assert await other.get_data(KEY) == {"date": EVENT_DATE}
+        await storage.close()
+
+    run(scenario())
+
+
+def test_sql_storage_deletes_cleared_states():
+    async def scenario():
+        storage = _storage()
+        await storage.set_state(KEY, "EventForm:title")
+        await storage.set_data(KEY, {"title": "Лекция"})
+        await storage.flush()
+        assert len(await _stored_rows()) == 1
+
+        # state.clear() - состояние и данные пустые, запись больше не нужна
+        await storage.set_state(KEY, None)
+        await storage.set_data(KEY, {})
+        await storage.flush()
+        assert await _stored_rows() == []
+        assert await storage.get_state(KEY) is None
+        assert await storage.get_data(KEY) == {}
+        await storage.close()
+
+    run(scenario())
+
+
+def test_sql_storage_compact_removes_stale_rows():
+    async def scenario():
+        now = datetime.utcnow()
+        async with AsyncSessionLocal() as db:
+            db.add_all([
+                FSMRecord(key="fresh", state="EventForm:title", updated_at=now),
+                FSMRecord(key="empty", state=None, data=None, updated_at=now),
+                FSMRecord(key="abandoned", state="EventForm:date", updated_at=now - timedelta(days=30)),
+            ])
+            await db.commit()
+
+        storage = SQLStorage(flush_interval=3600, state_ttl=7 * 24 * 3600)
+        await storage.compact()
+        assert [row.key for row in await _stored_rows()] == ["fresh"]
+
+    run(scenario())
+
+
+def test_sql_storage_requeues_changes_after_failed_flush(monkeypatch):
+    async def scenario():
+        storage = _storage()
+        await storage.set_state(KEY, "EventForm:title")
+
+        async def broken_db():
+            raise ConnectionError("database is unavailable")
+            yield
+
+        with monkeypatch.context() as patch:
+            patch.setattr(fsm_storage, "get_db", broken_db)
+            with pytest.raises(ConnectionError):
+                await storage.flush()
+
+        # Изменение вернулось в очередь и по-прежнему читается
+        assert await storage.get_state(KEY) == "EventForm:title"
+        assert await _stored_rows() == []
+
+        # Более свежее изменение не затирается повторной записью старого
+        await storage.set_state(KEY, "EventForm:date")
+        await storage.flush()
+        rows = await _stored_rows()
+        assert [(row.key, row.state) for row in rows] == [("1:100:100::default", "EventForm:date")]
+        await storage.close()
+
+    run(scenario())
@@ -0,0 +1,81 @@
+import asyncio
+from datetime import datetime
+
+from aiogram.types import Chat, Message, PhotoSize
+from PIL import Image
+
+from conftest import run
+from app.utils import images
+from app.utils.images import send_cached_photo
+
+
+def _source(tmp_path) -> str:
+    path = tmp_path / "poster.png"
+    Image.new("RGB", (64, 48), "red").save(path)
+    return str(path)
+
+
+def _photo_message(file_id: str) -> Message:
+    return Message(
+        message_id=1,
+        date=datetime.now(),
+        chat=Chat(id=1, type="private"),
+        photo=[PhotoSize(file_id=file_id, file_unique_id=file_id, width=64, height=48)],
+    )
+
+
+def test_concurrent_views_upload_image_once(tmp_path):
+    source = _source(tmp_path)
+    uploads, sent = [], []
+
+    async def send(media):
+        if isinstance(media, str):
+            sent.append(media)
+            return True
+        uploads.append(media)
+        # Пока идёт загрузка, приходят новые просмотры
+        await asyncio.sleep(0.05)
+        return _photo_message("uploaded")
+
+    async def scenario():
+        first = asyncio.create_task(send_cached_photo(source, send))
+        await asyncio.sleep(0.01)
+        await asyncio.gather(*(send_cached_photo(source, send) for _ in range(5)))
+        await first
+
+    run(scenario())
+    assert len(uploads) == 1
+    assert sent == ["uploaded"] * 5
+    assert images._upload_locks == {}
+
+
+def test_failed_upload_is_retried_once(tmp_path):
+    source = _source(tmp_path)
+    uploads = []
+
+    async def send(media):
+        if isinstance(media, str):
+            return True
+        uploads.append(media)
+        await asyncio.sleep(0.05)
+        if len(uploads) == 1:
+            raise ConnectionError("upload failed")
+        return _photo_message("retried")
+
+    async def view():
+        try:
+            await send_cached_photo(source, send)
+        except ConnectionError:
+            pass
+
+    async def scenario():
+        # Первая загрузка падает; ждавший замок повторяет её, а пришедший в этот момент просмотр ждёт его
+        failing = asyncio.create_task(view())
+        await asyncio.sleep(0.01)
+        waiting = asyncio.create_task(view())
+        await failing
+        await asyncio.gather(waiting, view())
+
+    run(scenario())
+    assert len(uploads) == 2
+    assert images._upload_locks == {}
@@ -0,0 +1,71 @@
+import asyncio
+import json
+
+from fakeredis.aioredis import FakeRedis
+
+from conftest import run
+from app.utils import invalidation, profiles
+from app.utils.admin_utils import role_cache, invalidate_role
+
+
+def _wait_for(condition, timeout: float = 2.0):
+    async def wait():
+        for _ in range(int(timeout / 0.01)):
+            if condition():
+                return True
+            await asyncio.sleep(0.01)
+        return False
+
+    return wait()
+
+
+def test_role_invalidation_from_other_instance():
+    async def scenario():
+        redis = FakeRedis()
+        listener = invalidation.start_invalidation_listener(redis)
+        try:
+            await asyncio.sleep(0.05)
+            role_cache.set(777, "moderator")
+
+            # Сообщение другого экземпляра сбрасывает роль в этом процессе
+            await redis.publish(invalidation.CHANNEL, json.dumps({"origin": "other", "name": "role", "key": 777}))
+            assert await _wait_for(lambda: role_cache.get(777) is None)
+
+            # Свои сообщения процесс не применяет повторно
+            role_cache.set(778, "admin")
+            invalidation.publish("role", 779)
+            await asyncio.sleep(0.1)
+            assert role_cache.get(778) == "admin"
+
+            # invalidate_role сбрасывает локально и публикует для остальных
+            pubsub = redis.pubsub()
+            await pubsub.subscribe(invalidation.CHANNEL)
+            invalidate_role(778)
+            assert role_cache.get(778) is None
+            message = None
+            for _ in range(100):
+                message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=0.01)
+                if message:
+                    break
+            assert json.loads(message["data"])["key"] == 778
+            await pubsub.aclose()
+        finally:
+            listener.cancel()
+            invalidation._redis = None
+            invalidation._listener = None
+
+    run(scenario())
+
+
+def test_profile_invalidation_from_other_instance():
+    profiles._profiles.set(501, "profile 501")
+    profiles._profiles.set(502, "profile 502")
+
+    # Регистрация в другом экземпляре сбрасывает профиль одного пользователя
+    invalidation.apply(json.dumps({"origin": "other", "name": "profile", "key": 501}))
+    assert profiles._profiles.get(501) is None
+    assert profiles._profiles.get(502) == "profile 502"
+
+    # Правка мероприятия в другом экземпляре сбрасывает все профили
+    invalidation.apply(json.dumps({"origin": "other", "name": "profiles", "key": None}))
+    assert profiles._profiles.get(502) is None